@@ -31,9 +31,48 @@ CORS(app, resources={
     }
 })
 
+# Stream multipart uploads into bounded spools and cap request size
+from utils.uploads import UploadRequest, UPLOAD_MAX_REQUEST_BYTES, too_large_response
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_REQUEST_BYTES
+
+# Fork the bcrypt and image workers before any DB connections or threads exist
+from utils.passwords import hasher
+from utils.derivatives import derivatives
+hasher.start()
+derivatives.start()
+
 # Import database
 from config.database import db
 
+# The routes query the migrated schema: apply pending migrations here when
+# DB_AUTO_MIGRATE is set, otherwise refuse to start on an unmigrated database
+from config import migrations
+try:
+    _pending_migrations = migrations.pending(create=False)
+except Exception as e:
+    # Most likely the database is unreachable; requests will report that themselves
+    logger.warning(f'⚠️ Could not check schema migrations: {e}')
+    _pending_migrations = []
+if _pending_migrations:
+    if os.getenv('DB_AUTO_MIGRATE', 'false').lower() == 'true':
+        logger.info(f'📍 Applying {len(_pending_migrations)} pending schema migration(s)...')
+        migrations.migrate()
+    else:
+        logger.error(
+            f'❌ {len(_pending_migrations)} schema migration(s) pending: '
+            'run python tools/migrate.py or set DB_AUTO_MIGRATE=true'
+        )
+        raise SystemExit(1)
+
+# Move attachments left pending by the last run into the blob store
+from utils.ingest import ingester
+ingester.start()
+
+# Load revoked token ids and keep them current off the request path
+from middleware.revocation import revocations
+revocations.start()
+
 # Import blueprints
 from routes.auth import auth_bp
 from routes.issues import issues_bp
@@ -55,6 +94,43 @@ def health():
         'timestamp': datetime.now().isoformat()
     }), 200
 
+# Database and auth hot-path stats (opt-in: exposes SQL fingerprints)
+if os.getenv('DB_STATS_ENDPOINT', 'false').lower() == 'true':
+    from middleware.auth_middleware import token_cache, principal_cache
+    from middleware.rate_limit import rate_limit_stats
+
+    @app.route('/api/health/db', methods=['GET'])
+    def db_health():
+        logger.info('📍 DB stats request')
+        return jsonify({
+            'success': True,
+            'pools': {
+                pool.name: pool.stats() for pool in [db.pool] + db.replicas
+            },
+            'queries': db.stats.snapshot() if db.stats else []
+        }), 200
+
+    @app.route('/api/health/auth', methods=['GET'])
+    def auth_health():
+        logger.info('📍 Auth stats request')
+        return jsonify({
+            'success': True,
+            'rate_limits': rate_limit_stats(),
+            'revocations': revocations.stats(),
+            'token_cache': token_cache.stats(),
+            'principal_cache': principal_cache.stats(),
+            'password_hasher': hasher.stats()
+        }), 200
+
+    @app.route('/api/health/uploads', methods=['GET'])
+    def uploads_health():
+        logger.info('📍 Upload stats request')
+        return jsonify({
+            'success': True,
+            'ingest': ingester.stats(),
+            'derivatives': derivatives.stats()
+        }), 200
+
 # 404 handler
 @app.errorhandler(404)
 def not_found(error):
@@ -64,6 +140,12 @@ def not_found(error):
         'message': f'Route {request.path} not found'
     }), 404
 
+# 413 handler
+@app.errorhandler(413)
+def request_too_large(error):
+    logger.warning(f'413 Error: Request too large - {request.path}')
+    return too_large_response('Request is too large')
+
 # 500 handler
 @app.errorhandler(500)
 def server_error(error):
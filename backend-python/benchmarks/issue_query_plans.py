@@ -0,0 +1,191 @@
+"""
+Issue list query plans before and after config/migrations at 1M issues.
+
+    python benchmarks/issue_query_plans.py --issues 1000000
+
+Builds a SQLite file with the pre-migration issues table (free-text
+category, single-column citizen_id index), fills it with synthetic
+issues, and prints EXPLAIN QUERY PLAN plus timings for the dashboard
+list queries. It then runs the migrations exactly as tools/migrate.py
+does and repeats the same lists with the migrated queries.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('JWT_SECRET', 'benchmark_secret_key_minimum_32_characters_long')
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_ROOT)
+
+STATUSES = ('created', 'in progress', 'escalated', 'rejected', 'completed')
+LEGACY_ISSUES = '''CREATE TABLE issues (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  citizen_id INTEGER NOT NULL REFERENCES citizens (id) ON DELETE CASCADE,
+  category VARCHAR(255) NOT NULL,
+  description TEXT NOT NULL,
+  status TEXT DEFAULT 'created',
+  created_by INTEGER NOT NULL REFERENCES users (id) ON DELETE RESTRICT,
+  updated_by INTEGER NOT NULL REFERENCES users (id) ON DELETE RESTRICT,
+  created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX issues_citizen_id ON issues (citizen_id);
+CREATE INDEX issues_created_by ON issues (created_by);
+CREATE INDEX issues_updated_by ON issues (updated_by);'''
+
+# (label, query, params): each param is a key into main()'s sample, or a literal value
+LEGACY_QUERIES = [
+    ('citizen: my issues, first page',
+     '''SELECT id, category, description, status, created_at, updated_at FROM issues
+     WHERE citizen_id = ? ORDER BY created_at DESC, id DESC LIMIT 11''',
+     ('citizen',)),
+    ('citizen: my issues by status',
+     '''SELECT id, category, description, status, created_at, updated_at FROM issues
+     WHERE citizen_id = ? AND status = ? ORDER BY created_at DESC, id DESC LIMIT 11''',
+     ('citizen', 'status')),
+    ('official: issues in their category',
+     '''SELECT i.id, i.citizen_id, i.category, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i WHERE i.category IN (?) ORDER BY i.created_at DESC''',
+     ('category_name',)),
+    ('higher official: newest escalated',
+     '''SELECT i.id, i.citizen_id, i.category, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i WHERE i.status = ? ORDER BY i.created_at DESC LIMIT 50''',
+     ('escalated',)),
+]
+
+MIGRATED_QUERIES = [
+    ('citizen: my issues, first page',
+     '''SELECT i.id, c.name AS category, i.category_id, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i JOIN issue_categories c ON c.id = i.category_id
+     WHERE i.citizen_id = ? ORDER BY i.created_at DESC, i.id DESC LIMIT 11''',
+     ('citizen',)),
+    ('citizen: my issues by status',
+     '''SELECT i.id, c.name AS category, i.category_id, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i JOIN issue_categories c ON c.id = i.category_id
+     WHERE i.citizen_id = ? AND i.status = ? ORDER BY i.created_at DESC, i.id DESC LIMIT 11''',
+     ('citizen', 'status')),
+    ('official: issues in their category',
+     '''SELECT i.id, i.citizen_id, c.name AS category, i.category_id, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i JOIN issue_categories c ON c.id = i.category_id
+     WHERE i.category_id IN (?) ORDER BY i.created_at DESC''',
+     ('category_id',)),
+    ('higher official: newest escalated',
+     '''SELECT i.id, i.citizen_id, c.name AS category, i.category_id, i.description, i.status, i.created_at, i.updated_at
+     FROM issues i JOIN issue_categories c ON c.id = i.category_id
+     WHERE i.status = ? ORDER BY i.created_at DESC LIMIT 50''',
+     ('escalated',)),
+]
+
+
+def build_legacy(path, issues, citizens, seed):
+    """Current schema with issues rolled back to its pre-migration shape"""
+    with open(os.path.join(BACKEND_ROOT, 'config', 'sqlite_schema.sql'), encoding='utf-8') as schema:
+        script = schema.read()
+
+    raw = sqlite3.connect(path, isolation_level=None)
+    raw.execute('PRAGMA journal_mode = WAL')
+    raw.execute('PRAGMA synchronous = OFF')
+    raw.executescript(script)
+    raw.executescript('DROP TABLE issues;\n' + LEGACY_ISSUES)
+    raw.execute('DELETE FROM schema_migrations')
+    categories = [name for (name,) in raw.execute('SELECT name FROM issue_categories ORDER BY id')]
+
+    raw.execute('BEGIN')
+    raw.executemany(
+        "INSERT INTO users (id, name, email, password, role) VALUES (?, ?, ?, 'x', 'citizen')",
+        ((n, f'Citizen {n}', f'citizen{n}@bench.local') for n in range(1, citizens + 1))
+    )
+    raw.executemany(
+        "INSERT INTO citizens (id, user_id, phone, address) VALUES (?, ?, '9876543210', 'Bench Street 1')",
+        ((n, n) for n in range(1, citizens + 1))
+    )
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    span = 2 * 365 * 24 * 3600
+
+    def rows():
+        # Ascending times, as inserts arrive in production
+        for n in range(issues):
+            created = (start + timedelta(seconds=span * n // issues)).strftime('%Y-%m-%d %H:%M:%S')
+            citizen = rng.randint(1, citizens)
+            yield (citizen, rng.choice(categories), f'Issue {n}', rng.choice(STATUSES), citizen, citizen, created, created)
+
+    raw.executemany(
+        '''INSERT INTO issues (citizen_id, category, description, status, created_by, updated_by, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        rows()
+    )
+    raw.execute('COMMIT')
+    raw.execute('ANALYZE')
+    raw.close()
+    return categories
+
+
+def report(raw, queries, sample, repeat):
+    for label, query, keys in queries:
+        params = tuple(sample.get(key, key) for key in keys)
+        plan = [row[3] for row in raw.execute('EXPLAIN QUERY PLAN ' + query, params)]
+        timings = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            rows = raw.execute(query, params).fetchall()
+            timings.append(time.perf_counter() - began)
+        timings.sort()
+        print(f'  {label}: {len(rows)} rows, median {timings[len(timings) // 2] * 1000:.2f} ms')
+        for step in plan:
+            print(f'      {step}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=1_000_000)
+    parser.add_argument('--citizens', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='issue_plans_')
+    path = os.path.join(workdir, 'bench.db')
+
+    print(f'Building {args.issues} issues for {args.citizens} citizens in {path}...')
+    began = time.perf_counter()
+    categories = build_legacy(path, args.issues, args.citizens, args.seed)
+    print(f'  built in {time.perf_counter() - began:.1f} s')
+
+    sample = {'citizen': args.citizens // 2, 'status': 'created', 'category_name': categories[0]}
+
+    raw = sqlite3.connect(path)
+    print('\nBefore migrations (free-text category, citizen_id index only):')
+    report(raw, LEGACY_QUERIES, sample, args.repeat)
+    raw.close()
+
+    # Imported only now so the backend opens the prepared file instead of creating one
+    os.environ['DB_SQLITE_PATH'] = path
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    from config import migrations
+
+    began = time.perf_counter()
+    done = migrations.migrate()
+    print(f'\nApplied migrations {", ".join(f"{version:04d}" for version in done)} in {time.perf_counter() - began:.1f} s')
+
+    raw = sqlite3.connect(path)
+    raw.execute('ANALYZE')
+    sample['category_id'] = raw.execute('SELECT id FROM issue_categories WHERE name = ?', (categories[0],)).fetchone()[0]
+    print('\nAfter migrations (category_id, composite indexes):')
+    report(raw, MIGRATED_QUERIES, sample, args.repeat)
+    raw.close()
+
+    print(f'\nDatabase left at {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+In-process load run of the Flask blueprints against the SQLite backend.
+
+    python benchmarks/load_app.py --threads 8 --requests 2000
+
+No MySQL server is needed: DB_BACKEND is forced to sqlite before the app is
+imported, so every run starts from the same empty schema and the numbers
+are reproducible on a dev box or CI runner.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', ':memory:')
+os.environ.setdefault('JWT_SECRET', 'benchmark_secret_key_minimum_32_characters_long')
+# Every simulated client is 127.0.0.1 (and one email for logins), so throttling would reject most requests
+os.environ.setdefault('AUTH_RATE_LIMIT', 'false')
+os.environ.setdefault('DB_POOL_MAX', '16')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from werkzeug.test import Client
+
+from app import app
+from config.database import db
+from routes.auth import hash_password
+
+PASSWORD = 'Benchmark1'
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def seed_officials():
+    """Create one official per category and a higher official directly in the DB"""
+    hashed = hash_password(PASSWORD)
+    with db.transaction() as tx:
+        for category in tx.fetch_all('SELECT id FROM issue_categories'):
+            user = tx.execute_query(
+                'INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)',
+                ('Official', f'official{category["id"]}@bench.local', hashed, 'official')
+            )
+            tx.execute_query(
+                'INSERT INTO officials (user_id, department, issue_category_id) VALUES (%s, %s, %s)',
+                (user['last_id'], 'Bench', category['id'])
+            )
+        tx.execute_query(
+            'INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)',
+            ('Head', 'head@bench.local', hashed, 'higherofficial')
+        )
+
+
+def login(client, email):
+    response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+    if response.status_code != 200:
+        raise SystemExit(f'Login as {email} failed with {response.status_code}: {response.get_data(as_text=True)}')
+    return {'Authorization': f'Bearer {response.get_json()["token"]}'}
+
+
+class Worker(threading.Thread):
+    def __init__(self, index, iterations, official_headers, head_headers):
+        super().__init__(daemon=True)
+        self.index = index
+        self.iterations = iterations
+        self.official_headers = official_headers
+        self.head_headers = head_headers
+        self.client = Client(app)
+        self.timings = {}
+        self.errors = 0
+
+    def call(self, name, method, url, **kwargs):
+        started = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        body = response.get_data()
+        self.timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response, body
+
+    def run(self):
+        email = f'citizen{self.index}@bench.local'
+        response, _ = self.call('register', 'POST', '/api/auth/register', json={
+            'name': 'Bench Citizen', 'email': email, 'password': PASSWORD,
+            'phone': '9876543210', 'address': 'Bench Street 1'
+        })
+        if response.status_code != 201:
+            # Counted as an error by call(); without a token this thread has nothing to run
+            return
+        headers = {'Authorization': f'Bearer {response.get_json()["token"]}'}
+
+        for i in range(self.iterations):
+            step = i % 5
+            if step == 0:
+                self.call('create_issue', 'POST', '/api/issues/create', headers=headers,
+                          data={'description': f'Pothole {i}', 'category_id': str(1 + i % 10)})
+            elif step == 1:
+                self.call('my_issues', 'GET', '/api/issues/my-issues', headers=headers)
+            elif step == 2:
+                self.call('citizen_dashboard', 'GET', '/api/dashboard/citizen/issues', headers=headers)
+            elif step == 3:
+                self.call('official_dashboard', 'GET', '/api/dashboard/official/issues',
+                          headers=self.official_headers)
+            else:
+                self.call('higher_official_dashboard', 'GET', '/api/dashboard/higher-official/issues',
+                          headers=self.head_headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=500, help='requests per thread after registering')
+    parser.add_argument('--verbose', action='store_true', help='keep the app request logging')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    seed_officials()
+    client = Client(app)
+    official_headers = login(client, 'official1@bench.local')
+    head_headers = login(client, 'head@bench.local')
+
+    workers = [Worker(i, args.requests, official_headers, head_headers) for i in range(args.threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    merged = {}
+    for worker in workers:
+        for name, samples in worker.timings.items():
+            merged.setdefault(name, []).extend(samples)
+    total = sum(len(samples) for samples in merged.values())
+    errors = sum(worker.errors for worker in workers)
+
+    print('=' * 60)
+    print(f'{total} requests in {elapsed:.2f}s over {args.threads} threads: '
+          f'{total / elapsed:.1f} req/s, {errors} errors')
+    print('=' * 60)
+    print(f'{"endpoint":<28}{"count":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+    for name, samples in sorted(merged.items()):
+        ordered = sorted(samples)
+        print(f'{name:<28}{len(ordered):>7}{_percentile(ordered, 0.5):>9.2f}'
+              f'{_percentile(ordered, 0.95):>9.2f}{_percentile(ordered, 0.99):>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
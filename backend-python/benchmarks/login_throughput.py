@@ -0,0 +1,128 @@
+"""
+Login throughput against the number of bcrypt worker processes.
+
+    python benchmarks/login_throughput.py --seconds 5
+
+Runs POST /api/auth/login in-process over SQLite (see load_app.py) with
+bcrypt inline on the request threads (workers=0) and then on a process
+pool of 1, 2, 4 ... cpu_count workers, reporting logins/s, latency and
+how many requests were shed with 503.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', ':memory:')
+os.environ.setdefault('JWT_SECRET', 'benchmark_secret_key_minimum_32_characters_long')
+# Every simulated client is 127.0.0.1 (and one email for logins), so throttling would reject most requests
+os.environ.setdefault('AUTH_RATE_LIMIT', 'false')
+os.environ.setdefault('DB_POOL_MAX', '32')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from werkzeug.test import Client
+
+from app import app
+from config.database import db
+from utils import passwords
+from utils.passwords import PasswordHasher
+
+EMAIL = 'login@bench.local'
+PASSWORD = 'Benchmark1'
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def seed_user():
+    user = db.execute_query(
+        'INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)',
+        ('Login Bench', EMAIL, passwords.hasher.hash(PASSWORD), 'citizen')
+    )
+    db.execute_query(
+        'INSERT INTO citizens (user_id, phone, address) VALUES (%s, %s, %s)',
+        (user['last_id'], '9876543210', 'Bench Street 1')
+    )
+
+
+def run(workers, threads, seconds, max_pending):
+    passwords.hasher.shutdown()
+    passwords.hasher = PasswordHasher(workers=workers, max_pending=max_pending)
+    passwords.hasher.start()
+
+    latencies = []
+    counts = {'ok': 0, 'shed': 0, 'failed': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = Client(app)
+        local = []
+        local_counts = {'ok': 0, 'shed': 0, 'failed': 0}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'email': EMAIL, 'password': PASSWORD})
+            local.append((time.perf_counter() - started) * 1000)
+            if response.status_code == 200:
+                local_counts['ok'] += 1
+            elif response.status_code == 503:
+                local_counts['shed'] += 1
+            else:
+                local_counts['failed'] += 1
+        with lock:
+            latencies.extend(local)
+            for key, value in local_counts.items():
+                counts[key] += value
+
+    pool = [threading.Thread(target=worker, daemon=True) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    label = 'inline' if not workers else str(workers)
+    print(f'{label:>8}{threads:>9}{counts["ok"] / elapsed:>10.1f}{counts["shed"]:>7}{counts["failed"]:>8}'
+          f'{_percentile(ordered, 0.5):>9.1f}{_percentile(ordered, 0.95):>9.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=0, help='client threads (default 2 per worker, at least 4)')
+    parser.add_argument('--max-pending', type=int, default=0, help='bcrypt queue bound (default 4 per worker)')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    seed_user()
+
+    counts = [0]
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    print('=' * 60)
+    print(f'Login throughput, {os.cpu_count()} CPU(s), {args.seconds:.0f}s per run')
+    print('=' * 60)
+    print(f'{"workers":>8}{"threads":>9}{"login/s":>10}{"503s":>7}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}')
+    for workers in counts:
+        threads = args.threads or max(4, 2 * workers)
+        run(workers, threads, args.seconds, args.max_pending or None)
+    passwords.hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+import os
+import re
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """
+    What Database needs from a storage engine.
+
+    connect() returns a connection object exposing the subset of the
+    mysql.connector API the Database layer uses: cursor(dictionary=...,
+    prepared=...), ping(), reconnect(), start_transaction(), commit(),
+    rollback() and close(). Cursors expose execute/fetchone/fetchall/
+    fetchmany/close plus rowcount, lastrowid and column_names.
+    """
+
+    name = 'backend'
+    # Base class of every driver error
+    Error = Exception
+    # Errors after which a connection can no longer be trusted and is dropped
+    disconnect_errors = ()
+    supports_prepared = False
+    explain_prefix = 'EXPLAIN '
+    # Bound variables allowed in one statement (None for no limit)
+    max_params = None
+
+    def connect(self, host=None, port=None):
+        raise NotImplementedError
+
+    def is_unsent(self, error):
+        """True if `error` was raised before the statement reached the server"""
+        return False
+
+
+class MySQLBackend(Backend):
+    """mysql.connector against a MySQL server configured from DB_* variables"""
+
+    name = 'mysql'
+    supports_prepared = True
+
+    # CR_SERVER_GONE_ERROR, CR_SERVER_LOST_EXTENDED
+    UNSENT_ERRNOS = (2006, 2055)
+
+    def __init__(self):
+        import mysql.connector
+        from mysql.connector.errors import InterfaceError, OperationalError
+
+        self._connector = mysql.connector
+        self.Error = mysql.connector.Error
+        self.disconnect_errors = (InterfaceError, OperationalError)
+
+    def connect(self, host=None, port=None):
+        return self._connector.connect(
+            host=host or os.getenv('DB_HOST', 'localhost'),
+            user=os.getenv('DB_USER', 'root'),
+            password=os.getenv('DB_PASSWORD', ''),
+            database=os.getenv('DB_NAME', 'Citysolve360'),
+            port=port or int(os.getenv('DB_PORT', 3306)),
+            autocommit=True
+        )
+
+    def is_unsent(self, error):
+        return getattr(error, 'errno', None) in self.UNSENT_ERRNOS
+
+
+# ============================================================================
+# SQLITE STAND-IN
+# ============================================================================
+
+_QUOTED_OR_PLACEHOLDER_RE = re.compile(r"('(?:[^']|'')*')|%s|\bNOW\(\)|\s+FOR\s+UPDATE\b", re.IGNORECASE)
+
+
+def _substitute(match):
+    if match.group(1):
+        return match.group(1)
+    token = match.group(0)
+    if token == '%s':
+        return '?'
+    if token.upper() == 'NOW()':
+        return "datetime('now', 'localtime')"
+    # Row locks are implicit in SQLite's database-level write lock
+    return ''
+
+
+@lru_cache(maxsize=1024)
+def translate(query):
+    """Rewrite the MySQL dialect the routes use into SQLite"""
+    return _QUOTED_OR_PLACEHOLDER_RE.sub(_substitute, query)
+
+
+def _parse_timestamp(value):
+    text = value.decode('utf-8')
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+sqlite3.register_converter('TIMESTAMP', _parse_timestamp)
+sqlite3.register_converter('DATETIME', _parse_timestamp)
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that speaks %s placeholders and can return dict rows"""
+
+    def __init__(self, cursor, dictionary=True):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._columns = ()
+
+    @property
+    def column_names(self):
+        return self._columns
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=None):
+        self._cursor.execute(translate(query), tuple(params or ()))
+        description = self._cursor.description
+        self._columns = tuple(column[0] for column in description) if description else ()
+
+    def _convert(self, rows):
+        if not self._dictionary:
+            return rows
+        columns = self._columns
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self._columns, row))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def fetchmany(self, size):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection adapted to the mysql.connector calls Database makes"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self, dictionary=False, prepared=False):
+        # sqlite3 keeps its own per-connection statement cache, so `prepared`
+        # needs no special handling
+        return SQLiteCursor(self._raw.cursor(), dictionary=dictionary)
+
+    def ping(self, reconnect=False, attempts=1):
+        self._raw.execute('SELECT 1').fetchone()
+
+    def reconnect(self, attempts=1):
+        self.ping()
+
+    def is_connected(self):
+        return True
+
+    def start_transaction(self):
+        self._raw.execute('BEGIN')
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._raw.commit()
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteBackend(Backend):
+    """
+    Embedded SQLite stand-in for benchmarks and load tests.
+
+    DB_SQLITE_PATH selects the database file; ':memory:' (the default)
+    gives a process-wide shared in-memory database. The tables from
+    schema.sql are created on first connect from sqlite_schema.sql.
+    """
+
+    name = 'sqlite'
+    Error = sqlite3.Error
+    disconnect_errors = (sqlite3.InterfaceError,)
+    explain_prefix = 'EXPLAIN QUERY PLAN '
+    max_params = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+    SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'sqlite_schema.sql')
+
+    def __init__(self, path=None):
+        path = path or os.getenv('DB_SQLITE_PATH', ':memory:')
+        self.in_memory = path == ':memory:'
+        if not self.in_memory:
+            self.uri = f'file:{path}'
+        elif sqlite3.sqlite_version_info >= (3, 36, 0):
+            # memdb VFS: one process-wide memory DB with real file locking, so
+            # concurrent writers wait on the busy timeout instead of failing
+            self.uri = 'file:/citysolve360?vfs=memdb'
+        else:
+            # Shared cache also shares one memory DB but uses table locks
+            self.uri = 'file:citysolve360?mode=memory&cache=shared'
+        self._schema_lock = threading.Lock()
+        self._keeper = None
+
+    def _open(self):
+        raw = sqlite3.connect(
+            self.uri,
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 10))
+        )
+        raw.execute('PRAGMA foreign_keys = ON')
+        if not self.in_memory:
+            raw.execute('PRAGMA journal_mode = WAL')
+            raw.execute('PRAGMA synchronous = NORMAL')
+        return raw
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._keeper is not None:
+                return
+            keeper = self._open()
+            exists = keeper.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'issues'"
+            ).fetchone()
+            if not exists:
+                with open(self.SCHEMA_PATH, encoding='utf-8') as schema:
+                    keeper.executescript(schema.read())
+                logger.info(f'✅ SQLite schema created ({self.uri})')
+            # Held open for the process lifetime so a memory DB outlives pool churn
+            self._keeper = keeper
+
+    def connect(self, host=None, port=None):
+        self._ensure_schema()
+        return SQLiteConnection(self._open())
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend
+}
+
+
+def create_backend(name=None):
+    """Instantiate the backend named by `name` or DB_BACKEND (default mysql)"""
+    name = (name or os.getenv('DB_BACKEND', 'mysql')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown DB_BACKEND {name!r}. Must be one of: {", ".join(BACKENDS)}')
+    return BACKENDS[name]()
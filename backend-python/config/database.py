@@ -1,121 +1,608 @@
-import mysql.connector
-from mysql.connector import Error
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import count
+from flask import g, has_request_context
 import os
+import re
+import time
 import logging
 
+from config.backends import create_backend
+from config.pool import ConnectionPool, PoolTimeoutError
+from config.query_stats import QueryStats
+
 logger = logging.getLogger(__name__)
 
+# Storage engine selected by DB_BACKEND (mysql or sqlite)
+backend = create_backend()
+
+# Everything a caller of the database layer may need to catch
+DB_ERRORS = (backend.Error, PoolTimeoutError)
+
+# Upper bound for one multi-row statement; keep below the server's max_allowed_packet
+MAX_PACKET = int(os.getenv('DB_MAX_PACKET', 16 * 1024 * 1024))
+
+_VALUES_RE = re.compile(r'^(.*\bVALUES\s*)(\(.*\))\s*$', re.IGNORECASE | re.DOTALL)
+
+
+ROW_FORMATS = ('dict', 'tuple')
+
+
+class ResultSet:
+    """
+    Rows as plain tuples sharing one column-name header.
+    
+    Much cheaper than a dict per row for list endpoints; serializers such
+    as utils.responses.stream_json_response consume it directly. When
+    produced by Database.stream() `rows` is a lazy iterator and `columns`
+    is filled in once the query has executed.
+    """
+    
+    __slots__ = ('columns', 'rows')
+    
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __bool__(self):
+        return bool(self.rows)
+    
+    def as_dicts(self):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+
+def _check_row_format(row_format):
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f'row_format must be one of: {", ".join(ROW_FORMATS)}')
+    return row_format == 'dict'
+
+
+def _execute(connection, query, params, handler, dictionary=True):
+    """Run one statement on `connection` and hand the cursor to `handler`"""
+    cursor = connection.cursor(dictionary=dictionary)
+    try:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        
+        return handler(cursor)
+    finally:
+        cursor.close()
+
+
+class StatementCache:
+    """LRU of server-side prepared statements for one connection, keyed by SQL text"""
+    
+    def __init__(self, connection, capacity):
+        self.connection = connection
+        self.capacity = capacity
+        self._entries = OrderedDict()
+    
+    def get(self, query, dictionary=True):
+        """Return (sql, cursor) for `query`, preparing it on first use"""
+        key = (query, dictionary)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        
+        entry = (query, self.connection.cursor(prepared=True, dictionary=dictionary))
+        self._entries[key] = entry
+        if len(self._entries) > self.capacity:
+            _, (_, oldest) = self._entries.popitem(last=False)
+            _close_quietly(oldest)
+        return entry
+    
+    def evict(self, query, dictionary=True):
+        entry = self._entries.pop((query, dictionary), None)
+        if entry is not None:
+            _close_quietly(entry[1])
+    
+    def clear(self):
+        """Forget every statement, e.g. after the session was re-established"""
+        self._entries.clear()
+
+
+def _close_quietly(cursor):
+    try:
+        cursor.close()
+    except Exception as e:
+        logger.debug(f'Error closing prepared statement: {e}')
+
+
+def _execute_prepared(statements, query, params, handler, dictionary=True):
+    """Run `query` through the connection's prepared statement cache"""
+    # The connector only skips re-preparing when it is given the exact same
+    # string object it saw last time, so always execute the cached key
+    sql, cursor = statements.get(query, dictionary)
+    try:
+        cursor.execute(sql, params or ())
+        return handler(cursor)
+    except Exception:
+        statements.evict(query, dictionary)
+        raise
+
+
+def _write_result(cursor):
+    return {
+        'affected_rows': cursor.rowcount,
+        'last_id': cursor.lastrowid
+    }
+
+
+def _all_rows(cursor):
+    result = cursor.fetchall()
+    return result if result else []
+
+
+def _result_set(cursor):
+    return ResultSet(tuple(cursor.column_names), cursor.fetchall())
+
+
+def _row_count(result):
+    """Rows returned or affected, for query instrumentation"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, ResultSet)):
+        return len(result)
+    if isinstance(result, dict) and 'affected_rows' in result and 'last_id' in result:
+        return result['affected_rows']
+    return 1
+
+
+def _first_row(cursor):
+    result = cursor.fetchone()
+    # Drain any remaining rows so the connection goes back clean
+    cursor.fetchall()
+    return result
+
+
+def _estimate_size(row):
+    """Rough wire size of one row of parameters"""
+    size = 8
+    for value in row:
+        if isinstance(value, (bytes, bytearray)):
+            # Escaping can at worst double binary data
+            size += 2 * len(value) + 3
+        elif isinstance(value, str):
+            size += 2 * len(value.encode('utf-8')) + 3
+        else:
+            size += 24
+    return size
+
+
+def _execute_many(connection, query, rows, max_packet=None, max_params=None):
+    """
+    Insert `rows` with multi-row VALUES statements chunked to `max_packet` bytes.
+    
+    `query` is a normal single-row INSERT ending in `VALUES (%s, ...)`.
+    `max_params` additionally caps bound variables per statement for
+    engines that limit them.
+    """
+    match = _VALUES_RE.match(query.strip())
+    if not match:
+        raise ValueError('execute_many expects an INSERT ... VALUES (...) statement')
+    
+    prefix, template = match.groups()
+    max_packet = max_packet or MAX_PACKET
+    budget = max_packet - len(prefix) - 64
+    
+    def flush(batch):
+        _execute(
+            connection,
+            prefix + ', '.join([template] * len(batch)),
+            tuple(value for row in batch for value in row),
+            _write_result
+        )
+    
+    affected_rows = 0
+    batches = 0
+    batch = []
+    batch_size = 0
+    for row in rows:
+        row_size = _estimate_size(row) + len(template)
+        too_many_params = max_params and (len(batch) + 1) * len(row) > max_params
+        if batch and (batch_size + row_size > budget or too_many_params):
+            flush(batch)
+            affected_rows += len(batch)
+            batches += 1
+            batch = []
+            batch_size = 0
+        batch.append(row)
+        batch_size += row_size
+    
+    if batch:
+        flush(batch)
+        affected_rows += len(batch)
+        batches += 1
+    
+    return {'affected_rows': affected_rows, 'batches': batches}
+
+
+class Transaction:
+    """Statements bound to one connection inside Database.transaction()
+    
+    Unlike the Database methods these raise on error instead of returning
+    None, so a failing statement aborts the whole unit of work.
+    """
+    
+    def __init__(self, db, connection):
+        self.db = db
+        self.connection = connection
+    
+    def _timed(self, query, params, run):
+        started = time.perf_counter()
+        result = run()
+        self.db._observe(query, params, started, _row_count(result), self.connection)
+        return result
+    
+    def execute_query(self, query, params=None):
+        """Execute INSERT/UPDATE/DELETE query inside the transaction"""
+        return self._timed(query, params, lambda: _execute(self.connection, query, params, _write_result))
+    
+    def execute_many(self, query, rows, max_packet=None):
+        """Bulk INSERT `rows` inside the transaction"""
+        started = time.perf_counter()
+        result = _execute_many(self.connection, query, rows, max_packet, self.db.backend.max_params)
+        self.db._observe(query, None, started, result['affected_rows'], self.connection)
+        return result
+    
+    def fetch_all(self, query, params=None):
+        """Fetch multiple rows inside the transaction"""
+        return self._timed(query, params, lambda: _execute(self.connection, query, params, _all_rows))
+    
+    def fetch_one(self, query, params=None):
+        """Fetch single row inside the transaction"""
+        return self._timed(query, params, lambda: _execute(self.connection, query, params, _first_row))
+
+
 class Database:
     """Database connection manager with connection pooling"""
     
-    def __init__(self):
-        self.connection = None
+    def __init__(self, backend=backend):
+        # Storage engine (config.backends); MySQL in production, SQLite for benchmarks
+        self.backend = backend
+        self.disconnect_errors = backend.disconnect_errors
+        self.pool = None
+        self.replicas = []
+        # round_robin or least_loaded
+        self.read_strategy = os.getenv('DB_READ_STRATEGY', 'round_robin')
+        self._round_robin = count()
+        # Idle seconds after which a connection is pinged before reuse
+        self.ping_after = float(os.getenv('DB_POOL_PING_AFTER', 30))
+        # Prepared statements kept per connection (0 disables the cache)
+        self.statement_cache_size = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 32))
+        # Per-statement timing histograms and slow-query log (None when disabled)
+        self.stats = None
+        if os.getenv('DB_QUERY_STATS', 'true').lower() == 'true':
+            self.stats = QueryStats(
+                slow_ms=float(os.getenv('DB_SLOW_QUERY_MS', 200)),
+                explain=os.getenv('DB_EXPLAIN_SLOW', 'false').lower() == 'true'
+            )
         self.connect()
     
+    def _create_pool(self, name, host=None, port=None):
+        return ConnectionPool(
+            lambda: self.backend.connect(host, port),
+            min_size=int(os.getenv('DB_POOL_MIN', 1)),
+            max_size=int(os.getenv('DB_POOL_MAX', 10)),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            name=name
+        )
+    
     def connect(self):
-        """Connect to MySQL database"""
-        try:
-            self.connection = mysql.connector.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                user=os.getenv('DB_USER', 'root'),
-                password=os.getenv('DB_PASSWORD', ''),
-                database=os.getenv('DB_NAME', 'Citysolve360'),
-                port=int(os.getenv('DB_PORT', 3306)),
-                autocommit=True,
-                pool_name='mypool',
-                pool_size=5
+        """Create the primary connection pool and one pool per read replica"""
+        self.pool = self._create_pool(f'{self.backend.name}-primary')
+        
+        # DB_READ_REPLICAS=host[:port],host[:port],...
+        self.replicas = []
+        for index, address in enumerate(filter(None, os.getenv('DB_READ_REPLICAS', '').split(','))):
+            host, _, port = address.strip().partition(':')
+            self.replicas.append(
+                self._create_pool(f'{self.backend.name}-replica-{index + 1}', host, int(port) if port else None)
             )
-            
-            if self.connection.is_connected():
-                db_info = self.connection.get_server_info()
-                logger.info(f'✅ Database connected successfully (MySQL {db_info})')
-                return True
-            
-        except Error as e:
-            logger.error(f'❌ Database connection failed: {str(e)}')
-            return False
+        if self.replicas:
+            logger.info(f'📍 Routing reads to {len(self.replicas)} replica(s) ({self.read_strategy})')
+        
+        stats = self.pool.stats()
+        if stats['size']:
+            logger.info(f'✅ Database pool ready ({stats["size"]}/{stats["max_size"]} connections open)')
+            return True
+        
+        logger.error('❌ Database connection failed: pool could not open any connection')
+        return False
     
-    def reconnect_if_needed(self):
-        """Reconnect if connection is lost"""
-        try:
-            if not self.connection or not self.connection.is_connected():
+    def _pin_to_primary(self):
+        """Send the rest of this request's reads to the primary (read-after-write)"""
+        if has_request_context():
+            g._db_pinned_to_primary = True
+    
+    def _pool_for(self, primary=False):
+        """Pick the pool for a statement: writes and pinned reads go to the primary"""
+        if primary:
+            return self.pool
+        
+        # Outside a request there is nothing to scope read-after-write to,
+        # so background work stays on the primary
+        if not self.replicas or not has_request_context() or g.get('_db_pinned_to_primary'):
+            return self.pool
+        
+        if self.read_strategy == 'least_loaded':
+            return min(self.replicas, key=lambda pool: pool.in_use())
+        return self.replicas[next(self._round_robin) % len(self.replicas)]
+    
+    def check_liveness(self, conn):
+        """Ping a checked-out connection only if it has been idle for a while"""
+        if time.monotonic() - conn.last_used > self.ping_after:
+            try:
+                conn.raw.ping()
+            except self.disconnect_errors:
                 logger.warning('⚠️ Database connection lost. Reconnecting...')
-                self.connect()
-        except Exception as e:
-            logger.error(f'Reconnection error: {str(e)}')
+                conn.raw.reconnect(attempts=1)
+                # Prepared statements died with the old session
+                if conn.statements:
+                    conn.statements.clear()
     
-    def execute_query(self, query, params=None):
-        """Execute INSERT/UPDATE/DELETE query"""
+    @contextmanager
+    def _checkout(self, pool=None):
+        """Check out a PooledConnection, dropping it if it breaks"""
+        pool = pool or self.pool
+        conn = pool.acquire()
+        discard = False
         try:
-            self.reconnect_if_needed()
-            cursor = self.connection.cursor(dictionary=True)
-            
-            if params:
-                cursor.execute(query, params)
+            self.check_liveness(conn)
+            yield conn
+        except self.disconnect_errors:
+            discard = True
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+    
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection for the duration of the block"""
+        with self._checkout() as conn:
+            yield conn.raw
+    
+    def _statements(self, conn):
+        if conn.statements is None:
+            conn.statements = StatementCache(conn.raw, self.statement_cache_size)
+        return conn.statements
+    
+    def _observe(self, query, params, started, rows, connection=None):
+        """
+        Record a finished statement and capture its plan the first time it is slow
+        
+        Pass the connection a transaction holds so EXPLAIN runs on it; a
+        second checkout while holding one can starve the pool.
+        """
+        if self.stats is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if self.stats.record(query, duration_ms, rows):
+            self._explain(query, params, connection)
+    
+    def _explain(self, query, params, connection=None):
+        explain = self.backend.explain_prefix + query
+        try:
+            if connection is not None:
+                plan = _execute(connection, explain, params, _all_rows)
             else:
-                cursor.execute(query)
-            
-            self.connection.commit()
-            
-            result = {
-                'affected_rows': cursor.rowcount,
-                'last_id': cursor.lastrowid
-            }
+                with self._checkout() as conn:
+                    plan = _execute(conn.raw, explain, params, _all_rows)
+            self.stats.attach_plan(query, plan)
+        except DB_ERRORS as e:
+            logger.warning(f'⚠️ Could not EXPLAIN slow query: {str(e)}')
+    
+    def _can_retry(self, error, write):
+        """Reads are always safe to replay; writes only if the server never saw them"""
+        return not write or self.backend.is_unsent(error)
+    
+    def _run(self, query, params, handler, write=False, prepared=False, dictionary=True, primary=False):
+        """Execute a query on a pooled connection, retrying once on a dropped connection"""
+        if write:
+            self._pin_to_primary()
+        pool = self._pool_for(primary=write or primary)
+        retried = False
+        while True:
+            try:
+                with self._checkout(pool) as conn:
+                    started = time.perf_counter()
+                    if prepared and self.statement_cache_size and self.backend.supports_prepared:
+                        result = _execute_prepared(self._statements(conn), query, params, handler, dictionary)
+                    else:
+                        result = _execute(conn.raw, query, params, handler, dictionary)
+                
+                self._observe(query, params, started, _row_count(result))
+                return result
             
-            cursor.close()
-            return result
+            except self.disconnect_errors + (PoolTimeoutError,) as e:
+                if pool is not self.pool:
+                    logger.warning(f'⚠️ Read replica {pool.name} unavailable ({str(e)}). Falling back to primary...')
+                    pool = self.pool
+                    continue
+                if retried or isinstance(e, PoolTimeoutError) or not self._can_retry(e, write):
+                    raise
+                retried = True
+                logger.warning(f'⚠️ Database connection lost ({str(e)}). Retrying on a fresh connection...')
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Run a group of statements on one connection with a single commit.
+        
+        Usage:
+            with db.transaction() as tx:
+                user = tx.execute_query('INSERT INTO users ...', (...))
+                tx.execute_query('INSERT INTO citizens ...', (user['last_id'], ...))
+        
+        Any exception inside the block rolls the whole group back and is re-raised.
+        """
+        self._pin_to_primary()
+        with self.connection() as connection:
+            connection.start_transaction()
+            try:
+                yield Transaction(self, connection)
+            except BaseException:
+                try:
+                    connection.rollback()
+                except self.backend.Error as e:
+                    logger.error(f'❌ Rollback error: {str(e)}')
+                raise
+            else:
+                connection.commit()
+    
+    def execute_query(self, query, params=None):
+        """Execute INSERT/UPDATE/DELETE query"""
+        try:
+            # Connections run with autocommit, so no explicit COMMIT round trip
+            return self._run(query, params, _write_result, write=True)
         
-        except Error as e:
+        except DB_ERRORS as e:
             logger.error(f'❌ Execute query error: {str(e)}')
             logger.error(f'Query: {query}')
             logger.error(f'Params: {params}')
             return None
     
-    def fetch_all(self, query, params=None):
-        """Fetch multiple rows (SELECT query)"""
+    def execute_many(self, query, rows, max_packet=None):
+        """
+        Bulk INSERT many rows in as few statements as fit in `max_packet` bytes.
+        
+        All batches are committed together. Returns
+        {'affected_rows': n, 'batches': k} or None on error.
+        """
+        if not rows:
+            return {'affected_rows': 0, 'batches': 0}
+        
         try:
-            self.reconnect_if_needed()
-            cursor = self.connection.cursor(dictionary=True)
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            result = cursor.fetchall()
-            cursor.close()
-            return result if result else []
+            with self.transaction() as tx:
+                return tx.execute_many(query, rows, max_packet)
         
-        except Error as e:
+        except DB_ERRORS as e:
+            logger.error(f'❌ Execute many error: {str(e)}')
+            logger.error(f'Query: {query}')
+            logger.error(f'Rows: {len(rows)}')
+            return None
+    
+    def fetch_all(self, query, params=None, prepared=False, row_format='dict', primary=False, raise_errors=False):
+        """
+        Fetch multiple rows (SELECT query)
+        
+        Pass prepared=True for hot, fixed SQL strings to reuse a server-side
+        prepared statement cached on the connection. row_format='tuple'
+        returns a compact ResultSet instead of a list of dicts. Reads go to
+        a replica when configured, unless primary=True or this request
+        has already written. With raise_errors=True a database error is
+        raised instead of returning an empty result, for callers that must
+        not mistake a failed read for "no rows".
+        """
+        dictionary = _check_row_format(row_format)
+        try:
+            handler = _all_rows if dictionary else _result_set
+            return self._run(query, params, handler, prepared=prepared, dictionary=dictionary, primary=primary)
+        
+        except DB_ERRORS as e:
+            if raise_errors:
+                raise
             logger.error(f'❌ Fetch all error: {str(e)}')
             logger.error(f'Query: {query}')
-            return []
+            return [] if dictionary else ResultSet((), [])
     
-    def fetch_one(self, query, params=None):
-        """Fetch single row (SELECT query)"""
+    def fetch_one(self, query, params=None, prepared=False, row_format='dict', primary=False, raise_errors=False):
+        """
+        Fetch single row (SELECT query) as a dict, or a plain tuple with row_format='tuple'
+        
+        Returns None for no row or, unless raise_errors=True, on error.
+        """
+        dictionary = _check_row_format(row_format)
         try:
-            self.reconnect_if_needed()
-            cursor = self.connection.cursor(dictionary=True)
+            return self._run(query, params, _first_row, prepared=prepared, dictionary=dictionary, primary=primary)
+        
+        except DB_ERRORS as e:
+            if raise_errors:
+                raise
+            logger.error(f'❌ Fetch one error: {str(e)}')
+            logger.error(f'Query: {query}')
+            return None
+    
+    def stream(self, query, params=None, batch_size=500, row_format='dict', primary=False):
+        """
+        Yield rows of a SELECT one at a time without buffering the whole result.
+        
+        Uses an unbuffered cursor and fetchmany(batch_size), so memory stays
+        flat regardless of result size. The connection is held until the
+        generator is exhausted or closed; if it is abandoned early the
+        connection is dropped rather than drained. Errors are raised to the
+        consumer instead of being swallowed.
+        
+        With row_format='tuple' a ResultSet wrapping the lazy row iterator
+        is returned; its columns are known once the first row is pulled.
+        """
+        if _check_row_format(row_format):
+            return self._stream(query, params, batch_size, primary)
+        
+        result = ResultSet((), None)
+        result.rows = self._stream(query, params, batch_size, primary, header=result)
+        return result
+    
+    def _stream(self, query, params, batch_size, primary, header=None):
+        pool = self._pool_for(primary)
+        try:
+            conn = pool.acquire()
+        except self.disconnect_errors + (PoolTimeoutError,) as e:
+            if pool is self.pool:
+                raise
+            logger.warning(f'⚠️ Read replica {pool.name} unavailable ({str(e)}). Falling back to primary...')
+            pool = self.pool
+            conn = pool.acquire()
+        discard = True
+        cursor = None
+        rows_read = 0
+        try:
+            self.check_liveness(conn)
+            cursor = conn.raw.cursor(dictionary=header is None)
+            started = time.perf_counter()
             
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
             
-            result = cursor.fetchone()
-            cursor.close()
-            return result
+            if header is not None:
+                header.columns = tuple(cursor.column_names)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                rows_read += len(rows)
+                yield from rows
+            
+            discard = False
+        finally:
+            if cursor is not None and not discard:
+                _close_quietly(cursor)
+            pool.release(conn, discard=discard)
         
-        except Error as e:
-            logger.error(f'❌ Fetch one error: {str(e)}')
-            logger.error(f'Query: {query}')
-            return None
+        # Timed until the consumer drained the stream, so includes serialization
+        self._observe(query, params, started, rows_read)
     
     def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            logger.info('Database connection closed')
+        """Close all pooled database connections"""
+        if self.pool:
+            self.pool.close()
+            logger.info('Database connection pool closed')
+        for replica in self.replicas:
+            replica.close()
 
 # Global database instance
 db = Database()
@@ -0,0 +1,23 @@
+"""
+Composite indexes for the issue list queries.
+
+Every list filters issues by citizen and/or status and orders by
+created_at, id (the keyset in utils/pagination.py), so each index ends
+with those two columns and a page is one range scan with no sort. The
+single-column citizen_id index becomes redundant: the new citizen index
+starts with the same column and serves the foreign key too. MySQL
+databases created from the earlier schema.sql already have the two citizen
+indexes under their unprefixed names; those copies are dropped as well.
+"""
+from config.migrations import create_index, drop_index, is_mysql
+
+
+def upgrade():
+    create_index('issues', 'issues_citizen_created', ['citizen_id', 'created_at', 'id'])
+    create_index('issues', 'issues_citizen_status_created', ['citizen_id', 'status', 'created_at', 'id'])
+    create_index('issues', 'issues_status_created', ['status', 'created_at', 'id'])
+    if is_mysql():
+        for index in ('citizen_id', 'citizen_created', 'citizen_status_created'):
+            drop_index('issues', index)
+    else:
+        drop_index('issues', 'issues_citizen_id')
@@ -0,0 +1,102 @@
+"""
+Replace the free-text issues.category with an integer category_id.
+
+Category names that are not in issue_categories yet are added first, then
+category_id is filled in batches of BATCH ids so no single statement
+locks a large table for long. Issues with a NULL or blank category are
+filed under DEFAULT_CATEGORY. The name column is dropped at the end;
+responses take the name from issue_categories instead.
+"""
+import logging
+from config.database import db
+from config.migrations import ddl, columns, create_index, is_mysql, MigrationError
+
+logger = logging.getLogger(__name__)
+
+BATCH = 10000
+
+# Seeded by schema.sql; created here if a database lacks it
+DEFAULT_CATEGORY = 'Others'
+
+
+def _backfill():
+    ddl('''INSERT INTO issue_categories (name)
+        SELECT DISTINCT category FROM issues
+        WHERE TRIM(category) <> '' AND category NOT IN (SELECT name FROM issue_categories)''')
+    ddl(
+        '''INSERT INTO issue_categories (name)
+        SELECT %s FROM issues
+        WHERE (category IS NULL OR TRIM(category) = '')
+        AND NOT EXISTS (SELECT 1 FROM issue_categories WHERE name = %s)
+        LIMIT 1''',
+        (DEFAULT_CATEGORY, DEFAULT_CATEGORY)
+    )
+
+    bounds = db.fetch_one('SELECT MIN(id) AS low, MAX(id) AS high FROM issues', primary=True, raise_errors=True)
+    if bounds['low'] is None:
+        return
+    low, high = bounds['low'], bounds['high']
+    for start in range(low, high + 1, BATCH):
+        ddl(
+            '''UPDATE issues
+            SET category_id = COALESCE(
+                (SELECT c.id FROM issue_categories c WHERE c.name = issues.category),
+                (SELECT c.id FROM issue_categories c WHERE c.name = %s)
+            )
+            WHERE category_id IS NULL AND id BETWEEN %s AND %s''',
+            (DEFAULT_CATEGORY, start, start + BATCH - 1)
+        )
+        logger.info(f'📍 [MIGRATE] category_id filled up to issue {min(start + BATCH - 1, high)} of {high}')
+
+
+def _check_filled():
+    """Fail before the schema changes if any issue is still without a category_id"""
+    (missing,) = db.fetch_one(
+        'SELECT COUNT(*) FROM issues WHERE category_id IS NULL',
+        row_format='tuple',
+        primary=True,
+        raise_errors=True
+    )
+    if missing:
+        raise MigrationError(f'{missing} issues have no category_id; fix them and run the migration again')
+
+
+def _foreign_key_exists(table, name):
+    row = db.fetch_one(
+        '''SELECT 1 AS found FROM information_schema.table_constraints
+        WHERE table_schema = DATABASE() AND table_name = %s
+        AND constraint_name = %s AND constraint_type = 'FOREIGN KEY' ''',
+        (table, name),
+        primary=True,
+        raise_errors=True
+    )
+    return bool(row)
+
+
+def upgrade():
+    existing = columns('issues')
+
+    if 'category_id' not in existing:
+        logger.info('📍 [MIGRATE] Adding issues.category_id...')
+        if is_mysql():
+            ddl('ALTER TABLE issues ADD COLUMN category_id INT NULL AFTER citizen_id')
+        else:
+            # SQLite only accepts the reference when the column is added
+            ddl('ALTER TABLE issues ADD COLUMN category_id INTEGER REFERENCES issue_categories (id)')
+
+    if 'category' in existing:
+        _backfill()
+    _check_filled()
+
+    # Before the foreign key, so MySQL uses this index for it instead of adding its own
+    create_index('issues', 'issues_category_created', ['category_id', 'created_at', 'id'])
+
+    if is_mysql():
+        ddl('ALTER TABLE issues MODIFY category_id INT NOT NULL')
+        if not _foreign_key_exists('issues', 'issues_category_fk'):
+            ddl('''ALTER TABLE issues ADD CONSTRAINT issues_category_fk
+                FOREIGN KEY (category_id) REFERENCES issue_categories (id) ON DELETE RESTRICT''')
+
+    if 'category' in existing:
+        logger.info('📍 [MIGRATE] Dropping issues.category...')
+        ddl('ALTER TABLE issues DROP COLUMN category')
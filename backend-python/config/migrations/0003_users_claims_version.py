@@ -0,0 +1,19 @@
+"""
+Per-user version of the authorization claims signed into tokens.
+
+Tokens carry the user's claims_version; the auth middleware only trusts
+their role and category claims while it still matches users.claims_version.
+Anything that changes a user's role or category assignments bumps it, so
+that user's outstanding tokens fall back to database lookups at once
+instead of staying authorized as before until they expire.
+"""
+import logging
+from config.migrations import ddl, columns
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    if 'claims_version' not in columns('users'):
+        logger.info('📍 [MIGRATE] Adding users.claims_version...')
+        ddl('ALTER TABLE users ADD COLUMN claims_version INT NOT NULL DEFAULT 1')
@@ -0,0 +1,160 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module in this package named NNNN_description.py with
+an upgrade() function. Applied versions are recorded in schema_migrations;
+tools/migrate.py (or app startup with DB_AUTO_MIGRATE=true) applies
+whatever is pending, in order. MySQL cannot roll back DDL, so every step
+checks the current schema first (see the helpers below, which raise on
+database errors rather than report a column or index as missing) and a
+migration that failed half way can simply be run again.
+
+schema.sql and sqlite_schema.sql describe the fully migrated schema and
+record every version as applied, so fresh databases start up to date.
+"""
+import os
+import re
+import importlib
+import logging
+from config.database import db
+
+logger = logging.getLogger(__name__)
+
+_MODULE_RE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+
+class MigrationError(Exception):
+    """Raised when a schema change fails"""
+    pass
+
+
+class Migration:
+    __slots__ = ('version', 'name', 'module')
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    def upgrade(self):
+        self.module.upgrade()
+
+
+def discover():
+    """All migrations in this package, oldest first"""
+    migrations = []
+    for filename in sorted(os.listdir(os.path.dirname(__file__))):
+        match = _MODULE_RE.match(filename)
+        if match:
+            module = importlib.import_module(f'{__name__}.{filename[:-3]}')
+            migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    return migrations
+
+
+def ensure_table():
+    ddl('''CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def applied_versions(create=True):
+    """
+    Versions recorded in schema_migrations; raises on database errors.
+
+    With create=False a missing table means nothing is applied, and the
+    check stays read-only (app startup uses this).
+    """
+    if create:
+        ensure_table()
+    elif not table_exists('schema_migrations'):
+        return set()
+    rows = db.fetch_all('SELECT version FROM schema_migrations', row_format='tuple', primary=True, raise_errors=True)
+    return {version for (version,) in rows}
+
+
+def pending(create=True):
+    applied = applied_versions(create)
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+def migrate(target=None):
+    """Apply pending migrations up to `target` (all if None); returns the versions applied"""
+    done = []
+    for migration in pending():
+        if target is not None and migration.version > target:
+            break
+        logger.info(f'📍 [MIGRATE] {migration.version:04d} {migration.name}...')
+        migration.upgrade()
+        ddl(
+            'INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, NOW())',
+            (migration.version, migration.name)
+        )
+        logger.info(f'✅ [MIGRATE] {migration.version:04d} {migration.name} applied')
+        done.append(migration.version)
+    return done
+
+
+# ============================================================================
+# Helpers for migration modules
+# ============================================================================
+
+def ddl(query, params=None):
+    """Run a schema or data change, raising MigrationError if it fails"""
+    result = db.execute_query(query, params)
+    if result is None:
+        raise MigrationError(f'Schema change failed: {query}')
+    return result
+
+
+def is_mysql():
+    return db.backend.name == 'mysql'
+
+
+def columns(table):
+    return db.fetch_all(f'SELECT * FROM {table} LIMIT 0', row_format='tuple', primary=True, raise_errors=True).columns
+
+
+def table_exists(table):
+    if is_mysql():
+        query = '''SELECT 1 FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = %s'''
+    else:
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s"
+    return db.fetch_one(query, (table,), row_format='tuple', primary=True, raise_errors=True) is not None
+
+
+def index_exists(table, index):
+    if is_mysql():
+        row = db.fetch_one(
+            '''SELECT 1 AS found FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1''',
+            (table, index),
+            primary=True,
+            raise_errors=True
+        )
+    else:
+        row = db.fetch_one(
+            "SELECT 1 AS found FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, index),
+            primary=True,
+            raise_errors=True
+        )
+    return bool(row)
+
+
+def create_index(table, index, index_columns):
+    if index_exists(table, index):
+        logger.info(f'📍 [MIGRATE] Index {index} already exists')
+        return
+    logger.info(f'📍 [MIGRATE] Creating index {index} on {table} ({", ".join(index_columns)})...')
+    ddl(f'CREATE INDEX {index} ON {table} ({", ".join(index_columns)})')
+
+
+def drop_index(table, index):
+    if not index_exists(table, index):
+        return
+    logger.info(f'📍 [MIGRATE] Dropping index {index}...')
+    ddl(f'DROP INDEX {index} ON {table}' if is_mysql() else f'DROP INDEX {index}')
@@ -0,0 +1,172 @@
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out before the timeout"""
+    pass
+
+
+class PooledConnection:
+    """A raw DB-API connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ('raw', 'created_at', 'last_used', 'statements')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Per-connection prepared statement cache, owned by the Database layer
+        self.statements = None
+
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception as e:
+            logger.debug(f'Error closing pooled connection: {e}')
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections
+
+    Connections are created lazily by `factory` up to `max_size`, the first
+    `min_size` are opened eagerly. Idle connections are reused LIFO so the
+    hottest ones stay warm, and any connection older than `max_lifetime`
+    seconds is closed instead of being handed out again.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=5, timeout=10, max_lifetime=1800, name='pool'):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.name = name
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        self._fill()
+
+    def _fill(self):
+        """Open connections until min_size is reached"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = PooledConnection(self.factory())
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logger.error(f'❌ [{self.name}] Could not open connection: {e}')
+                return
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def _expired(self, conn):
+        return self.max_lifetime and conn.age() > self.max_lifetime
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        stale = []
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError(f'Pool {self.name} is closed')
+
+                conn = None
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate):
+                        self._size -= 1
+                        stale.append(candidate)
+                        continue
+                    conn = candidate
+                    break
+
+                if conn is not None:
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f'Timed out after {timeout}s waiting for a connection from {self.name}'
+                    )
+                self._cond.wait(remaining)
+
+        for old in stale:
+            old.close()
+
+        if conn is not None:
+            return conn
+
+        try:
+            return PooledConnection(self.factory())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if `discard` is set"""
+        with self._cond:
+            if discard or self._closed or self._expired(conn):
+                self._size -= 1
+                self._cond.notify()
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+
+        conn.close()
+        # Keep the warm floor even when connections are being recycled
+        self._fill()
+
+    def in_use(self):
+        """Approximate number of checked-out connections, read without locking"""
+        return self._size - len(self._idle)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size
+            }
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,141 @@
+import re
+import threading
+import logging
+from collections import deque
+from functools import lru_cache
+from flask import has_request_context, request
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('slow_query')
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """Normalize a statement so every call of the same shape shares one bucket"""
+    text = _STRING_RE.sub('?', query)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    # IN (?, ?, ?) and multi-row VALUES collapse regardless of length
+    text = _LIST_RE.sub('(...)', text)
+    text = _ROWS_RE.sub('(...)', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def current_route():
+    """Method and URL rule of the request being served, if any"""
+    if not has_request_context():
+        return None
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return f'{request.method} {rule}'
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _Histogram:
+    __slots__ = ('count', 'rows', 'total_ms', 'max_ms', 'samples', 'plan')
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Most recent durations; percentiles are computed over this window
+        self.samples = deque(maxlen=sample_size)
+        self.plan = None
+
+
+class QueryStats:
+    """
+    Per-fingerprint timing histograms plus a slow-query log.
+
+    Every statement run through Database is recorded with its duration and
+    row count. Statements slower than `slow_ms` are written to the
+    'slow_query' logger with the route that issued them.
+    """
+
+    def __init__(self, slow_ms=200, explain=False, sample_size=1024):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.sample_size = sample_size
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, duration_ms, rows):
+        """
+        Record one execution.
+
+        Returns True when the statement was slow, EXPLAIN is enabled and no
+        plan has been captured for its fingerprint yet; the caller then runs
+        EXPLAIN and hands the result to attach_plan().
+        """
+        key = fingerprint(query)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.sample_size)
+            histogram.count += 1
+            histogram.rows += rows
+            histogram.total_ms += duration_ms
+            histogram.max_ms = max(histogram.max_ms, duration_ms)
+            histogram.samples.append(duration_ms)
+
+            if duration_ms < self.slow_ms:
+                return False
+            want_plan = self.explain and histogram.plan is None
+            if want_plan:
+                # Claim it so concurrent slow calls don't all run EXPLAIN
+                histogram.plan = []
+
+        slow_logger.warning(
+            f'🐢 [SLOW_QUERY] {duration_ms:.1f}ms rows={rows} '
+            f'route={current_route() or "-"} query={key}'
+        )
+        return want_plan and query.lstrip()[:6].upper() == 'SELECT'
+
+    def attach_plan(self, query, plan):
+        key = fingerprint(query)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is not None:
+                histogram.plan = plan
+        slow_logger.warning(f'🐢 [SLOW_QUERY] Plan for {key}: {plan}')
+
+    def snapshot(self):
+        """Summary per fingerprint, slowest p95 first"""
+        with self._lock:
+            items = [
+                (key, h.count, h.rows, h.total_ms, h.max_ms, sorted(h.samples), h.plan)
+                for key, h in self._histograms.items()
+            ]
+
+        summary = []
+        for key, count, rows, total_ms, max_ms, ordered, plan in items:
+            summary.append({
+                'query': key,
+                'count': count,
+                'rows': rows,
+                'avg_ms': round(total_ms / count, 3) if count else 0.0,
+                'p50_ms': round(_percentile(ordered, 0.50), 3),
+                'p95_ms': round(_percentile(ordered, 0.95), 3),
+                'p99_ms': round(_percentile(ordered, 0.99), 3),
+                'max_ms': round(max_ms, 3),
+                'plan': plan or None
+            })
+        summary.sort(key=lambda entry: entry['p95_ms'], reverse=True)
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
@@ -0,0 +1,121 @@
+-- SQLite stand-in for backend/config/schema.sql, used by DB_BACKEND=sqlite.
+--
+-- Mirrors the MySQL tables, plus the columns and the `comments` table the
+-- Flask routes query that the MySQL dump predates (officials.issue_category_id,
+-- issue_categories escalation settings). Timestamps are declared TIMESTAMP so
+-- they come back as datetime objects like they do from mysql.connector.
+
+CREATE TABLE users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name VARCHAR(255) NOT NULL,
+  email VARCHAR(255) NOT NULL UNIQUE,
+  password VARCHAR(255) NOT NULL,
+  role TEXT NOT NULL CHECK (role IN ('citizen', 'official', 'higherofficial')),
+  created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  claims_version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE citizens (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  address TEXT,
+  phone VARCHAR(20) DEFAULT NULL
+);
+CREATE INDEX citizens_user_id ON citizens (user_id);
+
+CREATE TABLE issue_categories (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name VARCHAR(255) NOT NULL UNIQUE,
+  priority VARCHAR(20) NOT NULL DEFAULT 'medium',
+  can_escalate_after_hours INTEGER NOT NULL DEFAULT 72,
+  expected_resolution_hours INTEGER NOT NULL DEFAULT 48
+);
+
+INSERT INTO issue_categories (id, name) VALUES
+  (1, 'Road Repair'), (2, 'Water Leak'), (3, 'Garbage Collection'),
+  (4, 'Street Light Issue'), (5, 'Drainage Problems'), (6, 'Noise Complaint'),
+  (7, 'Parking Violation'), (8, 'Public Safety'), (9, 'Traffic Signal'),
+  (10, 'Others');
+
+CREATE TABLE officials (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  department VARCHAR(255) NOT NULL DEFAULT '',
+  reports_to INTEGER DEFAULT NULL REFERENCES officials (id) ON DELETE SET NULL,
+  issue_category_id INTEGER DEFAULT NULL REFERENCES issue_categories (id)
+);
+CREATE INDEX officials_user_id ON officials (user_id);
+CREATE INDEX officials_reports_to ON officials (reports_to);
+
+CREATE TABLE issues (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  citizen_id INTEGER NOT NULL REFERENCES citizens (id) ON DELETE CASCADE,
+  category_id INTEGER NOT NULL REFERENCES issue_categories (id) ON DELETE RESTRICT,
+  description TEXT NOT NULL,
+  status TEXT DEFAULT 'created',
+  created_by INTEGER NOT NULL REFERENCES users (id) ON DELETE RESTRICT,
+  updated_by INTEGER NOT NULL REFERENCES users (id) ON DELETE RESTRICT,
+  created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+-- List queries filter on these and page by (created_at, id), see config/migrations/0001
+CREATE INDEX issues_citizen_created ON issues (citizen_id, created_at, id);
+CREATE INDEX issues_citizen_status_created ON issues (citizen_id, status, created_at, id);
+CREATE INDEX issues_category_created ON issues (category_id, created_at, id);
+CREATE INDEX issues_status_created ON issues (status, created_at, id);
+CREATE INDEX issues_created_by ON issues (created_by);
+CREATE INDEX issues_updated_by ON issues (updated_by);
+
+CREATE TABLE issue_comments (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  issue_id INTEGER NOT NULL REFERENCES issues (id) ON DELETE CASCADE,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  comment TEXT NOT NULL,
+  timestamp TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX issue_comments_issue_id ON issue_comments (issue_id);
+CREATE INDEX issue_comments_user_id ON issue_comments (user_id);
+
+CREATE TABLE comments (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  issue_id INTEGER NOT NULL REFERENCES issues (id) ON DELETE CASCADE,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  comment_text TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX comments_issue_id ON comments (issue_id);
+
+CREATE TABLE attachments (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  issue_id INTEGER DEFAULT NULL REFERENCES issues (id) ON DELETE CASCADE,
+  comment_id INTEGER DEFAULT NULL REFERENCES comments (id) ON DELETE CASCADE,
+  filename VARCHAR(255) NOT NULL,
+  mimetype VARCHAR(100) NOT NULL,
+  -- SHA-256 of the bytes held in the blob store (utils/blob_store.py)
+  content_hash CHAR(64) NOT NULL,
+  size INTEGER NOT NULL DEFAULT 0,
+  -- pending until utils/ingest.py has moved the bytes into the blob store
+  status VARCHAR(10) NOT NULL DEFAULT 'stored'
+);
+CREATE INDEX attachments_issue_id ON attachments (issue_id);
+CREATE INDEX attachments_comment_id ON attachments (comment_id);
+CREATE INDEX attachments_content_hash ON attachments (content_hash);
+CREATE INDEX attachments_status ON attachments (status);
+
+CREATE TABLE token_revocations (
+  jti VARCHAR(64) NOT NULL PRIMARY KEY,
+  user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+  expires_at TIMESTAMP NOT NULL,
+  revoked_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX token_revocations_expires_at ON token_revocations (expires_at);
+
+-- Versions from config/migrations already reflected above
+CREATE TABLE schema_migrations (
+  version INTEGER NOT NULL PRIMARY KEY,
+  name VARCHAR(255) NOT NULL,
+  applied_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+INSERT INTO schema_migrations (version, name) VALUES (1, 'issue_list_indexes'), (2, 'issue_category_id'), (3, 'users_claims_version');
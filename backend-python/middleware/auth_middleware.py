@@ -1,63 +1,280 @@
 from functools import wraps
 from flask import request, jsonify
+from config.database import db, DB_ERRORS
+from middleware.revocation import revocations
+from utils.cache import TTLCache
 import jwt
 import os
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Read once at import; app.py loads .env before the blueprints import this
+JWT_SECRET = os.getenv('JWT_SECRET')
+if not JWT_SECRET:
+    logger.error('❌ JWT_SECRET is not set, every token will be rejected')
+
+# Verified token payloads keyed by SHA-256 of the token, expiring at the token's exp
+token_cache = TTLCache(
+    capacity=int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('AUTH_TOKEN_CACHE_TTL', 3600))
+)
+
+# Resolved principals are reused across requests for this many seconds. The
+# cache is per process: the write paths call invalidate_principal(), and
+# other workers (or changes made straight in the database) catch up within
+# AUTH_PRINCIPAL_TTL.
+principal_cache = TTLCache(
+    capacity=int(os.getenv('AUTH_PRINCIPAL_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('AUTH_PRINCIPAL_TTL', 300))
+)
+
+# Format of the authorization claims in issued tokens; bump it to make every
+# outstanding token fall back to database lookups until it is reissued
+CLAIMS_VERSION = int(os.getenv('AUTH_CLAIMS_VERSION', 1))
+
+# user_id -> users.claims_version, which bump_claims_version() increments on
+# every role or assignment change. Claims signed with an older version are
+# ignored; other workers see a bump within AUTH_PRINCIPAL_TTL.
+claims_versions = TTLCache(
+    capacity=int(os.getenv('AUTH_PRINCIPAL_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('AUTH_PRINCIPAL_TTL', 300))
+)
+
+# issue_categories id -> name, loaded on first use
+_category_names = {}
+
+
+class Principal:
+    """Who is making the request: user, role, citizen profile and handled categories"""
+
+    __slots__ = ('user_id', 'role', 'citizen_id', 'category_ids', 'category_names')
+
+    def __init__(self, user_id, role, citizen_id=None, category_ids=(), category_names=()):
+        self.user_id = user_id
+        self.role = role
+        self.citizen_id = citizen_id
+        self.category_ids = tuple(category_ids)
+        self.category_names = tuple(category_names)
+
+    @property
+    def is_higher_official(self):
+        return self.role in ('higher_official', 'higherofficial')
+
+
 def verify_token(token):
-    """Verify JWT token"""
+    """Verify JWT token, skipping the signature check for recently verified tokens"""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(
             token,
-            os.getenv('JWT_SECRET'),
+            JWT_SECRET,
             algorithms=['HS256']
         )
+        token_cache.put(key, payload, expires_at=payload.get('exp'))
         return payload
     except jwt.ExpiredSignatureError:
-        return {'error': 'Token expired. Please login again.'}
+        return {'error': 'Token has expired'}
     except jwt.InvalidTokenError:
-        return {'error': 'Invalid token. Please login again.'}
+        return {'error': 'Invalid token'}
+
+
+def load_principal(user_id):
+    """Resolve a user's principal from the database (None if the user is gone)"""
+    user = db.fetch_one(
+        '''SELECT u.id, u.role, u.claims_version, c.id as citizen_id
+        FROM users u
+        LEFT JOIN citizens c ON c.user_id = u.id
+        WHERE u.id = %s''',
+        (user_id,),
+        prepared=True
+    )
+    if not user:
+        return None
+    claims_versions.put(user_id, user['claims_version'])
+
+    categories = []
+    if user['role'] == 'official':
+        categories = db.fetch_all(
+            '''SELECT ic.id, ic.name
+            FROM officials o
+            JOIN issue_categories ic ON o.issue_category_id = ic.id
+            WHERE o.user_id = %s''',
+            (user_id,),
+            prepared=True
+        )
+
+    return Principal(
+        user['id'],
+        user['role'],
+        citizen_id=user['citizen_id'],
+        category_ids=[category['id'] for category in categories],
+        category_names=[category['name'] for category in categories]
+    )
+
+
+def category_names(category_ids):
+    """Names for category ids, reloading the small issue_categories table on a miss"""
+    global _category_names
+    if any(category_id not in _category_names for category_id in category_ids):
+        rows = db.fetch_all('SELECT id, name FROM issue_categories', row_format='tuple')
+        _category_names = {category_id: name for category_id, name in rows}
+    return [_category_names[category_id] for category_id in category_ids if category_id in _category_names]
+
+
+def authorization_claims(role, claims_version, citizen_id=None, category_ids=()):
+    """Claims generate_token embeds so requests can authorize without lookups"""
+    return {
+        'role': role,
+        'citizenId': citizen_id,
+        'categoryIds': list(category_ids),
+        'cv': CLAIMS_VERSION,
+        'uv': claims_version
+    }
+
+
+def current_claims_version(user_id):
+    """Cached users.claims_version (None if the user is gone); raises on database errors"""
+    version = claims_versions.get(user_id)
+    if version is None:
+        row = db.fetch_one(
+            'SELECT claims_version FROM users WHERE id = %s',
+            (user_id,),
+            prepared=True,
+            row_format='tuple',
+            raise_errors=True
+        )
+        if row is None:
+            return None
+        version = row[0]
+        claims_versions.put(user_id, version)
+    return version
+
+
+def bump_claims_version(tx, user_id):
+    """
+    Mark the claims in a user's outstanding tokens as stale.
+
+    Call inside the transaction that changes the user's role or category
+    assignments, and invalidate_principal() once it has committed.
+    """
+    tx.execute_query('UPDATE users SET claims_version = claims_version + 1 WHERE id = %s', (user_id,))
 
-def auth_required(f):
-    """Decorator to require authentication"""
+
+def principal_from_claims(payload):
+    """Principal built from token claims, or None if they are missing or stale"""
+    if payload.get('cv') != CLAIMS_VERSION:
+        return None
+    if payload.get('uv') is None or payload.get('uv') != current_claims_version(payload.get('userId')):
+        return None
+    
+    role = payload.get('role')
+    if role == 'citizen' and not payload.get('citizenId'):
+        return None
+    
+    category_ids = payload.get('categoryIds') or ()
+    return Principal(
+        payload.get('userId'),
+        role,
+        citizen_id=payload.get('citizenId'),
+        category_ids=category_ids,
+        category_names=category_names(category_ids) if category_ids else ()
+    )
+
+
+def get_principal(user_id):
+    """Cached load_principal()"""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = load_principal(user_id)
+        if principal is not None:
+            principal_cache.put(user_id, principal)
+    return principal
+
+
+def invalidate_principal(user_id=None):
+    """Call after a user's profile or category assignments change (all users if None)"""
+    global _category_names
+    if user_id is None:
+        principal_cache.clear()
+        claims_versions.clear()
+        _category_names = {}
+    else:
+        principal_cache.pop(user_id)
+        claims_versions.pop(user_id)
+
+
+def token_required(f):
+    """
+    Decorator to authenticate the Bearer token and resolve the principal.
+
+    Rejects revoked tokens, then sets request.user (token payload),
+    request.user_id and request.principal.
+    """
     @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Get token from header
+    def decorated(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
-        
         if not auth_header or not auth_header.startswith('Bearer '):
-            logger.warning('❌ No token provided')
-            return jsonify({
-                'success': False,
-                'message': 'No token provided. Please login first.'
-            }), 401
-        
+            logger.warning('❌ [TOKEN_REQUIRED] No token provided')
+            return jsonify({'success': False, 'message': 'Token is missing'}), 401
+
         token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        # Verify token
         payload = verify_token(token)
-        
         if 'error' in payload:
-            logger.warning(f'❌ Token error: {payload["error"]}')
-            return jsonify({
-                'success': False,
-                'message': payload['error']
-            }), 401
-        
-        # Attach user info to request
+            logger.warning(f'❌ [TOKEN_REQUIRED] {payload["error"]}')
+            return jsonify({'success': False, 'message': payload['error']}), 401
+
+        user_id = payload.get('userId')
+        if not user_id:
+            logger.warning('❌ [TOKEN_REQUIRED] userId not found in token')
+            return jsonify({'success': False, 'message': 'Invalid token'}), 401
+
+        jti = payload.get('jti')
+        try:
+            revoked = bool(jti) and revocations.is_revoked(jti)
+        except DB_ERRORS as e:
+            logger.error(f'❌ [TOKEN_REQUIRED] Could not check revocation for user {user_id}: {e}')
+            return jsonify({'success': False, 'message': 'Could not verify token. Please try again.'}), 503
+        if revoked:
+            logger.warning(f'❌ [TOKEN_REQUIRED] Revoked token used by user {user_id}')
+            return jsonify({'success': False, 'message': 'Token has been revoked. Please login again.'}), 401
+
+        try:
+            # Trust current signed claims; older tokens resolve from the DB
+            principal = principal_from_claims(payload) or get_principal(user_id)
+        except Exception as e:
+            logger.error(f'❌ [TOKEN_REQUIRED] Could not resolve user {user_id}: {e}')
+            return jsonify({'success': False, 'message': 'Token validation failed'}), 401
+
+        if principal is None:
+            logger.warning(f'❌ [TOKEN_REQUIRED] User {user_id} no longer exists')
+            return jsonify({'success': False, 'message': 'Invalid token'}), 401
+
         request.user = payload
-        
+        request.user_id = user_id
+        request.principal = principal
+        logger.info(f'✅ [TOKEN_REQUIRED] Token verified for user: {user_id} ({principal.role})')
+
         return f(*args, **kwargs)
-    
-    return decorated_function
+
+    return decorated
+
+
+# Older name kept for existing imports
+auth_required = token_required
+
 
 def citizen_required(f):
-    """Decorator to require citizen role"""
+    """Decorator to require citizen role (use after token_required)"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not hasattr(request, 'user') or request.user.get('role') != 'citizen':
+        principal = getattr(request, 'principal', None)
+        if principal is None or principal.role != 'citizen':
             return jsonify({
                 'success': False,
                 'message': 'Access denied. Citizens only.'
@@ -65,11 +282,13 @@ def citizen_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+
 def official_required(f):
-    """Decorator to require official role"""
+    """Decorator to require official role (use after token_required)"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not hasattr(request, 'user') or request.user.get('role') not in ['official', 'higherofficial']:
+        principal = getattr(request, 'principal', None)
+        if principal is None or principal.role not in ['official', 'higherofficial']:
             return jsonify({
                 'success': False,
                 'message': 'Access denied. Officials only.'
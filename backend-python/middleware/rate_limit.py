@@ -0,0 +1,120 @@
+from functools import wraps
+from flask import request, jsonify
+import os
+import math
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# false turns auth throttling off, e.g. for in-process benchmarks whose
+# clients all share one address
+AUTH_RATE_LIMIT = os.getenv('AUTH_RATE_LIMIT', 'true').lower() == 'true'
+
+
+class RateLimiter:
+    """
+    Per-key token bucket allowing `rate` requests per second with bursts of `burst`.
+
+    Each bucket is kept as a single float, the time at which it will be
+    full again (the GCRA form of a token bucket), so a million keys cost one
+    dict of floats. Buckets that have refilled are swept every
+    `sweep_interval` seconds, and the table never holds more than `max_keys`.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000, sweep_interval=60, name='limiter'):
+        self.interval = 1.0 / rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self.name = name
+        self._full_at = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def _sweep(self, now):
+        before = len(self._full_at)
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > now}
+        # Still over budget (key flood): drop the oldest tenth, dicts keep insertion order
+        if len(self._full_at) >= self.max_keys:
+            for key in list(self._full_at)[:len(self._full_at) - int(self.max_keys * 0.9)]:
+                del self._full_at[key]
+        self.evicted += before - len(self._full_at)
+        self._next_sweep = now + self.sweep_interval
+
+    def hit(self, key):
+        """Take one token for `key`; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep or len(self._full_at) >= self.max_keys:
+                self._sweep(now)
+            full_at = max(self._full_at.get(key, now), now) + self.interval
+            wait = full_at - now - self.burst * self.interval
+            if wait > 0:
+                self.rejected += 1
+                return wait
+            self._full_at[key] = full_at
+            self.allowed += 1
+            return 0
+
+    def stats(self):
+        return {
+            'keys': len(self._full_at),
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+            'evicted': self.evicted
+        }
+
+
+def _limiter(prefix, name, per_minute, burst):
+    return RateLimiter(
+        rate=float(os.getenv(f'{prefix}_PER_MIN', per_minute)) / 60,
+        burst=int(os.getenv(f'{prefix}_BURST', burst)),
+        max_keys=int(os.getenv('AUTH_RATE_MAX_KEYS', 100000)),
+        name=name
+    )
+
+
+ip_limiter = _limiter('AUTH_RATE_IP', 'ip', 30, 10)
+email_limiter = _limiter('AUTH_RATE_EMAIL', 'email', 10, 5)
+
+
+def rate_limit_stats():
+    return {limiter.name: limiter.stats() for limiter in (ip_limiter, email_limiter)}
+
+
+def auth_rate_limited(f):
+    """
+    Decorator throttling credential endpoints per client IP and per email.
+
+    Runs before the view, so over-limit attempts never reach the database
+    or bcrypt; they get 429 with Retry-After.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not AUTH_RATE_LIMIT:
+            return f(*args, **kwargs)
+
+        wait = ip_limiter.hit(request.remote_addr or '-')
+        if not wait:
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            if isinstance(email, str) and email.strip():
+                wait = email_limiter.hit(email.strip().lower())
+
+        if wait:
+            logger.warning(f'⚠️ [RATE_LIMIT] {request.path} throttled for {request.remote_addr}')
+            response = jsonify({
+                'success': False,
+                'message': 'Too many attempts. Please try again later.'
+            })
+            response.headers['Retry-After'] = str(math.ceil(wait))
+            return response, 429
+
+        return f(*args, **kwargs)
+
+    return decorated
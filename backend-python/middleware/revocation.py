@@ -0,0 +1,173 @@
+from config.database import db, DB_ERRORS
+import os
+import math
+import time
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for `capacity` items at `error_rate`"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: two 64-bit halves of one digest give every probe
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Revoked token ids (jti) from the token_revocations table.
+
+    is_revoked() first asks an in-memory Bloom filter, so tokens that were
+    never revoked cost a few hashes and no query; only filter hits are
+    confirmed against the table. A background thread started by start()
+    rebuilds the filter from unexpired rows every `refresh_interval`
+    seconds, which is how revocations made by other processes arrive. A
+    failed rebuild keeps the previous filter; until the first one succeeds
+    every token is checked against the table.
+
+    When that check cannot reach the database is_revoked() raises, so the
+    request is refused rather than a possibly revoked token accepted;
+    fail_open=True trades that for availability and treats the token as
+    not revoked.
+    """
+
+    def __init__(self, refresh_interval=30, error_rate=0.001, fail_open=False):
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self.fail_open = fail_open
+        self._filter = BloomFilter(1024, error_rate)
+        self._loaded = False
+        self._count = 0
+        self._lock = threading.Lock()
+        # jtis revoked in this process while a rebuild runs, added to the new filter
+        self._revoked_during_rebuild = None
+        self._thread = None
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+        self.refresh_failures = 0
+
+    def refresh(self):
+        """Rebuild the filter from unexpired revocations and purge expired ones; raises on DB errors"""
+        with self._lock:
+            self._revoked_during_rebuild = []
+        try:
+            if db.execute_query('DELETE FROM token_revocations WHERE expires_at < NOW()') is None:
+                logger.warning('⚠️ [REVOCATION] Could not purge expired revocations')
+            rows = db.fetch_all('SELECT jti FROM token_revocations', row_format='tuple', primary=True, raise_errors=True)
+            # Leave headroom so revocations added before the next rebuild keep the error rate
+            bloom = BloomFilter(max(1024, len(rows) * 2), self.error_rate)
+            for (jti,) in rows:
+                bloom.add(jti)
+            with self._lock:
+                for jti in self._revoked_during_rebuild:
+                    bloom.add(jti)
+                self._filter = bloom
+                self._count = len(rows)
+                self._loaded = True
+        finally:
+            with self._lock:
+                self._revoked_during_rebuild = None
+        logger.info(f'✅ [REVOCATION] Filter rebuilt with {len(rows)} revoked tokens')
+
+    def _refresh_safely(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f'❌ [REVOCATION] Filter rebuild failed, keeping the previous one: {e}')
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self._refresh_safely()
+
+    def start(self):
+        """Load the filter and keep rebuilding it in a background thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='revocation-refresh', daemon=True)
+        self._refresh_safely()
+        self._thread.start()
+        logger.info(f'✅ Token revocation refresh started (every {self.refresh_interval:g}s)')
+
+    def revoke(self, jti, user_id, expires_at):
+        """Record a revoked token until `expires_at` (epoch seconds)"""
+        result = db.execute_query(
+            '''INSERT INTO token_revocations (jti, user_id, expires_at, revoked_at)
+            VALUES (%s, %s, %s, NOW())''',
+            (jti, user_id, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(expires_at)))
+        )
+        if result is None:
+            return False
+        with self._lock:
+            self._filter.add(jti)
+            if self._revoked_during_rebuild is not None:
+                self._revoked_during_rebuild.append(jti)
+            self._count += 1
+        return True
+
+    def is_revoked(self, jti):
+        """Whether `jti` was revoked; raises DB_ERRORS if that cannot be checked (unless fail_open)"""
+        self.checks += 1
+        if self._loaded and jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        try:
+            row = db.fetch_one(
+                'SELECT 1 AS revoked FROM token_revocations WHERE jti = %s',
+                (jti,),
+                prepared=True,
+                primary=True,
+                raise_errors=True
+            )
+        except DB_ERRORS as e:
+            if not self.fail_open:
+                raise
+            logger.warning(f'⚠️ [REVOCATION] Could not check {jti[:8]}, accepting it: {e}')
+            return False
+        if row:
+            self.confirmed += 1
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'loaded': self._loaded,
+            'revoked': self._count,
+            'filter_bits': self._filter.size,
+            'filter_hashes': self._filter.hashes,
+            'checks': self.checks,
+            'filter_hits': self.filter_hits,
+            'confirmed': self.confirmed,
+            'refresh_failures': self.refresh_failures
+        }
+
+
+revocations = RevocationList(
+    refresh_interval=float(os.getenv('AUTH_REVOCATION_REFRESH', 30)),
+    error_rate=float(os.getenv('AUTH_REVOCATION_ERROR_RATE', 0.001)),
+    fail_open=os.getenv('AUTH_REVOCATION_FAIL_OPEN', 'false').lower() == 'true'
+)
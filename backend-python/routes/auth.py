@@ -1,11 +1,20 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
+import io
 import jwt
-import bcrypt
+import uuid
 import logging
-import os
-from config.database import db
-from utils.validators import validate_all, ValidationError
+from config.database import db, DB_ERRORS
+from middleware.auth_middleware import (
+    token_required, authorization_claims, bump_claims_version, invalidate_principal, JWT_SECRET
+)
+from middleware.rate_limit import auth_rate_limited
+from middleware.revocation import revocations
+from utils import passwords
+from utils.citizen_import import parse_records, submit_import, get_job
+from utils.passwords import HasherBusyError
+from utils.uploads import upload_limits
+from utils.validators import validate_all, validate_name, validate_phone, validate_address, ValidationError
 
 
 logger = logging.getLogger(__name__)
@@ -13,41 +22,51 @@ auth_bp = Blueprint('auth', __name__)
 
 
 def hash_password(password):
-    """Hash password using bcrypt"""
+    """Hash password using bcrypt (raises HasherBusyError when the pool is saturated)"""
     try:
-        salt = bcrypt.gensalt(rounds=10)
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return passwords.hasher.hash(password)
+    except HasherBusyError:
+        raise
     except Exception as e:
         logger.error(f'Password hashing error: {str(e)}')
         return None
 
 
 def verify_password(plain_password, hashed_password):
-    """Verify password against hash"""
+    """Verify password against hash (raises HasherBusyError when the pool is saturated)"""
     try:
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'),
-            hashed_password.encode('utf-8')
-        )
+        return passwords.hasher.verify(plain_password, hashed_password)
+    except HasherBusyError:
+        raise
     except Exception as e:
         logger.error(f'Password verification error: {str(e)}')
         return False
 
 
-def generate_token(user_id, role, citizen_id=None):
-    """Generate JWT token"""
+def busy_response(tag):
+    """503 for requests shed because the bcrypt pool is saturated"""
+    logger.warning(f'⚠️ [{tag}] Password hashing pool saturated, shedding request')
+    response = jsonify({
+        'success': False,
+        'message': 'Server is busy. Please try again in a moment.'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def generate_token(user_id, role, claims_version, citizen_id=None, category_ids=()):
+    """Generate JWT token carrying the user's authorization claims"""
     try:
         payload = {
             'userId': user_id,
-            'role': role,
-            'citizenId': citizen_id,
+            **authorization_claims(role, claims_version, citizen_id, category_ids),
+            'jti': uuid.uuid4().hex,
             'iat': datetime.utcnow(),
             'exp': datetime.utcnow() + timedelta(days=7)
         }
         token = jwt.encode(
             payload,
-            os.getenv('JWT_SECRET'),
+            JWT_SECRET,
             algorithm='HS256'
         )
         return token
@@ -56,25 +75,11 @@ def generate_token(user_id, role, citizen_id=None):
         return None
 
 
-def verify_token(token):
-    """Verify JWT token"""
-    try:
-        payload = jwt.decode(
-            token,
-            os.getenv('JWT_SECRET'),
-            algorithms=['HS256']
-        )
-        return payload
-    except jwt.ExpiredSignatureError:
-        return {'error': 'Token expired'}
-    except jwt.InvalidTokenError:
-        return {'error': 'Invalid token'}
-
-
 # ============================================================================
 # REGISTER ENDPOINT
 # ============================================================================
 @auth_bp.route('/register', methods=['POST'])
+@auth_rate_limited
 def register():
     """Register a new citizen"""
     
@@ -112,7 +117,8 @@ def register():
         logger.info(f'📍 [REGISTER] Checking if email exists: {email}')
         existing_user = db.fetch_one(
             'SELECT id FROM users WHERE email = %s',
-            (email,)
+            (email,),
+            primary=True
         )
         
         if existing_user:
@@ -137,47 +143,40 @@ def register():
         
         logger.info('✅ [REGISTER] Password hashed')
         
-        # Step 1: Insert into users table
+        # Steps 1 & 2: Insert into users and citizens tables as one unit of work
         logger.info('📍 [REGISTER] Step 1: Inserting into users table...')
-        user_result = db.execute_query(
-            '''INSERT INTO users (name, email, password, role)
-               VALUES (%s, %s, %s, %s)''',
-            (name, email, hashed_password, 'citizen')
-        )
-        
-        if not user_result:
-            logger.error('❌ [REGISTER] Users table insert failed')
+        try:
+            with db.transaction() as tx:
+                user_result = tx.execute_query(
+                    '''INSERT INTO users (name, email, password, role)
+                       VALUES (%s, %s, %s, %s)''',
+                    (name, email, hashed_password, 'citizen')
+                )
+                user_id = user_result['last_id']
+                logger.info(f'✅ [REGISTER] User created in users table: ID={user_id}')
+                
+                # Step 2: Insert into citizens table with phone and address
+                logger.info('📍 [REGISTER] Step 2: Inserting into citizens table...')
+                citizen_result = tx.execute_query(
+                    '''INSERT INTO citizens (user_id, phone, address)
+                       VALUES (%s, %s, %s)''',
+                    (user_id, phone, address)
+                )
+                citizen_id = citizen_result['last_id']
+                claims_version = tx.fetch_one('SELECT claims_version FROM users WHERE id = %s', (user_id,))['claims_version']
+        except DB_ERRORS as db_error:
+            # The transaction was rolled back, so no orphaned users row is left behind
+            logger.error(f'❌ [REGISTER] Account creation failed: {db_error}')
             return jsonify({
                 'success': False,
                 'message': 'Error creating user account'
             }), 500
         
-        user_id = user_result['last_id']
-        logger.info(f'✅ [REGISTER] User created in users table: ID={user_id}')
-        
-        # Step 2: Insert into citizens table with phone and address
-        logger.info('📍 [REGISTER] Step 2: Inserting into citizens table...')
-        citizen_result = db.execute_query(
-            '''INSERT INTO citizens (user_id, phone, address)
-               VALUES (%s, %s, %s)''',
-            (user_id, phone, address)
-        )
-        
-        if not citizen_result:
-            logger.error('❌ [REGISTER] Citizens table insert failed')
-            # Rollback: delete from users if citizen creation fails
-            db.execute_query('DELETE FROM users WHERE id = %s', (user_id,))
-            return jsonify({
-                'success': False,
-                'message': 'Error creating citizen profile'
-            }), 500
-        
-        citizen_id = citizen_result['last_id']
         logger.info(f'✅ [REGISTER] Citizen created in citizens table: ID={citizen_id}')
         
         # Step 3: Generate token
         logger.info('📍 [REGISTER] Step 3: Generating JWT token...')
-        token = generate_token(user_id, 'citizen', citizen_id)
+        token = generate_token(user_id, 'citizen', claims_version, citizen_id)
         
         if not token:
             logger.error('❌ [REGISTER] Token generation failed')
@@ -206,6 +205,9 @@ def register():
             }
         }), 201
     
+    except HasherBusyError:
+        return busy_response('REGISTER')
+    
     except Exception as e:
         logger.error('=' * 60)
         logger.error(f'❌ [REGISTER] ERROR: {str(e)}')
@@ -225,6 +227,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
+@auth_rate_limited
 def login():
     """Login user"""
     
@@ -249,9 +252,11 @@ def login():
         
         # Find user
         logger.info(f'📍 [LOGIN] Searching for user: {email}')
+        # Read from the primary so a just-registered account can log in at once
         user = db.fetch_one(
-            'SELECT id, name, email, password, role FROM users WHERE email = %s',
-            (email,)
+            'SELECT id, name, email, password, role, claims_version FROM users WHERE email = %s',
+            (email,),
+            primary=True
         )
         
         if not user:
@@ -278,6 +283,7 @@ def login():
         citizen_id = None
         phone = None
         address = None
+        category_ids = []
         redirect_path = None  # ADD THIS
         
         if user['role'] == 'citizen':
@@ -303,7 +309,7 @@ def login():
         # HANDLE OFFICIAL LOGIN
         elif user['role'] == 'official':
             logger.info(f'📍 [LOGIN] Fetching official details for user: {user["id"]}')
-            official = db.fetch_one(
+            official_categories = db.fetch_all(
                 '''SELECT o.id, o.issue_category_id, ic.name as category_name
                 FROM officials o
                 JOIN issue_categories ic ON o.issue_category_id = ic.id
@@ -311,15 +317,16 @@ def login():
                 (user['id'],)
             )
             
-            if not official:
+            if not official_categories:
                 logger.warning(f'❌ [LOGIN] Official profile not found for user: {email}')
                 return jsonify({
                     'success': False,
                     'message': 'Official profile not found. Contact support.'
                 }), 500
             
+            category_ids = [official['issue_category_id'] for official in official_categories]
             redirect_path = '/official/dashboard'  # ADD THIS
-            logger.info(f'✅ [LOGIN] Official found with category: {official["category_name"]}')
+            logger.info(f'✅ [LOGIN] Official found with categories: {[official["category_name"] for official in official_categories]}')
         
         # HANDLE HIGHER OFFICIAL LOGIN
         elif user['role'] in ['higher_official', 'higherofficial']:
@@ -329,7 +336,7 @@ def login():
         
         # Generate token
         logger.info('📍 [LOGIN] Generating JWT token...')
-        token = generate_token(user['id'], user['role'], citizen_id)
+        token = generate_token(user['id'], user['role'], user['claims_version'], citizen_id, category_ids)
         
         if not token:
             logger.error('❌ [LOGIN] Failed to generate token')
@@ -359,6 +366,9 @@ def login():
             }
         }), 200
     
+    except HasherBusyError:
+        return busy_response('LOGIN')
+    
     except Exception as e:
         logger.error('=' * 60)
         logger.error(f'❌ [LOGIN] UNEXPECTED ERROR: {str(e)}')
@@ -372,12 +382,184 @@ def login():
         }), 500
 
 
+# ============================================================================
+# BULK CITIZEN IMPORT ENDPOINT
+# ============================================================================
+
+
+@auth_bp.route('/import-citizens', methods=['POST'])
+@token_required
+@upload_limits
+def import_citizens_endpoint():
+    """
+    Bulk-create citizens in the background (higher officials only)
+    POST /api/auth/import-citizens
+    
+    Body: multipart `file` upload or a raw request body, as CSV with a
+    name,email,password,phone,address header or as JSONL with those keys.
+    The format follows ?format=csv|jsonl, else the file extension or
+    Content-Type.
+    
+    The file is parsed here and imported by a background thread, so the
+    response comes back at once:
+    {
+        "success": true,
+        "job": {"id": "...", "status": "queued", "rows": 3, ...},
+        "status_url": "/api/auth/import-citizens/<job id>"
+    }
+    Poll status_url for the summary and per-row errors.
+    """
+    
+    try:
+        logger.info('=' * 60)
+        logger.info('📍 [IMPORT_CITIZENS] Request received')
+        logger.info('=' * 60)
+        
+        if not request.principal.is_higher_official:
+            logger.warning(f'❌ [IMPORT_CITIZENS] Unauthorized: user {request.user_id} is {request.principal.role}')
+            return jsonify({
+                'success': False,
+                'message': 'Only higher officials can import citizens'
+            }), 403
+        
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+            hint = (upload.filename or '').lower()
+        else:
+            stream = io.BytesIO(request.get_data())
+            hint = request.mimetype or ''
+        
+        fmt = request.args.get('format') or ('jsonl' if hint.endswith(('.jsonl', '.ndjson', 'ndjson', 'jsonl')) else 'csv')
+        if fmt not in ('csv', 'jsonl'):
+            return jsonify({
+                'success': False,
+                'message': 'format must be csv or jsonl'
+            }), 400
+        
+        logger.info(f'📍 [IMPORT_CITIZENS] Reading {fmt} upload')
+        # Read now: the upload is closed once this request ends
+        records = list(parse_records(stream, fmt))
+        job = submit_import(records, request.user_id)
+        
+        logger.info('=' * 60)
+        logger.info(f'✅ [IMPORT_CITIZENS] Job {job["id"]} queued with {len(records)} rows')
+        logger.info('=' * 60)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Import of {len(records)} rows started',
+            'job': import_job_response(job),
+            'status_url': f'/api/auth/import-citizens/{job["id"]}'
+        }), 202
+    
+    except Exception as e:
+        logger.error('=' * 60)
+        logger.error(f'❌ [IMPORT_CITIZENS] ERROR: {str(e)}')
+        logger.error('=' * 60)
+        import traceback
+        logger.error(traceback.format_exc())
+        
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+
+def import_job_response(job):
+    response = {
+        'id': job['id'],
+        'status': job['status'],
+        'rows': job['rows'],
+        'created': job['created'],
+        'pending': job['pending']
+    }
+    if job['status'] == 'done':
+        result = job['result']
+        response['summary'] = {
+            'total': result['total'],
+            'created': result['created'],
+            'rejected': result['rejected']
+        }
+        response['errors'] = result['errors']
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return response
+
+
+@auth_bp.route('/import-citizens/<job_id>', methods=['GET'])
+@token_required
+def import_citizens_status(job_id):
+    """
+    Status of a bulk import started on this server process
+    GET /api/auth/import-citizens/<job_id>
+    """
+    if not request.principal.is_higher_official:
+        return jsonify({
+            'success': False,
+            'message': 'Only higher officials can import citizens'
+        }), 403
+    
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Import job not found or expired'
+        }), 404
+    
+    return jsonify({'success': True, 'job': import_job_response(job)}), 200
+
+
+# ============================================================================
+# LOGOUT ENDPOINT
+# ============================================================================
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout():
+    """Revoke the presented token until it expires"""
+    
+    try:
+        logger.info('📍 [LOGOUT] Request received')
+        
+        jti = request.user.get('jti')
+        if not jti:
+            logger.warning(f'❌ [LOGOUT] Token for user {request.user_id} has no jti')
+            return jsonify({
+                'success': False,
+                'message': 'This token cannot be revoked. Please login again.'
+            }), 400
+        
+        if not revocations.revoke(jti, request.user_id, request.user['exp']):
+            logger.error(f'❌ [LOGOUT] Could not revoke token for user {request.user_id}')
+            return jsonify({
+                'success': False,
+                'message': 'Error logging out'
+            }), 500
+        
+        logger.info(f'✅ [LOGOUT] Token revoked for user {request.user_id}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logged out successfully'
+        }), 200
+    
+    except Exception as e:
+        logger.error(f'❌ [LOGOUT] Error: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+
 # ============================================================================
 # GET PROFILE ENDPOINT
 # ============================================================================
 
 
 @auth_bp.route('/profile', methods=['GET'])
+@token_required
 def get_profile():
     """
     Get user profile
@@ -401,31 +583,7 @@ def get_profile():
     try:
         logger.info('📍 [PROFILE] Request received')
         
-        # Get token from header
-        auth_header = request.headers.get('Authorization')
-        
-        if not auth_header or not auth_header.startswith('Bearer '):
-            logger.warning('❌ [PROFILE] No token provided')
-            return jsonify({
-                'success': False,
-                'message': 'No token provided. Please login first.'
-            }), 401
-        
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        logger.info('📍 [PROFILE] Verifying token...')
-        
-        # Verify token
-        payload = verify_token(token)
-        
-        if 'error' in payload:
-            logger.warning(f'❌ [PROFILE] Token error: {payload["error"]}')
-            return jsonify({
-                'success': False,
-                'message': payload['error']
-            }), 401
-        
-        user_id = payload.get('userId')
-        logger.info(f'✅ [PROFILE] Token verified for user: {user_id}')
+        user_id = request.user_id
         
         # Fetch user
         logger.info(f'📍 [PROFILE] Fetching user {user_id} details...')
@@ -458,3 +616,180 @@ def get_profile():
             'success': False,
             'message': f'Server error: {str(e)}'
         }), 500
+
+
+@auth_bp.route('/profile', methods=['PUT'])
+@token_required
+def update_profile():
+    """
+    Update the caller's name, and phone/address for citizens
+    PUT /api/auth/profile
+    
+    Body (any subset): {"name": "...", "phone": "9876543210", "address": "..."}
+    """
+    
+    try:
+        logger.info('📍 [UPDATE_PROFILE] Request received')
+        
+        user_id = request.user_id
+        principal = request.principal
+        data = request.get_json() or {}
+        
+        validators = {'name': validate_name, 'phone': validate_phone, 'address': validate_address}
+        fields = {}
+        errors = []
+        for field, validate in validators.items():
+            if data.get(field) is None:
+                continue
+            value = str(data[field]).strip()
+            try:
+                validate(value)
+                fields[field] = value
+            except ValidationError as e:
+                errors.append({'field': field, 'message': str(e)})
+        
+        if not errors and not fields:
+            errors.append({'field': None, 'message': 'Nothing to update'})
+        if principal.role != 'citizen' and ('phone' in fields or 'address' in fields):
+            errors.append({'field': 'phone', 'message': 'Only citizens have a phone and address'})
+        if errors:
+            logger.warning(f'❌ [UPDATE_PROFILE] Validation failed: {errors}')
+            return jsonify({
+                'success': False,
+                'message': 'Validation failed',
+                'errors': errors
+            }), 400
+        
+        with db.transaction() as tx:
+            if 'name' in fields:
+                tx.execute_query(
+                    'UPDATE users SET name = %s, updated_at = NOW() WHERE id = %s',
+                    (fields['name'], user_id)
+                )
+            citizen_fields = [field for field in ('phone', 'address') if field in fields]
+            if citizen_fields:
+                tx.execute_query(
+                    f'UPDATE citizens SET {", ".join(f"{field} = %s" for field in citizen_fields)} WHERE id = %s',
+                    tuple(fields[field] for field in citizen_fields) + (principal.citizen_id,)
+                )
+        invalidate_principal(user_id)
+        
+        logger.info(f'✅ [UPDATE_PROFILE] Updated {", ".join(fields)} for user {user_id}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Profile updated successfully'
+        }), 200
+    
+    except DB_ERRORS as db_error:
+        logger.error(f'❌ [UPDATE_PROFILE] Database error, changes rolled back: {db_error}')
+        return jsonify({
+            'success': False,
+            'message': 'Error updating profile'
+        }), 500
+    
+    except Exception as e:
+        logger.error(f'❌ [UPDATE_PROFILE] Error: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+
+# ============================================================================
+# OFFICIAL ASSIGNMENT ENDPOINT
+# ============================================================================
+
+
+@auth_bp.route('/officials/<int:official_user_id>/categories', methods=['PUT'])
+@token_required
+def assign_official_categories(official_user_id):
+    """
+    Set the issue categories an official handles (higher officials only)
+    PUT /api/auth/officials/<user_id>/categories
+    
+    Body: {"category_ids": [1, 4]}
+    """
+    
+    try:
+        logger.info(f'📍 [ASSIGN_OFFICIAL] Request received for user {official_user_id}')
+        
+        if not request.principal.is_higher_official:
+            logger.warning(f'❌ [ASSIGN_OFFICIAL] Unauthorized: user {request.user_id} is {request.principal.role}')
+            return jsonify({
+                'success': False,
+                'message': 'Only higher officials can assign categories'
+            }), 403
+        
+        data = request.get_json() or {}
+        category_ids = data.get('category_ids')
+        if (not isinstance(category_ids, list) or not category_ids
+                or not all(isinstance(category_id, int) for category_id in category_ids)):
+            return jsonify({
+                'success': False,
+                'message': 'category_ids must be a non-empty list of category ids'
+            }), 400
+        category_ids = sorted(set(category_ids))
+        
+        with db.transaction() as tx:
+            official = tx.fetch_one('SELECT role FROM users WHERE id = %s', (official_user_id,))
+            if not official or official['role'] != 'official':
+                logger.warning(f'❌ [ASSIGN_OFFICIAL] User {official_user_id} is not an official')
+                return jsonify({
+                    'success': False,
+                    'message': 'Official not found'
+                }), 404
+            
+            placeholders = ', '.join(['%s'] * len(category_ids))
+            known = tx.fetch_all(
+                f'SELECT id FROM issue_categories WHERE id IN ({placeholders})',
+                tuple(category_ids)
+            )
+            if len(known) != len(category_ids):
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid category selected'
+                }), 400
+            
+            current = tx.fetch_all(
+                'SELECT id, department, issue_category_id FROM officials WHERE user_id = %s ORDER BY id ASC',
+                (official_user_id,)
+            )
+            department = current[0]['department'] if current else ''
+            assigned = {row['issue_category_id'] for row in current}
+            
+            # Rows for kept categories stay, so reports_to links to them survive
+            tx.execute_query(
+                f'DELETE FROM officials WHERE user_id = %s AND (issue_category_id IS NULL OR issue_category_id NOT IN ({placeholders}))',
+                (official_user_id,) + tuple(category_ids)
+            )
+            for category_id in category_ids:
+                if category_id not in assigned:
+                    tx.execute_query(
+                        'INSERT INTO officials (user_id, department, issue_category_id) VALUES (%s, %s, %s)',
+                        (official_user_id, department, category_id)
+                    )
+            bump_claims_version(tx, official_user_id)
+        invalidate_principal(official_user_id)
+        
+        logger.info(f'✅ [ASSIGN_OFFICIAL] User {official_user_id} now handles categories {category_ids}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Categories assigned successfully',
+            'category_ids': category_ids
+        }), 200
+    
+    except DB_ERRORS as db_error:
+        logger.error(f'❌ [ASSIGN_OFFICIAL] Database error, changes rolled back: {db_error}')
+        return jsonify({
+            'success': False,
+            'message': 'Error assigning categories'
+        }), 500
+    
+    except Exception as e:
+        logger.error(f'❌ [ASSIGN_OFFICIAL] Error: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from functools import wraps
-from config.database import db
-import jwt
+from config.database import db, DB_ERRORS
+from middleware.auth_middleware import token_required
+from utils.blob_store import blob_store
+from utils.uploads import upload_limits
+from utils.derivatives import derivatives, DERIVATIVES, DERIVATIVE_MIMETYPE
+from utils.ingest import ingester, PENDING, STORED
+from utils.responses import stream_json_response, send_blob
+from utils.pagination import keyset_page, page_limit, CursorError
 import os
 import logging
 
@@ -10,39 +15,66 @@ logger = logging.getLogger(__name__)
 
 issues_bp = Blueprint('issues', __name__, url_prefix='/api/issues')
 
-JWT_SECRET = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-this')
 
-def token_required(f):
-    """Decorator to verify JWT token from Authorization header"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            logger.warning('❌ [TOKEN_REQUIRED] No token provided')
-            return jsonify({'success': False, 'message': 'Token is missing'}), 401
-        
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        try:
-            logger.info('📍 [TOKEN_REQUIRED] Verifying token...')
-            # Decode using same secret as auth.py
-            data = jwt.decode(token, os.getenv('JWT_SECRET'), algorithms=['HS256'])
-            request.user_id = data.get('userId')  # Use userId (capital U)
-            if not request.user_id:
-                logger.warning('❌ [TOKEN_REQUIRED] userId not found in token')
-                return jsonify({'success': False, 'message': 'Invalid token'}), 401
-            logger.info(f'✅ [TOKEN_REQUIRED] Token verified for user: {request.user_id}')
-        except jwt.ExpiredSignatureError:
-            logger.warning('❌ [TOKEN_REQUIRED] Token has expired')
-            return jsonify({'success': False, 'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            logger.warning('❌ [TOKEN_REQUIRED] Invalid token')
-            return jsonify({'success': False, 'message': 'Invalid token'}), 401
-        except Exception as e:
-            logger.error(f'❌ [TOKEN_REQUIRED] Token validation error: {e}')
-            return jsonify({'success': False, 'message': 'Token validation failed'}), 401
-        
-        return f(*args, **kwargs)
-    return decorated
+def stage_uploads(files, tag):
+    """
+    Stage uploaded files for ingestion.
+
+    Returns (filename, mimetype, content_hash, size, staged_name) tuples;
+    the first four are the attachments row values.
+    """
+    staged_files = []
+    for file in files:
+        if file and file.filename:
+            try:
+                content_hash, size, staged_name = ingester.stage(file.stream)
+                mimetype = file.content_type or 'application/octet-stream'
+                staged_files.append((file.filename, mimetype, content_hash, size, staged_name))
+            except Exception as file_error:
+                logger.warning(f'⚠️  [{tag}] Error staging {file.filename}: {file_error}')
+    return staged_files
+
+
+def submit_uploads(staged_files):
+    """Hand committed attachments to the ingest workers"""
+    for filename, mimetype, content_hash, size, staged_name in staged_files:
+        ingester.submit(content_hash, mimetype)
+
+
+def discard_uploads(staged_files):
+    """Remove staged files whose attachment rows were never committed"""
+    for filename, mimetype, content_hash, size, staged_name in staged_files:
+        ingester.discard(staged_name)
+
+
+# Expansions for GET /<issue_id>?include=...; without the parameter only attachments are sent
+ISSUE_INCLUDES = ('attachments', 'comments', 'comment_attachments')
+DEFAULT_ISSUE_INCLUDES = frozenset(['attachments'])
+
+
+def parse_includes(value):
+    """Set of ISSUE_INCLUDES named in a comma separated `include`, or None if one is unknown"""
+    if value is None:
+        return DEFAULT_ISSUE_INCLUDES
+    includes = {name.strip() for name in value.split(',') if name.strip()}
+    if not includes <= set(ISSUE_INCLUDES):
+        return None
+    if 'comment_attachments' in includes:
+        includes.add('comments')
+    return includes
+
+
+def attachment_dict(row):
+    """Attachment metadata as sent to clients"""
+    return {
+        'id': row['id'],
+        'filename': row['filename'],
+        'mimetype': row['mimetype'],
+        'size': row['size'],
+        'status': row['status'],
+        # Clients can fetch /attachment/<id>/thumb instead of the original
+        'has_preview': derivatives.supports(row['mimetype'])
+    }
 
 
 @issues_bp.route('/categories', methods=['GET'])
@@ -51,9 +83,9 @@ def get_categories():
     """Fetch all issue categories"""
     try:
         logger.info('📍 [GET_CATEGORIES] Request received')
-        categories = db.fetch_all('SELECT id, name FROM issue_categories ORDER BY name ASC')
+        categories = db.fetch_all('SELECT id, name FROM issue_categories ORDER BY name ASC', row_format='tuple')
         logger.info(f'✅ [GET_CATEGORIES] Found {len(categories)} categories')
-        return jsonify({'success': True, 'data': categories}), 200
+        return stream_json_response(categories)
     except Exception as error:
         logger.error(f'❌ [GET_CATEGORIES] Error: {error}')
         return jsonify({'success': False, 'message': 'Error fetching categories', 'error': str(error)}), 500
@@ -61,6 +93,7 @@ def get_categories():
 
 @issues_bp.route('/create', methods=['POST'])
 @token_required
+@upload_limits
 def create_issue():
     """Create a new issue"""
     try:
@@ -88,19 +121,17 @@ def create_issue():
             logger.warning('❌ [CREATE_ISSUE] Category is required')
             return jsonify({'success': False, 'message': 'Category is required'}), 400
         
-        # Get citizen_id
-        logger.info('📍 [CREATE_ISSUE] Getting citizen_id...')
-        citizen = db.fetch_one('SELECT id FROM citizens WHERE user_id = %s', (user_id,))
-        if not citizen:
+        # citizen_id comes from the principal resolved by token_required
+        citizen_id = request.principal.citizen_id
+        if not citizen_id:
             logger.warning(f'❌ [CREATE_ISSUE] Citizen profile not found for user {user_id}')
             return jsonify({'success': False, 'message': 'Citizen profile not found'}), 404
         
-        citizen_id = citizen['id']
         logger.info(f'✅ [CREATE_ISSUE] Citizen ID: {citizen_id}')
         
         # Get category name
         logger.info('📍 [CREATE_ISSUE] Getting category name...')
-        category = db.fetch_one('SELECT name FROM issue_categories WHERE id = %s', (category_id,))
+        category = db.fetch_one('SELECT id, name FROM issue_categories WHERE id = %s', (category_id,))
         if not category:
             logger.warning(f'❌ [CREATE_ISSUE] Invalid category: {category_id}')
             return jsonify({'success': False, 'message': 'Invalid category selected'}), 400
@@ -108,41 +139,44 @@ def create_issue():
         category_name = category['name']
         logger.info(f'✅ [CREATE_ISSUE] Category: {category_name}')
         
-        # Create issue
-        logger.info('📍 [CREATE_ISSUE] Creating issue in database...')
-        result = db.execute_query(
-            '''INSERT INTO issues 
-            (citizen_id, category, description, status, created_by, updated_by, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())''',
-            (citizen_id, category_name, description, 'created', user_id, user_id)
-        )
+        # Stage attachments; they reach the blob store after the response is sent
+        staged_files = stage_uploads(files, 'CREATE_ISSUE')
         
-        if not result:
-            logger.error('❌ [CREATE_ISSUE] Failed to create issue')
+        # Issue and pending attachment rows are committed together
+        logger.info('📍 [CREATE_ISSUE] Creating issue in database...')
+        attachments = []
+        committed = False
+        try:
+            with db.transaction() as tx:
+                result = tx.execute_query(
+                    '''INSERT INTO issues 
+                    (citizen_id, category_id, description, status, created_by, updated_by, created_at, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())''',
+                    (citizen_id, category['id'], description, 'created', user_id, user_id)
+                )
+                issue_id = result['last_id']
+                
+                if staged_files:
+                    tx.execute_many(
+                        '''INSERT INTO attachments 
+                        (issue_id, filename, mimetype, content_hash, size, status)
+                        VALUES (%s, %s, %s, %s, %s, %s)''',
+                        [(issue_id,) + staged[:4] + (PENDING,) for staged in staged_files]
+                    )
+                    attachments = tx.fetch_all(
+                        'SELECT id, filename, mimetype, size, status FROM attachments WHERE issue_id = %s ORDER BY id ASC',
+                        (issue_id,)
+                    )
+            committed = True
+        except DB_ERRORS as db_error:
+            logger.error(f'❌ [CREATE_ISSUE] Database error, changes rolled back: {db_error}')
             return jsonify({'success': False, 'message': 'Error creating issue'}), 500
+        finally:
+            if not committed:
+                discard_uploads(staged_files)
         
-        issue_id = result['last_id']
-        logger.info(f'✅ [CREATE_ISSUE] Issue created with ID: {issue_id}')
-        
-        # Handle attachments
-        if files:
-            logger.info(f'📍 [CREATE_ISSUE] Processing {len(files)} attachments...')
-            for file in files:
-                if file.filename:
-                    try:
-                        file_content = file.read()
-                        file_type = file.content_type
-                        file_name = file.filename
-                        
-                        db.execute_query(
-                            '''INSERT INTO attachments 
-                            (issue_id, filename, mimetype, data)
-                            VALUES (%s, %s, %s, %s)''',
-                            (issue_id, file_name, file_type, file_content)
-                        )
-                        logger.info(f'✅ [CREATE_ISSUE] Attachment uploaded: {file_name}')
-                    except Exception as file_error:
-                        logger.warning(f'⚠️  [CREATE_ISSUE] Error uploading {file_name}: {file_error}')
+        logger.info(f'✅ [CREATE_ISSUE] Issue created with ID: {issue_id}, {len(attachments)} attachments pending')
+        submit_uploads(staged_files)
         
         logger.info('=' * 60)
         logger.info('✅ [CREATE_ISSUE] SUCCESS')
@@ -155,9 +189,11 @@ def create_issue():
                 'id': issue_id,
                 'citizen_id': citizen_id,
                 'category': category_name,
+                'category_id': category['id'],
                 'description': description,
                 'status': 'created',
-                'created_at': datetime.now().isoformat()
+                'created_at': datetime.now().isoformat(),
+                'attachments': attachments
             }
         }), 201
         
@@ -173,49 +209,38 @@ def create_issue():
 @issues_bp.route('/my-issues', methods=['GET'])
 @token_required
 def get_my_issues():
-    """Get all issues for citizen"""
+    """Get the citizen's issues, newest first (?cursor= for other pages, ?count=true for a total)"""
     try:
         logger.info('📍 [GET_MY_ISSUES] Request received')
         user_id = request.user_id
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-        offset = (page - 1) * limit
+        limit = page_limit(request.args.get('limit', type=int))
+        cursor = request.args.get('cursor')
+        with_count = request.args.get('count', 'false').lower() == 'true'
         
-        # Get citizen_id
-        citizen = db.fetch_one('SELECT id FROM citizens WHERE user_id = %s', (user_id,))
-        if not citizen:
+        # citizen_id comes from the principal resolved by token_required
+        citizen_id = request.principal.citizen_id
+        if not citizen_id:
             logger.warning(f'❌ [GET_MY_ISSUES] Citizen not found for user {user_id}')
             return jsonify({'success': False, 'message': 'Citizen profile not found'}), 404
         
-        citizen_id = citizen['id']
-        
-        # Get issues
-        issues = db.fetch_all(
-            '''SELECT id, category, description, status, created_at, updated_at
-            FROM issues
-            WHERE citizen_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s''',
-            (citizen_id, limit, offset)
+        issues, pagination = keyset_page(
+            'issues i JOIN issue_categories c ON c.id = i.category_id',
+            'i.id, c.name AS category, i.category_id, i.description, i.status, i.created_at, i.updated_at',
+            'i.citizen_id = %s',
+            (citizen_id,),
+            limit,
+            cursor=cursor,
+            count=with_count,
+            alias='i'
         )
         
-        # Get total count
-        total_result = db.fetch_one('SELECT COUNT(*) as total FROM issues WHERE citizen_id = %s', (citizen_id,))
-        total_count = total_result['total'] if total_result else 0
-        
         logger.info(f'✅ [GET_MY_ISSUES] Found {len(issues)} issues for citizen {citizen_id}')
         
-        return jsonify({
-            'success': True,
-            'data': issues,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total_count,
-                'pages': (total_count + limit - 1) // limit
-            }
-        }), 200
+        return stream_json_response(issues, pagination=pagination)
         
+    except CursorError:
+        logger.warning('❌ [GET_MY_ISSUES] Invalid cursor')
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
     except Exception as error:
         logger.error(f'❌ [GET_MY_ISSUES] Error: {error}')
         return jsonify({'success': False, 'message': 'Error fetching issues', 'error': str(error)}), 500
@@ -223,30 +248,39 @@ def get_my_issues():
 @issues_bp.route('/<int:issue_id>', methods=['GET'])
 @token_required
 def get_issue_details(issue_id):
-    """Get issue details with attachments"""
+    """
+    Get issue details with attachments, and optionally its comments.
+
+    ?include=attachments,comments,comment_attachments expands the response
+    so the issue page needs one request instead of two; whatever is asked
+    for costs at most three queries (issue, attachments, comments).
+    """
     try:
         logger.info('=' * 60)
         logger.info(f'📍 [GET_ISSUE] Request for issue {issue_id}')
         logger.info('=' * 60)
         
-        user_id = request.user_id
+        includes = parse_includes(request.args.get('include'))
+        if includes is None:
+            return jsonify({
+                'success': False,
+                'message': f'include must be a comma separated list of: {", ".join(ISSUE_INCLUDES)}'
+            }), 400
         
-        # Get user role from database
-        user = db.fetch_one('SELECT role FROM users WHERE id = %s', (user_id,))
-        if not user:
-            logger.warning(f'❌ [GET_ISSUE] User not found: {user_id}')
-            return jsonify({'success': False, 'message': 'User not found'}), 404
+        user_id = request.user_id
         
-        user_role = user['role']
+        principal = request.principal
+        user_role = principal.role
         logger.info(f'📍 [GET_ISSUE] User role: {user_role}')
         
         # Get issue with citizen info
         logger.info(f'📍 [GET_ISSUE] Fetching issue data for ID: {issue_id}')
         issue = db.fetch_one(
-            '''SELECT i.id, i.citizen_id, i.category, i.description, i.status, 
+            '''SELECT i.id, i.citizen_id, i.category_id, ic.name AS category, i.description, i.status, 
             i.created_at, i.updated_at, c.user_id as citizen_user_id
             FROM issues i
             LEFT JOIN citizens c ON i.citizen_id = c.id
+            LEFT JOIN issue_categories ic ON i.category_id = ic.id
             WHERE i.id = %s''',
             (issue_id,)
         )
@@ -267,15 +301,7 @@ def get_issue_details(issue_id):
             
         elif user_role == 'official':
             # Officials can view issues in their assigned categories
-            official_categories = db.fetch_all(
-                '''SELECT ic.name FROM officials o
-                JOIN issue_categories ic ON o.issue_category_id = ic.id
-                WHERE o.user_id = %s''',
-                (user_id,)
-            )
-            
-            category_names = [cat['name'] for cat in official_categories]
-            if issue['category'] not in category_names:
+            if issue['category_id'] not in principal.category_ids:
                 logger.warning(f'❌ [GET_ISSUE] Official {user_id} cannot access issue {issue_id} (category mismatch)')
                 return jsonify({'success': False, 'message': 'Unauthorized access'}), 403
             logger.info(f'✅ [GET_ISSUE] Official authorized for issue {issue_id}')
@@ -288,39 +314,62 @@ def get_issue_details(issue_id):
             logger.warning(f'❌ [GET_ISSUE] Unknown user role: {user_role}')
             return jsonify({'success': False, 'message': 'Unauthorized access'}), 403
         
-        # Get attachments
-        logger.info(f'📍 [GET_ISSUE] Fetching attachments for issue {issue_id}')
-        attachments = db.fetch_all(
-            '''SELECT id, filename, mimetype
+        data = {
+            'id': issue['id'],
+            'citizen_id': issue['citizen_id'],
+            'category': issue['category'],
+            'category_id': issue['category_id'],
+            'description': issue['description'],
+            'status': issue['status'],
+            'created_at': issue['created_at'].isoformat() if issue['created_at'] else None,
+            'updated_at': issue['updated_at'].isoformat() if issue['updated_at'] else None
+        }
+        
+        # Issue and comment attachments come back from one query, split by comment_id
+        issue_attachments = []
+        comment_attachments = {}
+        if 'attachments' in includes or 'comment_attachments' in includes:
+            logger.info(f'📍 [GET_ISSUE] Fetching attachments for issue {issue_id}')
+            query = '''SELECT id, comment_id, filename, mimetype, size, status
             FROM attachments
-            WHERE issue_id = %s AND comment_id IS NULL
-            ORDER BY id ASC''',
-            (issue_id,)
-        )
-        
-        if attachments:
-            logger.info(f'✅ [GET_ISSUE] Found {len(attachments)} attachments for issue {issue_id}')
-        else:
-            logger.info(f'📍 [GET_ISSUE] No attachments found for issue {issue_id}')
-            attachments = []
+            WHERE issue_id = %s'''
+            if 'comment_attachments' not in includes:
+                query += ' AND comment_id IS NULL'
+            elif 'attachments' not in includes:
+                query += ' AND comment_id IS NOT NULL'
+            rows = db.fetch_all(query + ' ORDER BY id ASC', (issue_id,))
+            for row in rows:
+                if row['comment_id'] is None:
+                    issue_attachments.append(attachment_dict(row))
+                else:
+                    comment_attachments.setdefault(row['comment_id'], []).append(attachment_dict(row))
+            logger.info(f'✅ [GET_ISSUE] Found {len(rows)} attachments for issue {issue_id}')
+        
+        if 'attachments' in includes:
+            data['attachments'] = issue_attachments
+        
+        if 'comments' in includes:
+            logger.info(f'📍 [GET_ISSUE] Fetching comments for issue {issue_id}')
+            comments = db.fetch_all(
+                '''SELECT c.id, c.user_id, u.name, u.role, c.comment_text, c.created_at
+                FROM comments c
+                JOIN users u ON c.user_id = u.id
+                WHERE c.issue_id = %s
+                ORDER BY c.created_at ASC, c.id ASC''',
+                (issue_id,)
+            )
+            for comment in comments:
+                comment['created_at'] = comment['created_at'].isoformat() if comment['created_at'] else None
+                if 'comment_attachments' in includes:
+                    comment['attachments'] = comment_attachments.get(comment['id'], [])
+            data['comments'] = comments
+            logger.info(f'✅ [GET_ISSUE] Found {len(comments)} comments for issue {issue_id}')
         
         logger.info('=' * 60)
         logger.info(f'✅ [GET_ISSUE] SUCCESS - Issue {issue_id} retrieved')
         logger.info('=' * 60)
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'id': issue['id'],
-                'citizen_id': issue['citizen_id'],
-                'category': issue['category'],
-                'description': issue['description'],
-                'status': issue['status'],
-                'created_at': issue['created_at'].isoformat() if issue['created_at'] else None,
-                'updated_at': issue['updated_at'].isoformat() if issue['updated_at'] else None,
-                'attachments': attachments if attachments else []
-            }
-        }), 200
+        return jsonify({'success': True, 'data': data}), 200
         
     except Exception as error:
         logger.error('=' * 60)
@@ -330,45 +379,71 @@ def get_issue_details(issue_id):
         logger.error(traceback.format_exc())
         return jsonify({'success': False, 'message': 'Error fetching issue', 'error': str(error)}), 500
 
+def owns_attachment(principal, citizen_id):
+    """Attachments are downloadable by the citizen who owns the issue"""
+    return citizen_id is not None and citizen_id == principal.citizen_id
+
+
+def get_attachment(attachment_id):
+    """Attachment metadata plus its issue's owner, without touching the blob"""
+    return db.fetch_one(
+        '''SELECT a.id, a.filename, a.mimetype, a.content_hash, a.size, a.status, i.citizen_id
+        FROM attachments a
+        LEFT JOIN issues i ON a.issue_id = i.id
+        WHERE a.id = %s''',
+        (attachment_id,),
+        prepared=True
+    )
+
+
+def not_stored_response(attachment, tag):
+    """202 while an attachment is still being ingested, 404 if ingestion failed, else None"""
+    if attachment['status'] == STORED:
+        return None
+    if attachment['status'] == PENDING:
+        logger.info(f'📍 [{tag}] Attachment {attachment["id"]} is still being processed')
+        response = jsonify({'success': True, 'status': PENDING, 'message': 'Attachment is still being processed'})
+        response.headers['Retry-After'] = '2'
+        return response, 202
+    logger.warning(f'❌ [{tag}] Attachment {attachment["id"]} failed to upload')
+    return jsonify({'success': False, 'status': attachment['status'], 'message': 'Attachment upload failed'}), 404
+
+
 @issues_bp.route('/attachment/<int:attachment_id>', methods=['GET'])
 @token_required
 def download_attachment(attachment_id):
-    """Download attachment file"""
+    """Download attachment file (streamed, supports Range and If-None-Match)"""
     try:
         logger.info(f'📍 [DOWNLOAD_ATTACHMENT] Request for attachment {attachment_id}')
-        user_id = request.user_id
         
-        # Get attachment
-        attachment = db.fetch_one(
-            'SELECT id, filename, mimetype, data, issue_id FROM attachments WHERE id = %s',
-            (attachment_id,)
-        )
+        attachment = get_attachment(attachment_id)
         
         if not attachment:
             logger.warning(f'❌ [DOWNLOAD_ATTACHMENT] Attachment not found: {attachment_id}')
             return jsonify({'success': False, 'message': 'Attachment not found'}), 404
         
-        # Verify user owns this issue
-        issue = db.fetch_one(
-            'SELECT i.id, c.user_id FROM issues i JOIN citizens c ON i.citizen_id = c.id WHERE i.id = %s',
-            (attachment['issue_id'],)
-        )
-        
-        if not issue or issue['user_id'] != user_id:
+        if not owns_attachment(request.principal, attachment['citizen_id']):
             logger.warning(f'❌ [DOWNLOAD_ATTACHMENT] Unauthorized access to attachment {attachment_id}')
             return jsonify({'success': False, 'message': 'Unauthorized access'}), 403
         
-        logger.info(f'✅ [DOWNLOAD_ATTACHMENT] Sending file: {attachment["filename"]}')
+        not_stored = not_stored_response(attachment, 'DOWNLOAD_ATTACHMENT')
+        if not_stored:
+            return not_stored
         
-        # Return file as attachment
-        from flask import send_file
-        from io import BytesIO
+        try:
+            blob = blob_store.open(attachment['content_hash'])
+        except FileNotFoundError:
+            logger.error(f'❌ [DOWNLOAD_ATTACHMENT] Blob missing for attachment {attachment_id}')
+            return jsonify({'success': False, 'message': 'Attachment not found'}), 404
         
-        return send_file(
-            BytesIO(attachment['data']),
-            mimetype=attachment['mimetype'],
-            as_attachment=True,
-            download_name=attachment['filename']
+        logger.info(f'✅ [DOWNLOAD_ATTACHMENT] Sending file: {attachment["filename"]}')
+        
+        return send_blob(
+            blob,
+            attachment['size'],
+            attachment['content_hash'],
+            attachment['mimetype'],
+            attachment['filename']
         )
         
     except Exception as error:
@@ -377,10 +452,69 @@ def download_attachment(attachment_id):
         logger.error(traceback.format_exc())
         return jsonify({'success': False, 'message': 'Error downloading attachment', 'error': str(error)}), 500
 
+
+@issues_bp.route('/attachment/<int:attachment_id>/<kind>', methods=['GET'])
+@token_required
+def download_preview(attachment_id, kind):
+    """
+    Thumbnail ('thumb') or web-sized ('web') JPEG of an image attachment
+    
+    Returns 202 with Retry-After while the rendition is still being made.
+    """
+    try:
+        logger.info(f'📍 [DOWNLOAD_PREVIEW] Request for {kind} of attachment {attachment_id}')
+        
+        if kind not in DERIVATIVES:
+            return jsonify({'success': False, 'message': f'Unknown preview. Must be one of: {list(DERIVATIVES)}'}), 404
+        
+        attachment = get_attachment(attachment_id)
+        
+        if not attachment:
+            logger.warning(f'❌ [DOWNLOAD_PREVIEW] Attachment not found: {attachment_id}')
+            return jsonify({'success': False, 'message': 'Attachment not found'}), 404
+        
+        if not owns_attachment(request.principal, attachment['citizen_id']):
+            logger.warning(f'❌ [DOWNLOAD_PREVIEW] Unauthorized access to attachment {attachment_id}')
+            return jsonify({'success': False, 'message': 'Unauthorized access'}), 403
+        
+        not_stored = not_stored_response(attachment, 'DOWNLOAD_PREVIEW')
+        if not_stored:
+            return not_stored
+        
+        content_hash = attachment['content_hash']
+        try:
+            preview = blob_store.open_derivative(content_hash, kind)
+        except FileNotFoundError:
+            # Not rendered yet (queue was full, or uploaded before previews existed)
+            if not derivatives.enqueue(content_hash, attachment['mimetype']):
+                logger.info(f'📍 [DOWNLOAD_PREVIEW] No preview for attachment {attachment_id}')
+                return jsonify({'success': False, 'message': 'No preview available for this attachment'}), 404
+            
+            logger.info(f'📍 [DOWNLOAD_PREVIEW] Preview for attachment {attachment_id} is pending')
+            response = jsonify({'success': True, 'status': 'pending', 'message': 'Preview is being generated'})
+            response.headers['Retry-After'] = '2'
+            return response, 202
+        
+        preview.seek(0, os.SEEK_END)
+        size = preview.tell()
+        preview.seek(0)
+        stem = os.path.splitext(attachment['filename'])[0]
+        
+        logger.info(f'✅ [DOWNLOAD_PREVIEW] Sending {kind} ({size} bytes) for attachment {attachment_id}')
+        
+        return send_blob(preview, size, f'{content_hash}-{kind}', DERIVATIVE_MIMETYPE, f'{stem}-{kind}.jpg')
+        
+    except Exception as error:
+        logger.error(f'❌ [DOWNLOAD_PREVIEW] ERROR: {error}')
+        import traceback
+        logger.error(traceback.format_exc())
+        return jsonify({'success': False, 'message': 'Error downloading preview', 'error': str(error)}), 500
+
 # ============= NEW ENDPOINTS FOR OFFICIAL WORKFLOW =============
 
 @issues_bp.route('/<int:issue_id>/comment', methods=['POST'])
 @token_required
+@upload_limits
 def add_comment(issue_id):
     """Add a comment with optional attachments and status update"""
     try:
@@ -406,65 +540,62 @@ def add_comment(issue_id):
             return jsonify({'success': False, 'message': f'Invalid status. Must be one of: {valid_statuses}'}), 400
         
         # Verify issue exists
-        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,))
+        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,), prepared=True)
         if not issue:
             logger.warning(f'❌ [ADD_COMMENT] Issue not found: {issue_id}')
             return jsonify({'success': False, 'message': 'Issue not found'}), 404
         
         logger.info(f'✅ [ADD_COMMENT] Issue verified: {issue_id}')
         
-        # Insert comment if provided
-        comment_id = None
-        if comment_text:
-            logger.info('📍 [ADD_COMMENT] Inserting comment...')
-            try:
-                result = db.execute_query(
-                    '''INSERT INTO comments (issue_id, user_id, comment_text, created_at, updated_at)
-                    VALUES (%s, %s, %s, NOW(), NOW())''',
-                    (issue_id, user_id, comment_text)
-                )
-                comment_id = result.get('last_id', None)
-                logger.info(f'✅ [ADD_COMMENT] Comment added with ID: {comment_id}')
-            except Exception as db_error:
-                logger.error(f'❌ [ADD_COMMENT] Database error: {db_error}')
-                return jsonify({'success': False, 'message': f'Error adding comment: {str(db_error)}'}), 500
-        
-        # Update issue status
-        logger.info(f'📍 [ADD_COMMENT] Updating status to: {new_status}')
-        try:
-            db.execute_query(
-                '''UPDATE issues 
-                SET status = %s, updated_at = NOW()
-                WHERE id = %s''',
-                (new_status, issue_id)
-            )
-            logger.info(f'✅ [ADD_COMMENT] Status updated to: {new_status}')
-        except Exception as db_error:
-            logger.error(f'❌ [ADD_COMMENT] Failed to update status: {db_error}')
-            return jsonify({'success': False, 'message': f'Error updating status: {str(db_error)}'}), 500
+        # Stage attachments; they reach the blob store after the response is sent
+        staged_files = stage_uploads(request.files.getlist('attachments'), 'ADD_COMMENT')
         
-        # Handle attachments if provided
-        logger.info('📍 [ADD_COMMENT] Processing attachments...')
+        # Comment, status change and attachment rows are committed together
+        comment_id = None
         attachment_count = 0
-        if 'attachments' in request.files:
-            files = request.files.getlist('attachments')
-            logger.info(f'📍 [ADD_COMMENT] Processing {len(files)} files')
-            
-            for file in files:
-                if file and file.filename:
-                    try:
-                        file_data = file.read()
-                        mimetype = file.content_type or 'application/octet-stream'
-                        
-                        db.execute_query(
-                            '''INSERT INTO attachments (issue_id, comment_id, filename, mimetype, data)
-                            VALUES (%s, %s, %s, %s, %s)''',
-                            (issue_id, comment_id, file.filename, mimetype, file_data)
-                        )
-                        attachment_count += 1
-                        logger.info(f'✅ [ADD_COMMENT] Attachment saved: {file.filename}')
-                    except Exception as file_error:
-                        logger.error(f'❌ [ADD_COMMENT] Error saving attachment: {file_error}')
+        committed = False
+        try:
+            with db.transaction() as tx:
+                # Insert comment if provided
+                if comment_text:
+                    logger.info('📍 [ADD_COMMENT] Inserting comment...')
+                    result = tx.execute_query(
+                        '''INSERT INTO comments (issue_id, user_id, comment_text, created_at, updated_at)
+                        VALUES (%s, %s, %s, NOW(), NOW())''',
+                        (issue_id, user_id, comment_text)
+                    )
+                    comment_id = result.get('last_id', None)
+                    logger.info(f'✅ [ADD_COMMENT] Comment added with ID: {comment_id}')
+                
+                # Update issue status
+                logger.info(f'📍 [ADD_COMMENT] Updating status to: {new_status}')
+                tx.execute_query(
+                    '''UPDATE issues 
+                    SET status = %s, updated_at = NOW()
+                    WHERE id = %s''',
+                    (new_status, issue_id)
+                )
+                logger.info(f'✅ [ADD_COMMENT] Status updated to: {new_status}')
+                
+                # Handle attachments if provided
+                if staged_files:
+                    logger.info(f'📍 [ADD_COMMENT] Processing {len(staged_files)} files')
+                    saved = tx.execute_many(
+                        '''INSERT INTO attachments (issue_id, comment_id, filename, mimetype, content_hash, size, status)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)''',
+                        [(issue_id, comment_id) + staged[:4] + (PENDING,) for staged in staged_files]
+                    )
+                    attachment_count = saved['affected_rows']
+                    logger.info(f'✅ [ADD_COMMENT] {attachment_count} attachments saved')
+            committed = True
+        except DB_ERRORS as db_error:
+            logger.error(f'❌ [ADD_COMMENT] Database error, changes rolled back: {db_error}')
+            return jsonify({'success': False, 'message': f'Error saving comment: {str(db_error)}'}), 500
+        finally:
+            if not committed:
+                discard_uploads(staged_files)
+        
+        submit_uploads(staged_files)
         
         logger.info('=' * 60)
         logger.info('✅ [ADD_COMMENT] SUCCESS')
@@ -498,7 +629,7 @@ def get_comments(issue_id):
         logger.info(f'📍 [GET_COMMENTS] Fetching comments for issue {issue_id}')
         
         # Verify issue exists
-        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,))
+        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,), prepared=True)
         if not issue:
             logger.warning(f'❌ [GET_COMMENTS] Issue not found: {issue_id}')
             return jsonify({'success': False, 'message': 'Issue not found'}), 404
@@ -509,20 +640,16 @@ def get_comments(issue_id):
             JOIN users u ON c.user_id = u.id
             WHERE c.issue_id = %s
             ORDER BY c.created_at ASC''',
-            (issue_id,)
+            (issue_id,),
+            row_format='tuple'
         )
         
         if not comments:
             logger.info(f'📍 [GET_COMMENTS] No comments found for issue {issue_id}')
-            comments = []
         else:
             logger.info(f'✅ [GET_COMMENTS] Found {len(comments)} comments')
         
-        return jsonify({
-            'success': True,
-            'data': comments,
-            'count': len(comments)
-        }), 200
+        return stream_json_response(comments)
         
     except Exception as error:
         logger.error(f'❌ [GET_COMMENTS] ERROR: {error}')
@@ -552,16 +679,16 @@ def update_issue_status(issue_id):
             logger.warning(f'❌ [UPDATE_STATUS] Invalid status: {new_status}')
             return jsonify({'success': False, 'message': f'Invalid status. Must be one of: {valid_statuses}'}), 400
         
-        # Get user role
-        user = db.fetch_one('SELECT role FROM users WHERE id = %s', (user_id,))
-        if user['role'] not in ['official', 'higher_official']:
-            logger.warning(f'❌ [UPDATE_STATUS] Unauthorized: user role is {user["role"]}')
+        # Check role
+        role = request.principal.role
+        if role not in ['official', 'higher_official']:
+            logger.warning(f'❌ [UPDATE_STATUS] Unauthorized: user role is {role}')
             return jsonify({'success': False, 'message': 'Only officials can update status'}), 403
         
-        logger.info(f'✅ [UPDATE_STATUS] User authorized (role: {user["role"]})')
+        logger.info(f'✅ [UPDATE_STATUS] User authorized (role: {role})')
         
         # Verify issue exists
-        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,))
+        issue = db.fetch_one('SELECT id FROM issues WHERE id = %s', (issue_id,), prepared=True)
         if not issue:
             logger.warning(f'❌ [UPDATE_STATUS] Issue not found: {issue_id}')
             return jsonify({'success': False, 'message': 'Issue not found'}), 404
@@ -624,10 +751,10 @@ def escalate_category(issue_id):
         
         # Get issue with category info
         issue = db.fetch_one(
-            '''SELECT i.id, i.citizen_id, i.category, i.status, i.created_at,
+            '''SELECT i.id, i.citizen_id, i.category_id, ic.name AS category, i.status, i.created_at,
                       ic.priority, ic.can_escalate_after_hours, ic.expected_resolution_hours
             FROM issues i
-            LEFT JOIN issue_categories ic ON i.category = ic.name
+            LEFT JOIN issue_categories ic ON i.category_id = ic.id
             WHERE i.id = %s''',
             (issue_id,)
         )
@@ -636,8 +763,7 @@ def escalate_category(issue_id):
             return jsonify({'success': False, 'message': 'Issue not found'}), 404
         
         # Verify citizen owns this issue
-        citizen = db.fetch_one('SELECT user_id FROM citizens WHERE id = %s', (issue['citizen_id'],))
-        if not citizen or citizen['user_id'] != user_id:
+        if issue['citizen_id'] != request.principal.citizen_id:
             return jsonify({'success': False, 'message': 'Unauthorized'}), 403
         
         # Check status
@@ -664,18 +790,18 @@ def escalate_category(issue_id):
                 }
             }), 400
         
-        # Update status
-        db.execute_query(
-            'UPDATE issues SET status = %s, updated_at = NOW() WHERE id = %s',
-            ('escalated', issue_id)
-        )
-        
-        # Add comment
-        db.execute_query(
-            '''INSERT INTO comments (issue_id, user_id, comment_text, created_at)
-            VALUES (%s, %s, %s, NOW())''',
-            (issue_id, user_id, f'[CATEGORY ESCALATION - {issue["priority"].upper()}]\nReason: {reason}\n\nDetails: {note}')
-        )
+        # Update status and add comment in one transaction
+        with db.transaction() as tx:
+            tx.execute_query(
+                'UPDATE issues SET status = %s, updated_at = NOW() WHERE id = %s',
+                ('escalated', issue_id)
+            )
+            
+            tx.execute_query(
+                '''INSERT INTO comments (issue_id, user_id, comment_text, created_at)
+                VALUES (%s, %s, %s, NOW())''',
+                (issue_id, user_id, f'[CATEGORY ESCALATION - {issue["priority"].upper()}]\nReason: {reason}\n\nDetails: {note}')
+            )
         
         logger.info('✅ [CATEGORY_ESCALATE] SUCCESS')
         
@@ -724,8 +850,7 @@ def escalate_issue(issue_id):
             return jsonify({'success': False, 'message': 'Issue not found'}), 404
         
         # Verify citizen owns issue
-        citizen = db.fetch_one('SELECT user_id FROM citizens WHERE id = %s', (issue['citizen_id'],))
-        if not citizen or citizen['user_id'] != user_id:
+        if issue['citizen_id'] != request.principal.citizen_id:
             logger.warning(f'❌ [ESCALATE] Unauthorized user {user_id}')
             return jsonify({'success': False, 'message': 'Unauthorized'}), 403
         
@@ -734,19 +859,19 @@ def escalate_issue(issue_id):
             logger.warning(f'❌ [ESCALATE] Cannot escalate status: {issue["status"]}')
             return jsonify({'success': False, 'message': f'Cannot escalate {issue["status"]} issues'}), 400
         
-        # Update to escalated
-        logger.info('📍 [ESCALATE] Updating status to escalated...')
-        db.execute_query(
-            'UPDATE issues SET status = %s, updated_at = NOW() WHERE id = %s',
-            ('escalated', issue_id)
-        )
-        
-        # Add comment
-        logger.info('📍 [ESCALATE] Adding escalation comment...')
-        db.execute_query(
-            'INSERT INTO comments (issue_id, user_id, comment_text, created_at) VALUES (%s, %s, %s, NOW())',
-            (issue_id, user_id, f'[ESCALATION]\nReason: {reason}\n\nDetails: {note}')
-        )
+        # Update to escalated and add comment in one transaction
+        with db.transaction() as tx:
+            logger.info('📍 [ESCALATE] Updating status to escalated...')
+            tx.execute_query(
+                'UPDATE issues SET status = %s, updated_at = NOW() WHERE id = %s',
+                ('escalated', issue_id)
+            )
+            
+            logger.info('📍 [ESCALATE] Adding escalation comment...')
+            tx.execute_query(
+                'INSERT INTO comments (issue_id, user_id, comment_text, created_at) VALUES (%s, %s, %s, NOW())',
+                (issue_id, user_id, f'[ESCALATION]\nReason: {reason}\n\nDetails: {note}')
+            )
         
         logger.info('=' * 60)
         logger.info('✅ [ESCALATE] SUCCESS')
@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The backend reads its configuration at import time, so set it up first.
+# Nothing here forks worker processes or starts background threads.
+_scratch = tempfile.mkdtemp(prefix='citysolve360-tests-')
+os.environ.update({
+    'DB_BACKEND': 'sqlite',
+    'DB_SQLITE_PATH': os.path.join(_scratch, 'default.db'),
+    'JWT_SECRET': 'test_secret_key_minimum_32_characters_long',
+    'BLOB_STORE_PATH': os.path.join(_scratch, 'blobs'),
+    'BCRYPT_WORKERS': '0',
+    'DERIVATIVE_WORKERS': '0',
+    'AUTH_RATE_LIMIT': 'false'
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.backends import SQLiteBackend
+from config.database import Database
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """A Database on its own SQLite file with the full schema"""
+    database = Database(SQLiteBackend(str(tmp_path / 'test.db')))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def use_db(fresh_db, monkeypatch):
+    """use_db(module, ...) points each module's `db` at fresh_db and returns it"""
+    def use(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, 'db', fresh_db)
+        return fresh_db
+    return use
+
+
+def make_citizen(db, email, name='Test Citizen'):
+    """Insert a citizen account; returns (user_id, citizen_id)"""
+    user = db.execute_query(
+        "INSERT INTO users (name, email, password, role) VALUES (%s, %s, 'x', 'citizen')",
+        (name, email)
+    )
+    citizen = db.execute_query(
+        "INSERT INTO citizens (user_id, phone, address) VALUES (%s, '9876543210', 'Long Street 1')",
+        (user['last_id'],)
+    )
+    return user['last_id'], citizen['last_id']
@@ -0,0 +1,125 @@
+import hashlib
+import time
+
+import jwt
+import pytest
+
+from config.database import DB_ERRORS
+from middleware import auth_middleware, revocation
+from middleware.auth_middleware import (
+    CLAIMS_VERSION,
+    authorization_claims,
+    bump_claims_version,
+    invalidate_principal,
+    principal_from_claims,
+    verify_token
+)
+from middleware.revocation import RevocationList
+from tests.conftest import make_citizen
+from utils import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    invalidate_principal()
+    auth_middleware.token_cache.clear()
+    yield
+    invalidate_principal()
+    auth_middleware.token_cache.clear()
+
+
+def make_token(exp_in=3600, **claims):
+    payload = {'userId': 1, 'exp': int(time.time()) + exp_in, **claims}
+    return jwt.encode(payload, auth_middleware.JWT_SECRET, algorithm='HS256')
+
+
+def test_verify_token_caches_the_payload(monkeypatch):
+    token = make_token()
+    assert verify_token(token)['userId'] == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError('signature checked again')
+    monkeypatch.setattr(auth_middleware.jwt, 'decode', fail)
+    assert verify_token(token)['userId'] == 1
+
+
+def test_verify_token_rejects_expired_and_forged_tokens():
+    assert verify_token(make_token(exp_in=-10)) == {'error': 'Token has expired'}
+    forged = jwt.encode({'userId': 1}, 'another_secret_key_of_at_least_32_chars', algorithm='HS256')
+    assert verify_token(forged) == {'error': 'Invalid token'}
+
+
+def test_cached_token_expires_with_the_token(monkeypatch):
+    token = make_token(exp_in=60)
+    verify_token(token)
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    assert auth_middleware.token_cache.get(key) is not None
+
+    later = time.time() + 120
+    monkeypatch.setattr(cache.time, 'time', lambda: later)
+    assert auth_middleware.token_cache.get(key) is None
+
+
+def test_claims_are_stale_after_a_claims_version_bump(use_db):
+    db = use_db(auth_middleware)
+    user_id, citizen_id = make_citizen(db, 'c@x.co')
+    payload = {'userId': user_id, **authorization_claims('citizen', 1, citizen_id=citizen_id)}
+
+    principal = principal_from_claims(payload)
+    assert (principal.user_id, principal.citizen_id) == (user_id, citizen_id)
+
+    with db.transaction() as tx:
+        bump_claims_version(tx, user_id)
+    # Still cached in this process until the write path invalidates it
+    assert principal_from_claims(payload) is not None
+    invalidate_principal(user_id)
+    assert principal_from_claims(payload) is None
+
+    assert principal_from_claims({**payload, 'uv': 2}) is not None
+    assert principal_from_claims({**payload, 'uv': 2, 'cv': CLAIMS_VERSION + 1}) is None
+
+
+def test_revoked_token_is_found_through_the_filter(use_db):
+    db = use_db(revocation)
+    user_id, _ = make_citizen(db, 'c@x.co')
+    revocations = RevocationList()
+    revocations.refresh()
+
+    assert revocations.revoke('revoked-jti', user_id, time.time() + 3600)
+    assert revocations.is_revoked('revoked-jti')
+    assert not revocations.is_revoked('other-jti')
+
+    # A fresh list learns about it from the table
+    other = RevocationList()
+    other.refresh()
+    assert other.is_revoked('revoked-jti')
+    assert other.stats()['revoked'] == 1
+
+
+def test_failed_refresh_keeps_the_previous_filter(use_db):
+    db = use_db(revocation)
+    user_id, _ = make_citizen(db, 'c@x.co')
+    revocations = RevocationList()
+    revocations.revoke('revoked-jti', user_id, time.time() + 3600)
+    revocations.refresh()
+    loaded = revocations._filter
+
+    db.execute_query('DROP TABLE token_revocations')
+    revocations._refresh_safely()
+    assert revocations._filter is loaded
+    assert revocations.stats()['refresh_failures'] == 1
+    # Filter misses still answer without the database
+    assert not revocations.is_revoked('other-jti')
+
+
+def test_unreachable_revocation_table_fails_closed(use_db):
+    db = use_db(revocation)
+    revocations = RevocationList()
+    db.execute_query('DROP TABLE token_revocations')
+
+    # Nothing loaded yet, so every check goes to the table
+    with pytest.raises(DB_ERRORS):
+        revocations.is_revoked('some-jti')
+
+    revocations.fail_open = True
+    assert not revocations.is_revoked('some-jti')
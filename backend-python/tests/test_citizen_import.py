@@ -0,0 +1,66 @@
+import pytest
+
+from config.database import DB_ERRORS
+from utils import citizen_import, passwords
+from utils.citizen_import import import_citizens
+from utils.passwords import PasswordHasher
+from tests.conftest import make_citizen
+
+
+@pytest.fixture
+def db(use_db, monkeypatch):
+    # Cheap inline hashing; cost factor is irrelevant here
+    monkeypatch.setattr(passwords, 'hasher', PasswordHasher(workers=0, rounds=4))
+    return use_db(citizen_import)
+
+
+def record(email, name='Jane Doe', password='Secret123'):
+    return {'name': name, 'email': email, 'password': password,
+            'phone': '9876543210', 'address': 'Long Street 1, Town'}
+
+
+def statuses(result):
+    return [(entry['row'], entry['status']) for entry in result['errors']]
+
+
+def test_valid_rows_are_created_with_citizen_profiles(db):
+    result = import_citizens(enumerate([record('a@x.co'), record('B@X.co')], start=2), chunk_size=1)
+
+    assert (result['total'], result['created'], result['rejected']) == (2, 2, 0)
+    rows = db.fetch_all(
+        'SELECT u.email, c.phone FROM users u JOIN citizens c ON c.user_id = u.id ORDER BY u.email'
+    )
+    assert [row['email'] for row in rows] == ['a@x.co', 'b@x.co']
+
+
+def test_duplicates_in_the_file_are_rejected(db):
+    records = [record('a@x.co'), record(' A@X.CO '), record('b@x.co')]
+    result = import_citizens(enumerate(records, start=2))
+
+    assert result['created'] == 2
+    assert statuses(result) == [(3, 'duplicate')]
+
+
+def test_existing_accounts_are_rejected_whatever_their_case(db):
+    # Registered before emails were normalized
+    make_citizen(db, 'Old.User@X.co')
+    result = import_citizens(enumerate([record('old.user@x.co'), record('new@x.co')], start=2))
+
+    assert result['created'] == 1
+    assert statuses(result) == [(2, 'duplicate')]
+    assert result['errors'][0]['errors'][0]['message'] == 'Email already registered'
+
+
+def test_invalid_and_unparseable_rows_are_reported(db):
+    records = [(2, record('a@x.co', password='short')), (3, None), (4, record('b@x.co'))]
+    result = import_citizens(records)
+
+    assert result['created'] == 1
+    assert statuses(result) == [(2, 'invalid'), (3, 'invalid')]
+
+
+def test_duplicate_lookup_errors_are_raised(db):
+    db.execute_query('DROP TABLE citizens')
+    db.execute_query('DROP TABLE users')
+    with pytest.raises(DB_ERRORS):
+        import_citizens(enumerate([record('a@x.co')], start=2))
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from config.pool import ConnectionPool, PoolTimeoutError
+from config.backends import SQLiteBackend
+from config.database import Database, DB_ERRORS
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_opens_min_size_and_reuses_connections():
+    pool = ConnectionPool(FakeConnection, min_size=2, max_size=3, timeout=0.1)
+    assert pool.stats() == {'size': 2, 'idle': 2, 'in_use': 0, 'max_size': 3}
+
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_pool_times_out_when_exhausted():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+
+    # A release wakes up a waiter
+    threading.Timer(0.02, pool.release, (held,)).start()
+    assert pool.acquire(timeout=1) is held
+
+
+def test_pool_discard_and_max_lifetime_replace_connections():
+    pool = ConnectionPool(FakeConnection, min_size=1, max_size=2, timeout=0.1)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.raw.closed
+    # The warm floor is refilled with a new connection
+    assert pool.stats()['size'] == 1
+    assert pool.acquire() is not conn
+
+    pool = ConnectionPool(FakeConnection, min_size=1, max_size=1, timeout=0.1, max_lifetime=1e-9)
+    old = pool._idle[0]
+    assert pool.acquire() is not old
+    assert old.raw.closed
+
+
+def test_transaction_commits_all_statements(fresh_db):
+    with fresh_db.transaction() as tx:
+        user = tx.execute_query(
+            "INSERT INTO users (name, email, password, role) VALUES ('A', 'a@x.co', 'x', 'citizen')"
+        )
+        tx.execute_query(
+            'INSERT INTO citizens (user_id, phone, address) VALUES (%s, %s, %s)',
+            (user['last_id'], '9876543210', 'Long Street 1')
+        )
+
+    assert fresh_db.fetch_one('SELECT COUNT(*) AS n FROM citizens')['n'] == 1
+    assert fresh_db.pool.stats()['in_use'] == 0
+
+
+def test_transaction_rolls_back_on_error(fresh_db):
+    with pytest.raises(DB_ERRORS):
+        with fresh_db.transaction() as tx:
+            tx.execute_query(
+                "INSERT INTO users (name, email, password, role) VALUES ('A', 'a@x.co', 'x', 'citizen')"
+            )
+            # Unique email: the second insert fails and takes the first with it
+            tx.execute_query(
+                "INSERT INTO users (name, email, password, role) VALUES ('B', 'a@x.co', 'x', 'citizen')"
+            )
+
+    assert fresh_db.fetch_one('SELECT COUNT(*) AS n FROM users')['n'] == 0
+    assert fresh_db.pool.stats()['in_use'] == 0
+
+
+def test_execute_many_batches_rows(fresh_db):
+    rows = [(f'User {n}', f'user{n}@x.co', 'x', 'citizen') for n in range(50)]
+    result = fresh_db.execute_many(
+        'INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)',
+        rows,
+        max_packet=2048
+    )
+    assert result['affected_rows'] == 50
+    assert result['batches'] > 1
+    assert fresh_db.fetch_one('SELECT COUNT(*) AS n FROM users')['n'] == 50
+
+
+def test_fetch_errors_are_swallowed_unless_raise_errors(fresh_db):
+    assert fresh_db.fetch_all('SELECT * FROM missing_table') == []
+    assert fresh_db.fetch_one('SELECT * FROM missing_table') is None
+    with pytest.raises(DB_ERRORS):
+        fresh_db.fetch_all('SELECT * FROM missing_table', raise_errors=True)
+    with pytest.raises(DB_ERRORS):
+        fresh_db.fetch_one('SELECT * FROM missing_table', raise_errors=True)
+
+
+def test_slow_statement_in_transaction_is_explained_on_its_connection(tmp_path, monkeypatch):
+    # One connection only: a second checkout for EXPLAIN would time out
+    monkeypatch.setenv('DB_POOL_MAX', '1')
+    monkeypatch.setenv('DB_POOL_TIMEOUT', '0.1')
+    monkeypatch.setenv('DB_SLOW_QUERY_MS', '0')
+    monkeypatch.setenv('DB_EXPLAIN_SLOW', 'true')
+    database = Database(SQLiteBackend(str(tmp_path / 'explain.db')))
+    try:
+        with database.transaction() as tx:
+            tx.fetch_all('SELECT id FROM users WHERE email = %s', ('a@x.co',))
+    finally:
+        database.close()
+
+    [entry] = [entry for entry in database.stats.snapshot() if entry['query'].startswith('SELECT id FROM users')]
+    assert entry['plan']
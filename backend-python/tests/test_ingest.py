@@ -0,0 +1,131 @@
+import os
+import time
+
+import pytest
+
+from utils import ingest
+from utils.blob_store import LocalBlobStore, Spool
+from utils.ingest import AttachmentIngester, FAILED, PENDING, STORED
+
+
+class Renditions:
+    def __init__(self):
+        self.queued = []
+
+    def enqueue(self, content_hash, mimetype):
+        self.queued.append(content_hash)
+        return True
+
+
+@pytest.fixture
+def ingester(use_db, tmp_path, monkeypatch):
+    use_db(ingest)
+    monkeypatch.setattr(ingest, 'derivatives', Renditions())
+    return AttachmentIngester(LocalBlobStore(str(tmp_path / 'blobs')), str(tmp_path / 'staged'))
+
+
+def stage(ingester, data, max_memory=1024):
+    spool = Spool(ingester.staging_dir, max_memory=max_memory)
+    spool.write(data)
+    return ingester.stage(spool)
+
+
+def add_row(content_hash, status=PENDING):
+    ingest.db.execute_query(
+        '''INSERT INTO attachments (filename, mimetype, content_hash, size, status)
+        VALUES ('photo.png', 'image/png', %s, 3, %s)''',
+        (content_hash, status)
+    )
+
+
+def statuses(content_hash):
+    rows = ingest.db.fetch_all('SELECT status FROM attachments WHERE content_hash = %s', (content_hash,))
+    return [row['status'] for row in rows]
+
+
+def test_pending_rows_become_stored(ingester):
+    content_hash, _, _ = stage(ingester, b'abc')
+    # A large upload arrives by rename from its on-disk spool
+    big_hash, _, _ = stage(ingester, b'x' * 4096)
+    add_row(content_hash)
+    add_row(content_hash)
+    add_row(big_hash)
+
+    ingester._ingest(content_hash, 'image/png')
+    ingester._ingest(big_hash, 'image/png')
+
+    assert statuses(content_hash) == [STORED, STORED]
+    assert statuses(big_hash) == [STORED]
+    assert ingester.store.exists(content_hash) and ingester.store.exists(big_hash)
+    assert os.listdir(ingester.staging_dir) == []
+    assert ingest.derivatives.queued == [content_hash, big_hash]
+
+
+def test_already_stored_blob_is_not_staged_again(ingester):
+    content_hash, _, _ = stage(ingester, b'abc')
+    add_row(content_hash)
+    ingester._ingest(content_hash, 'image/png')
+
+    again = stage(ingester, b'abc')
+    assert again == (content_hash, 3, None)
+    add_row(content_hash)
+    ingester._ingest(content_hash, 'image/png')
+    assert statuses(content_hash) == [STORED, STORED]
+
+
+def test_missing_copy_fails_the_rows(ingester):
+    content_hash, _, name = stage(ingester, b'abc')
+    add_row(content_hash)
+    os.unlink(os.path.join(ingester.staging_dir, name))
+
+    ingester._ingest(content_hash, 'image/png')
+    assert statuses(content_hash) == [FAILED]
+    assert ingester.stats()['failed'] == 1
+    assert ingest.derivatives.queued == []
+
+
+def test_corrupt_copy_is_skipped_for_a_good_one(ingester):
+    content_hash, _, first = stage(ingester, b'abc')
+    stage(ingester, b'abc')
+    add_row(content_hash)
+    with open(os.path.join(ingester.staging_dir, first), 'wb') as staged:
+        staged.write(b'tampered')
+
+    ingester._ingest(content_hash, 'image/png')
+    assert statuses(content_hash) == [STORED]
+    with ingester.store.open(content_hash) as blob:
+        assert blob.read() == b'abc'
+
+
+def test_corrupt_only_copy_fails_the_rows(ingester):
+    content_hash, _, name = stage(ingester, b'abc')
+    add_row(content_hash)
+    with open(os.path.join(ingester.staging_dir, name), 'wb') as staged:
+        staged.write(b'tampered')
+
+    ingester._ingest(content_hash, 'image/png')
+    assert statuses(content_hash) == [FAILED]
+    assert not ingester.store.exists(content_hash)
+
+
+def test_discard_removes_only_its_own_copy(ingester):
+    content_hash, _, mine = stage(ingester, b'abc')
+    _, _, theirs = stage(ingester, b'abc')
+
+    ingester.discard(mine)
+    assert os.listdir(ingester.staging_dir) == [theirs]
+    assert ingester.staged_copies(content_hash) == [os.path.join(ingester.staging_dir, theirs)]
+
+
+def test_sweep_keeps_referenced_and_recent_copies(ingester):
+    referenced, _, kept = stage(ingester, b'abc')
+    _, _, orphaned = stage(ingester, b'def')
+    _, _, recent = stage(ingester, b'ghi')
+    add_row(referenced)
+    old = time.time() - ingester.max_age - 10
+    for name in (kept, orphaned):
+        os.utime(os.path.join(ingester.staging_dir, name), (old, old))
+
+    ingester.sweep()
+    assert sorted(os.listdir(ingester.staging_dir)) == sorted([kept, recent])
+    assert ingester.stats()['swept'] == 1
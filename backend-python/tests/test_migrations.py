@@ -0,0 +1,87 @@
+import importlib
+
+import pytest
+
+from config import migrations
+from config.database import DB_ERRORS
+from config.migrations import MigrationError
+
+category_id_migration = importlib.import_module('config.migrations.0002_issue_category_id')
+
+LEGACY_ISSUES = '''CREATE TABLE issues (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  citizen_id INTEGER NOT NULL,
+  category VARCHAR(255),
+  description TEXT NOT NULL,
+  status TEXT DEFAULT 'created',
+  created_by INTEGER NOT NULL,
+  updated_by INTEGER NOT NULL,
+  created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+  updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+)'''
+
+
+@pytest.fixture
+def legacy_db(use_db):
+    """The fresh schema with issues rolled back to the free-text category column"""
+    db = use_db(migrations, category_id_migration)
+    db.execute_query('DROP TABLE issues')
+    db.execute_query(LEGACY_ISSUES)
+    db.execute_query("DELETE FROM issue_categories WHERE name = 'Others'")
+    db.execute_query('DELETE FROM schema_migrations WHERE version = 2')
+    return db
+
+
+def add_issues(db, categories):
+    db.execute_many(
+        '''INSERT INTO issues (citizen_id, category, description, created_by, updated_by)
+        VALUES (1, %s, 'Something needs fixing', 1, 1)''',
+        [(category,) for category in categories]
+    )
+
+
+def issue_categories(db):
+    rows = db.fetch_all(
+        'SELECT i.id, c.name FROM issues i JOIN issue_categories c ON c.id = i.category_id ORDER BY i.id'
+    )
+    return [row['name'] for row in rows]
+
+
+def test_category_names_become_ids(legacy_db, monkeypatch):
+    # Small batches so the fill runs in several steps
+    monkeypatch.setattr(category_id_migration, 'BATCH', 2)
+    add_issues(legacy_db, ['Road Repair', 'Fallen Tree', None, '  ', 'Water Leak', 'Fallen Tree'])
+
+    assert [migration.version for migration in migrations.pending()] == [2]
+    assert migrations.migrate() == [2]
+
+    assert issue_categories(legacy_db) == [
+        'Road Repair', 'Fallen Tree', 'Others', 'Others', 'Water Leak', 'Fallen Tree'
+    ]
+    assert 'category' not in migrations.columns('issues')
+    assert migrations.index_exists('issues', 'issues_category_created')
+    assert migrations.pending() == []
+
+
+def test_migration_can_run_again_after_a_partial_run(legacy_db):
+    add_issues(legacy_db, ['Road Repair', None])
+    legacy_db.execute_query('ALTER TABLE issues ADD COLUMN category_id INTEGER')
+
+    assert migrations.migrate() == [2]
+    assert issue_categories(legacy_db) == ['Road Repair', 'Others']
+
+
+def test_unfilled_category_id_stops_the_migration(legacy_db, monkeypatch):
+    add_issues(legacy_db, ['Road Repair'])
+    monkeypatch.setattr(category_id_migration, '_backfill', lambda: None)
+
+    with pytest.raises(MigrationError):
+        migrations.migrate()
+    # Nothing was dropped and the version is still pending
+    assert 'category' in migrations.columns('issues')
+    assert [migration.version for migration in migrations.pending()] == [2]
+
+
+def test_schema_checks_raise_on_database_errors(legacy_db):
+    with pytest.raises(DB_ERRORS):
+        migrations.columns('missing_table')
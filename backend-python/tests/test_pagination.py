@@ -0,0 +1,71 @@
+import pytest
+
+from config.database import DB_ERRORS
+from utils import pagination
+from utils.pagination import CursorError, decode_cursor, encode_cursor, keyset_page, page_limit
+from tests.conftest import make_citizen
+
+
+@pytest.fixture
+def issues(use_db):
+    db = use_db(pagination)
+    user_id, citizen_id = make_citizen(db, 'c@x.co')
+    # Several rows share a created_at so the id tiebreak is exercised
+    rows = [
+        (citizen_id, 1, f'Issue {n}', user_id, user_id, f'2024-01-{1 + n // 3:02d} 10:00:00')
+        for n in range(10)
+    ]
+    db.execute_many(
+        '''INSERT INTO issues (citizen_id, category_id, description, created_by, updated_by, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s)''',
+        rows
+    )
+    return citizen_id
+
+
+def page(citizen_id, cursor=None, limit=4, count=False):
+    return keyset_page('issues', 'id, created_at', 'citizen_id = %s', (citizen_id,), limit, cursor, count)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2024-01-02 10:00:00', 7, 'prev')
+    assert decode_cursor(cursor) == ('2024-01-02 10:00:00', 7, 'prev')
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'e30', encode_cursor('2024-01-01', 1, 'sideways')])
+def test_invalid_cursor_raises(cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor)
+
+
+def test_page_limit_is_clamped():
+    assert page_limit(None) == pagination.DEFAULT_LIMIT
+    assert page_limit(0) == pagination.DEFAULT_LIMIT
+    assert page_limit(10000) == pagination.MAX_LIMIT
+
+
+def test_pages_walk_forward_and_back_without_gaps(issues):
+    first, info = page(issues, count=True)
+    assert [row[0] for row in first] == [10, 9, 8, 7]
+    assert info['prev_cursor'] is None
+    assert info['total'] == 10
+
+    second, info = page(issues, info['next_cursor'])
+    assert [row[0] for row in second] == [6, 5, 4, 3]
+
+    last, last_info = page(issues, info['next_cursor'])
+    assert [row[0] for row in last] == [2, 1]
+    assert last_info['next_cursor'] is None
+
+    back, info = page(issues, last_info['prev_cursor'])
+    assert [row[0] for row in back] == [6, 5, 4, 3]
+    assert info['next_cursor'] and info['prev_cursor']
+
+    back, info = page(issues, info['prev_cursor'])
+    assert [row[0] for row in back] == [10, 9, 8, 7]
+    assert info['prev_cursor'] is None
+
+
+def test_database_errors_are_raised_not_an_empty_page(issues):
+    with pytest.raises(DB_ERRORS):
+        keyset_page('missing_table', 'id, created_at', '1 = 1', (), 4)
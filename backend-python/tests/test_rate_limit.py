@@ -0,0 +1,56 @@
+import pytest
+
+from middleware import rate_limit
+from middleware.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_burst_is_allowed_then_requests_wait(clock):
+    limiter = RateLimiter(rate=1, burst=3)
+    assert [limiter.hit('a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit('a') == pytest.approx(1.0)
+    # Other keys have their own bucket
+    assert limiter.hit('b') == 0
+    assert limiter.stats() == {'keys': 2, 'allowed': 4, 'rejected': 1, 'evicted': 0}
+
+
+def test_bucket_refills_at_the_rate(clock):
+    limiter = RateLimiter(rate=2, burst=2)
+    limiter.hit('a')
+    limiter.hit('a')
+    assert limiter.hit('a') == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert limiter.hit('a') == 0
+    assert limiter.hit('a') > 0
+
+    # A long pause refills to the burst, never beyond it
+    clock[0] += 60
+    assert limiter.hit('a') == 0
+    assert limiter.hit('a') == 0
+    assert limiter.hit('a') > 0
+
+
+def test_sweep_drops_refilled_buckets(clock):
+    limiter = RateLimiter(rate=1, burst=1, sweep_interval=10)
+    limiter.hit('a')
+    clock[0] += 11
+    limiter.hit('b')
+    assert limiter.stats()['keys'] == 1
+    assert limiter.evicted == 1
+
+
+def test_key_flood_is_capped_at_max_keys(clock):
+    limiter = RateLimiter(rate=1, burst=5, max_keys=100)
+    for n in range(1000):
+        limiter.hit(f'key-{n}')
+    assert limiter.stats()['keys'] <= 100
+    # The newest keys survive, the oldest are evicted first
+    assert 'key-999' in limiter._full_at
+    assert 'key-0' not in limiter._full_at
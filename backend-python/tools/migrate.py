@@ -0,0 +1,55 @@
+"""
+Apply pending schema migrations (config/migrations).
+
+    python tools/migrate.py [--list] [--to VERSION]
+
+Safe to re-run: applied versions are skipped and every step checks the
+schema before changing it, so a run that stopped half way can be repeated.
+"""
+import os
+import sys
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import migrations
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('migrate')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--list', action='store_true', help='show every migration and whether it is applied')
+    parser.add_argument('--to', type=int, default=None, help='stop after this version')
+    args = parser.parse_args()
+
+    if args.list:
+        applied = migrations.applied_versions()
+        for migration in migrations.discover():
+            mark = '✅' if migration.version in applied else '⏳'
+            logger.info(f'{mark} {migration.version:04d} {migration.name}')
+        return
+
+    logger.info('=' * 60)
+    logger.info(f'📍 Migrating the {migrations.db.backend.name} database')
+    logger.info('=' * 60)
+
+    try:
+        done = migrations.migrate(args.to)
+    except migrations.MigrationError as e:
+        logger.error(f'❌ {e}')
+        sys.exit(1)
+
+    if done:
+        logger.info(f'✅ Applied {len(done)} migration(s): {", ".join(f"{version:04d}" for version in done)}')
+    else:
+        logger.info('✅ Schema is up to date')
+
+
+if __name__ == '__main__':
+    main()
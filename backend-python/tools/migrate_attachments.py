@@ -0,0 +1,118 @@
+"""
+Move attachment bytes from attachments.data into the blob store.
+
+    python tools/migrate_attachments.py [--batch 50] [--drop-data]
+
+Safe to re-run: it adds status (see utils/ingest.py) and content_hash/size
+if missing, makes `data`
+nullable on MySQL, then copies one row at a time (so memory stays bounded by the
+largest attachment) and clears `data` for every row it has stored.
+--drop-data removes the emptied column once every row has a hash.
+"""
+import os
+import sys
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from config.database import db
+from utils.blob_store import blob_store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('migrate_attachments')
+
+
+def ddl(query):
+    if db.execute_query(query) is None:
+        logger.error(f'❌ Schema change failed: {query}')
+        sys.exit(1)
+
+
+def attachment_columns():
+    return db.fetch_all('SELECT * FROM attachments LIMIT 0', row_format='tuple').columns
+
+
+def prepare_schema(columns):
+    """Add the metadata columns and let new rows omit `data`"""
+    mysql = db.backend.name == 'mysql'
+    if 'content_hash' not in columns:
+        logger.info('📍 Adding content_hash and size columns...')
+        ddl('ALTER TABLE attachments ADD COLUMN content_hash CHAR(64) NULL')
+        ddl('ALTER TABLE attachments ADD COLUMN size BIGINT NOT NULL DEFAULT 0')
+        ddl('CREATE INDEX attachments_content_hash ON attachments (content_hash)')
+    if mysql:
+        ddl('ALTER TABLE attachments MODIFY data LONGBLOB NULL')
+
+
+def migrate(batch_size):
+    # SQLite cannot relax NOT NULL in place, so emptied rows keep a zero-length value there
+    cleared = None if db.backend.name == 'mysql' else b''
+    moved = 0
+    stored_bytes = 0
+    while True:
+        ids = db.fetch_all(
+            'SELECT id FROM attachments WHERE content_hash IS NULL ORDER BY id LIMIT %s',
+            (batch_size,),
+            row_format='tuple'
+        )
+        if not ids:
+            break
+
+        for (attachment_id,) in ids:
+            row = db.fetch_one('SELECT data FROM attachments WHERE id = %s', (attachment_id,))
+            content_hash, size = blob_store.put_bytes(bytes(row['data'] or b''))
+            result = db.execute_query(
+                'UPDATE attachments SET content_hash = %s, size = %s, data = %s WHERE id = %s',
+                (content_hash, size, cleared, attachment_id)
+            )
+            if result is None:
+                logger.error(f'❌ Could not update attachment {attachment_id}')
+                sys.exit(1)
+            moved += 1
+            stored_bytes += size
+
+        logger.info(f'📍 {moved} attachments moved ({stored_bytes / 1024 / 1024:.1f} MB)')
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch', type=int, default=50, help='attachment ids fetched per round')
+    parser.add_argument('--drop-data', action='store_true', help='drop attachments.data when done')
+    args = parser.parse_args()
+
+    logger.info('=' * 60)
+    logger.info(f'📍 Migrating attachment bytes to the {blob_store.name} blob store')
+    logger.info('=' * 60)
+
+    columns = attachment_columns()
+    if 'status' not in columns:
+        logger.info('📍 Adding status column...')
+        ddl("ALTER TABLE attachments ADD COLUMN status VARCHAR(10) NOT NULL DEFAULT 'stored'")
+        ddl('CREATE INDEX attachments_status ON attachments (status)')
+    if 'data' not in columns:
+        logger.info('✅ attachments.data is already gone, nothing to migrate')
+        return
+
+    prepare_schema(columns)
+    moved = migrate(args.batch)
+    logger.info(f'✅ {moved} attachments moved')
+
+    remaining = db.fetch_one('SELECT COUNT(*) AS remaining FROM attachments WHERE content_hash IS NULL')
+    if remaining and remaining['remaining']:
+        logger.error(f'❌ {remaining["remaining"]} attachments still have no content_hash')
+        sys.exit(1)
+
+    if db.backend.name == 'mysql':
+        ddl('ALTER TABLE attachments MODIFY content_hash CHAR(64) NOT NULL')
+    if args.drop_data:
+        ddl('ALTER TABLE attachments DROP COLUMN data')
+        logger.info('✅ attachments.data dropped')
+
+
+if __name__ == '__main__':
+    main()
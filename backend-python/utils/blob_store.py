@@ -0,0 +1,311 @@
+import io
+import os
+import hashlib
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLargeError(Exception):
+    """Raised when a spool is written past its size limit"""
+    pass
+
+
+class Spool:
+    """
+    Write-once upload buffer that hashes and counts bytes as they arrive.
+
+    The first `max_memory` bytes stay in memory; past that the spool moves
+    to a temp file in `directory`, so memory per upload is bounded however
+    large the file is. Writing more than `limit` bytes raises
+    BlobTooLargeError. Hand a filled spool to BlobStore.put_spool(), which
+    can keep the file without reading it again.
+    """
+
+    def __init__(self, directory=None, max_memory=1024 * 1024, limit=None):
+        self.directory = directory
+        self.max_memory = max_memory
+        self.limit = limit
+        self.size = 0
+        self.path = None
+        self._digest = hashlib.sha256()
+        self._file = io.BytesIO()
+
+    @property
+    def content_hash(self):
+        return self._digest.hexdigest()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def _rollover(self):
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        disk = os.fdopen(fd, 'w+b')
+        disk.write(self._file.getvalue())
+        self._file = disk
+        self.path = path
+
+    def write(self, data):
+        if self.limit is not None and self.size + len(data) > self.limit:
+            raise BlobTooLargeError(f'Upload exceeds {self.limit} bytes')
+        if self.path is None and self.size + len(data) > self.max_memory:
+            self._rollover()
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def flush(self):
+        self._file.flush()
+
+    def getvalue(self):
+        """Contents of an in-memory spool"""
+        return self._file.getvalue()
+
+    def detach(self):
+        """Flush an on-disk spool to disk, close it and give its file to the caller; returns the path"""
+        path = self.path
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.path = None
+        return path
+
+    def close(self):
+        self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class BlobStore:
+    """
+    Content-addressed storage for attachment bytes.
+
+    Blobs are keyed by the hex SHA-256 of their content, so storing the
+    same bytes twice keeps a single copy and the key doubles as a strong
+    validator for HTTP caching.
+    """
+
+    name = 'blobs'
+
+    def put_file(self, fileobj):
+        """Store everything readable from `fileobj`; returns (sha256, size)"""
+        raise NotImplementedError
+
+    def put_bytes(self, data):
+        return self.put_file(io.BytesIO(data))
+
+    def spool(self, max_memory=1024 * 1024, limit=None):
+        """New Spool for an incoming upload"""
+        return Spool(max_memory=max_memory, limit=limit)
+
+    def put_spool(self, spool):
+        """Store a filled Spool and close it; returns (sha256, size)"""
+        try:
+            spool.seek(0)
+            return self.put_file(spool)
+        finally:
+            spool.close()
+
+    def put_path(self, path):
+        """Store a local file and remove it; returns (sha256, size) as read from the file"""
+        with open(path, 'rb') as fileobj:
+            result = self.put_file(fileobj)
+        os.unlink(path)
+        return result
+
+    def open(self, content_hash):
+        """Binary file object for a stored blob (FileNotFoundError if missing)"""
+        raise NotImplementedError
+
+    def exists(self, content_hash):
+        raise NotImplementedError
+
+    def delete(self, content_hash):
+        raise NotImplementedError
+
+    def put_derivative(self, content_hash, kind, data):
+        """Store a rendition (e.g. 'thumb') of the blob `content_hash`"""
+        raise NotImplementedError
+
+    def open_derivative(self, content_hash, kind):
+        """Binary file object for a stored rendition (FileNotFoundError if missing)"""
+        raise NotImplementedError
+
+    def derivative_exists(self, content_hash, kind):
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs as files under `root`, sharded as ab/cd/abcd... by hash prefix.
+
+    Uploads are streamed into root/tmp while being hashed, then renamed into
+    place, so a blob is never visible half-written and concurrent uploads
+    of the same content are harmless.
+    """
+
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def put_file(self, fileobj):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+
+            content_hash = digest.hexdigest()
+            final_path = self.path(content_hash)
+            if os.path.exists(final_path):
+                logger.info(f'📍 [BLOB_STORE] Deduplicated {content_hash[:12]} ({size} bytes)')
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            return content_hash, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def spool(self, max_memory=1024 * 1024, limit=None):
+        # Spill next to the blobs so put_spool can rename instead of copying
+        return Spool(self.tmp_dir, max_memory, limit)
+
+    def put_spool(self, spool):
+        content_hash, size = spool.content_hash, spool.size
+        final_path = self.path(content_hash)
+        try:
+            if os.path.exists(final_path):
+                logger.info(f'📍 [BLOB_STORE] Deduplicated {content_hash[:12]} ({size} bytes)')
+            elif spool.path:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(spool.detach(), final_path)
+            else:
+                fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        out.write(spool.getvalue())
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    os.replace(tmp_path, final_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                    raise
+            return content_hash, size
+        finally:
+            spool.close()
+
+    def put_path(self, path):
+        # Hash what is actually on disk, then move the file in without copying it
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as fileobj:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        content_hash = digest.hexdigest()
+        final_path = self.path(content_hash)
+        if os.path.exists(final_path):
+            logger.info(f'📍 [BLOB_STORE] Deduplicated {content_hash[:12]} ({size} bytes)')
+            os.unlink(path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(path, final_path)
+        return content_hash, size
+
+    def open(self, content_hash):
+        return open(self.path(content_hash), 'rb')
+
+    def exists(self, content_hash):
+        return os.path.exists(self.path(content_hash))
+
+    def delete(self, content_hash):
+        try:
+            os.unlink(self.path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def derivative_path(self, content_hash, kind):
+        # Renditions sit next to the original: ab/cd/abcd....thumb
+        return f'{self.path(content_hash)}.{kind}'
+
+    def put_derivative(self, content_hash, kind, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(data)
+            final_path = self.derivative_path(content_hash, kind)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open_derivative(self, content_hash, kind):
+        return open(self.derivative_path(content_hash, kind), 'rb')
+
+    def derivative_exists(self, content_hash, kind):
+        return os.path.exists(self.derivative_path(content_hash, kind))
+
+
+BLOB_STORES = {
+    'local': lambda: LocalBlobStore(
+        os.getenv('BLOB_STORE_PATH') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+    )
+}
+
+
+def create_blob_store(name=None):
+    """Instantiate the store named by `name` or BLOB_STORE (default local)"""
+    name = (name or os.getenv('BLOB_STORE', 'local')).lower()
+    if name not in BLOB_STORES:
+        raise ValueError(f'Unknown BLOB_STORE {name!r}. Must be one of: {", ".join(BLOB_STORES)}')
+    return BLOB_STORES[name]()
+
+
+blob_store = create_blob_store()
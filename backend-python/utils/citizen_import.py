@@ -0,0 +1,228 @@
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config.database import db, DB_ERRORS
+from utils import passwords
+from utils.cache import TTLCache
+from utils.validators import validate_all
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('name', 'email', 'password', 'phone', 'address')
+
+# Emails per IN (...) lookup
+LOOKUP_CHUNK = 1000
+
+# Finished import jobs stay pollable this long (seconds), per process
+IMPORT_JOB_TTL = float(os.getenv('IMPORT_JOB_TTL', 3600))
+
+_jobs = TTLCache(capacity=1000, ttl=IMPORT_JOB_TTL)
+# One import at a time; its thread is created on the first submit
+_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='citizen-import')
+
+
+def parse_records(stream, fmt):
+    """
+    Yield (row_number, record) pairs from a CSV (header row) or JSONL byte stream.
+
+    Rows that cannot be parsed yield (row_number, None).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        # Row numbers count the header as row 1, like a spreadsheet
+        for number, record in enumerate(csv.DictReader(text), start=2):
+            yield number, record
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def _normalize(record):
+    values = {field: record.get(field) for field in FIELDS}
+    values = {field: value if isinstance(value, str) else ('' if value is None else str(value))
+              for field, value in values.items()}
+    for field in ('name', 'email', 'phone', 'address'):
+        values[field] = values[field].strip()
+    values['email'] = values['email'].lower()
+    return values
+
+
+def _existing_emails(emails):
+    """
+    Lowercased emails already registered, found with one IN (...) query per
+    LOOKUP_CHUNK; `emails` must be lowercase. Raises on database errors.
+    """
+    existing = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK):
+        chunk = emails[start:start + LOOKUP_CHUNK]
+        placeholders = ','.join(['%s'] * len(chunk))
+        # Accounts created before emails were normalized may be mixed case
+        rows = db.fetch_all(
+            f'SELECT LOWER(email) FROM users WHERE LOWER(email) IN ({placeholders})',
+            tuple(chunk),
+            row_format='tuple',
+            primary=True,
+            raise_errors=True
+        )
+        existing.update(email for (email,) in rows)
+    return existing
+
+
+def _insert_chunk(chunk):
+    """Insert one chunk of citizens in a transaction; returns {email: user_id}"""
+    with db.transaction() as tx:
+        tx.execute_many(
+            '''INSERT INTO users (name, email, password, role)
+            VALUES (%s, %s, %s, %s)''',
+            [(row['name'], row['email'], row['hashed'], 'citizen') for row in chunk]
+        )
+        # Map emails back to ids instead of relying on consecutive AUTO_INCREMENT values
+        placeholders = ','.join(['%s'] * len(chunk))
+        ids = {
+            user['email']: user['id']
+            for user in tx.fetch_all(
+                f'SELECT id, email FROM users WHERE email IN ({placeholders})',
+                tuple(row['email'] for row in chunk)
+            )
+        }
+        tx.execute_many(
+            '''INSERT INTO citizens (user_id, phone, address)
+            VALUES (%s, %s, %s)''',
+            [(ids[row['email']], row['phone'], row['address']) for row in chunk]
+        )
+    return ids
+
+
+def import_citizens(records, chunk_size=500, progress=None):
+    """
+    Create citizen accounts in bulk from (row_number, record) pairs.
+
+    Rows are validated with validate_all, checked against existing and
+    earlier-in-file emails, then hashed on the bcrypt pool and inserted
+    `chunk_size` at a time, one transaction per chunk. progress(created,
+    pending), if given, is called after each chunk. Returns a summary plus
+    an error entry for every row that was not created.
+    """
+    errors = []
+    valid = []
+    seen = set()
+    total = 0
+
+    for number, record in records:
+        total += 1
+        if record is None:
+            errors.append({'row': number, 'status': 'invalid', 'errors': [{'field': None, 'message': 'Row could not be parsed'}]})
+            continue
+
+        row = _normalize(record)
+        row_errors = validate_all(row['email'], row['password'], row['name'], row['phone'], row['address'])
+        if row_errors:
+            errors.append({'row': number, 'email': row['email'], 'status': 'invalid', 'errors': row_errors})
+        elif row['email'] in seen:
+            errors.append({'row': number, 'email': row['email'], 'status': 'duplicate',
+                           'errors': [{'field': 'email', 'message': 'Email appears earlier in the file'}]})
+        else:
+            seen.add(row['email'])
+            row['row'] = number
+            valid.append(row)
+
+    logger.info(f'📍 [IMPORT] {total} rows read, {len(valid)} valid')
+
+    existing = _existing_emails([row['email'] for row in valid])
+    pending = []
+    for row in valid:
+        if row['email'] in existing:
+            errors.append({'row': row['row'], 'email': row['email'], 'status': 'duplicate',
+                           'errors': [{'field': 'email', 'message': 'Email already registered'}]})
+        else:
+            pending.append(row)
+
+    logger.info(f'📍 [IMPORT] Hashing and inserting {len(pending)} citizens...')
+    created = 0
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        for row, hashed in zip(chunk, passwords.hasher.hash_many(row['password'] for row in chunk)):
+            row['hashed'] = hashed
+        try:
+            _insert_chunk(chunk)
+            created += len(chunk)
+        except DB_ERRORS as e:
+            # The whole chunk was rolled back; report it and carry on with the next
+            logger.error(f'❌ [IMPORT] Chunk starting at row {chunk[0]["row"]} failed: {e}')
+            errors.extend(
+                {'row': row['row'], 'email': row['email'], 'status': 'failed',
+                 'errors': [{'field': None, 'message': f'Insert failed: {e}'}]}
+                for row in chunk
+            )
+        if progress:
+            progress(created, len(pending))
+
+    errors.sort(key=lambda entry: entry['row'])
+    logger.info(f'✅ [IMPORT] {created} citizens created, {len(errors)} rows rejected')
+
+    return {
+        'total': total,
+        'created': created,
+        'rejected': len(errors),
+        'errors': errors
+    }
+
+
+def submit_import(records, user_id):
+    """
+    Run import_citizens on the background import thread; returns the job.
+
+    `records` must already be read (a list), since the upload is closed
+    when the request ends. Poll get_job(job['id']) for its status: queued,
+    running, done (with 'result') or failed (with 'error').
+    """
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'user_id': user_id,
+        'rows': len(records),
+        'created': 0,
+        'pending': None,
+        'submitted_at': time.time(),
+        'finished_at': None,
+        'result': None,
+        'error': None
+    }
+    _jobs.put(job['id'], job)
+
+    def progress(created, pending):
+        job['created'] = created
+        job['pending'] = pending
+
+    def run():
+        job['status'] = 'running'
+        try:
+            job['result'] = import_citizens(records, progress=progress)
+            job['status'] = 'done'
+        except Exception as e:
+            logger.error(f'❌ [IMPORT] Job {job["id"]} failed: {e}')
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            job['finished_at'] = time.time()
+            # Restart the TTL from completion so the result stays pollable
+            _jobs.put(job['id'], job)
+
+    _runner.submit(run)
+    return job
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
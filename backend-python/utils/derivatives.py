@@ -0,0 +1,195 @@
+import io
+import os
+import queue
+import threading
+import logging
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.blob_store import blob_store
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Renditions served instead of the original, largest first
+DERIVATIVES = {
+    'web': {'size': (1600, 1600), 'quality': 82},
+    'thumb': {'size': (320, 320), 'quality': 70}
+}
+DERIVATIVE_MIMETYPE = 'image/jpeg'
+
+IMAGE_TYPES = {'image/jpeg', 'image/jpg', 'image/png', 'image/webp', 'image/gif', 'image/bmp', 'image/tiff'}
+
+
+def _render(path):
+    """Decode the image at `path` once and return {kind: JPEG bytes} for every rendition (runs in a worker)"""
+    from PIL import Image, ImageOps
+
+    with open(path, 'rb') as source:
+        image = Image.open(source)
+        # Let the JPEG decoder downscale while decoding when the source is huge
+        image.draft('RGB', DERIVATIVES['web']['size'])
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+    renditions = {}
+    for kind, spec in DERIVATIVES.items():
+        # Each rendition is scaled down from the previous, larger, one
+        image.thumbnail(spec['size'], Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=spec['quality'], optimize=True, progressive=True)
+        renditions[kind] = out.getvalue()
+    return renditions
+
+
+def _ready():
+    return True
+
+
+class DerivativeWorker:
+    """
+    Thumbnails and web-sized copies of image attachments, made in the background.
+
+    enqueue() puts a blob hash on a bounded job queue and returns at once; a
+    dispatcher thread hands the original's path to a pool of `workers`
+    processes, which open and render it themselves (so the original is
+    never read into or pickled from this process), at most two jobs per
+    worker in flight. The renditions that come back are stored next to
+    the original in the blob store. Because
+    renditions are keyed by content hash, a photo uploaded twice is
+    rendered once. Jobs that do not fit in the queue are dropped and
+    rendered later on first request. workers=0, or Pillow not being
+    installed, disables previews.
+
+    Workers are forked, so call start() early, like the bcrypt pool.
+    """
+
+    def __init__(self, store, workers=1, queue_size=256):
+        self.store = store
+        self.workers = workers if importlib.util.find_spec('PIL') else 0
+        self._queue = queue.Queue(queue_size)
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) * 2)
+        self._pending = set()
+        self._failed = TTLCache(capacity=10000, ttl=3600)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        if workers and not self.workers:
+            logger.warning('⚠️ Pillow is not installed, image previews are disabled')
+
+    def start(self):
+        """Fork the render processes and start the dispatcher thread"""
+        if not self.workers:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._pool()
+            self._thread = threading.Thread(target=self._dispatch, name='derivatives', daemon=True)
+            self._thread.start()
+        logger.info(f'✅ Image derivative pool started ({self.workers} workers, queue {self._queue.maxsize})')
+
+    def _pool(self):
+        if self._executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('fork')
+            )
+            # With fork, the first job spawns every worker at once
+            executor.submit(_ready).result()
+            self._executor = executor
+        return self._executor
+
+    def supports(self, mimetype):
+        return bool(self.workers) and (mimetype or '').lower() in IMAGE_TYPES
+
+    def is_ready(self, content_hash):
+        return all(self.store.derivative_exists(content_hash, kind) for kind in DERIVATIVES)
+
+    def has_failed(self, content_hash):
+        return self._failed.get(content_hash) is not None
+
+    def enqueue(self, content_hash, mimetype):
+        """Queue renditions for a stored blob; returns True if they exist or are on the way"""
+        if not self.supports(mimetype) or self.has_failed(content_hash):
+            return False
+        if self.is_ready(content_hash):
+            return True
+        with self._lock:
+            if content_hash in self._pending:
+                return True
+            try:
+                self._queue.put_nowait(content_hash)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning(f'⚠️ [DERIVATIVES] Queue full, {content_hash[:12]} not queued')
+                return False
+            self._pending.add(content_hash)
+        self.start()
+        return True
+
+    def _dispatch(self):
+        while True:
+            content_hash = self._queue.get()
+            self._slots.acquire()
+            try:
+                path = self.store.path(content_hash)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(path)
+                future = self._pool().submit(_render, path)
+            except Exception as e:
+                self._finish(content_hash, error=e)
+                continue
+            future.add_done_callback(lambda done, content_hash=content_hash: self._finish(content_hash, done))
+
+    def _finish(self, content_hash, future=None, error=None):
+        try:
+            if error is None:
+                error = future.exception()
+            if error is None:
+                for kind, data in future.result().items():
+                    self.store.put_derivative(content_hash, kind, data)
+                self.completed += 1
+                logger.info(f'✅ [DERIVATIVES] Rendered {content_hash[:12]}')
+        except Exception as e:
+            error = e
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._pending.discard(content_hash)
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. out of memory); the next job forks a new pool
+            logger.error('❌ [DERIVATIVES] Render pool broken, restarting it')
+            self._executor = None
+        if error is not None:
+            # Not an image Pillow can read, or the pool broke; don't retry it for a while
+            self.failed += 1
+            self._failed.put(content_hash, True)
+            logger.warning(f'⚠️ [DERIVATIVES] Could not render {content_hash[:12]}: {error}')
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'pending': len(self._pending),
+            'completed': self.completed,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
+
+
+derivatives = DerivativeWorker(
+    blob_store,
+    workers=int(os.getenv('DERIVATIVE_WORKERS', 1)),
+    queue_size=int(os.getenv('DERIVATIVE_QUEUE_SIZE', 256))
+)
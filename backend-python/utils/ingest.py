@@ -0,0 +1,240 @@
+import os
+import time
+import uuid
+import queue
+import tempfile
+import threading
+import logging
+from config.database import db
+from utils.blob_store import blob_store
+from utils.derivatives import derivatives
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+STORED = 'stored'
+FAILED = 'failed'
+
+
+class AttachmentIngester:
+    """
+    Moves uploaded attachments into the blob store after the response is sent.
+
+    The request stages each upload as its own copy,
+    `staging_dir/<sha256>.<token>` (a rename for spools that already
+    spilled to disk), and inserts its attachments row with status
+    'pending'. Those rows and files are the durable queue: `workers`
+    threads take content hashes off an in-memory queue, move one verified
+    copy into the blob store, drop the others, then flip every pending row
+    with that hash to 'stored' (or 'failed'). start() re-queues whatever
+    was still pending when the process last stopped.
+
+    Copies are never shared between requests, so a request whose
+    transaction rolls back simply deletes its own with discard(), even
+    when several processes share the staging directory. Anything else left
+    behind (a crash between staging and commit) is removed by sweep(),
+    every `sweep_interval` seconds, once it is older than `max_age` and no
+    pending attachments row refers to its hash.
+    """
+
+    def __init__(self, store, staging_dir, workers=2, max_age=3600, sweep_interval=3600):
+        self.store = store
+        self.staging_dir = os.path.abspath(staging_dir)
+        self.workers = max(1, workers)
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.stored = 0
+        self.failed = 0
+        self.swept = 0
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    def staged_copies(self, content_hash):
+        """Paths of every staged copy of `content_hash`"""
+        prefix = content_hash + '.'
+        return [
+            entry.path for entry in os.scandir(self.staging_dir)
+            if entry.name == content_hash or entry.name.startswith(prefix)
+        ]
+
+    def stage(self, spool):
+        """
+        Persist a filled Spool for later ingestion.
+
+        Returns (sha256, size, name) where `name` identifies this request's
+        staged copy for discard(), or is None when the blob is already stored.
+        """
+        content_hash, size = spool.content_hash, spool.size
+        try:
+            if self.store.exists(content_hash):
+                # Already stored: the worker only has to mark the row
+                return content_hash, size, None
+            name = f'{content_hash}.{uuid.uuid4().hex}'
+            if spool.path:
+                os.replace(spool.detach(), os.path.join(self.staging_dir, name))
+            else:
+                fd, tmp_path = tempfile.mkstemp(dir=self.staging_dir, prefix='tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        out.write(spool.getvalue())
+                        out.flush()
+                        os.fsync(out.fileno())
+                    os.replace(tmp_path, os.path.join(self.staging_dir, name))
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                    raise
+            return content_hash, size, name
+        finally:
+            spool.close()
+
+    def _referenced(self, content_hash):
+        """Whether a pending attachments row refers to this hash; raises on database errors"""
+        row = db.fetch_one(
+            'SELECT 1 FROM attachments WHERE content_hash = %s AND status = %s LIMIT 1',
+            (content_hash, PENDING),
+            row_format='tuple',
+            primary=True,
+            raise_errors=True
+        )
+        return row is not None
+
+    def _remove_staged(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def discard(self, name):
+        """Delete a request's staged copy whose attachment rows were rolled back"""
+        if name and self._remove_staged(os.path.join(self.staging_dir, name)):
+            self.swept += 1
+
+    def sweep(self):
+        """Delete staged copies older than max_age whose hash no pending row refers to"""
+        cutoff = time.time() - self.max_age
+        removed = self.swept
+        for entry in os.scandir(self.staging_dir):
+            try:
+                if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                    continue
+                # Half-written mkstemp files ('tmp...') never match a hash
+                if self._referenced(entry.name.partition('.')[0]):
+                    continue
+                if self._remove_staged(entry.path):
+                    self.swept += 1
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f'⚠️ [INGEST] Staging sweep stopped: {e}')
+                break
+        if self.swept > removed:
+            logger.info(f'✅ [INGEST] Removed {self.swept - removed} orphaned staged files')
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def submit(self, content_hash, mimetype):
+        """Queue a staged hash whose pending rows have been committed"""
+        with self._lock:
+            if content_hash in self._queued:
+                return
+            self._queued.add(content_hash)
+        self._queue.put((content_hash, mimetype))
+
+    def start(self):
+        """Start the worker threads and re-queue attachments left pending"""
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'ingest-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            sweeper = threading.Thread(target=self._sweep_forever, name='ingest-sweep', daemon=True)
+            sweeper.start()
+            self._threads.append(sweeper)
+
+        pending = db.fetch_all(
+            '''SELECT content_hash, MIN(mimetype) AS mimetype
+            FROM attachments WHERE status = %s
+            GROUP BY content_hash''',
+            (PENDING,),
+            primary=True
+        )
+        for row in pending or []:
+            self.submit(row['content_hash'], row['mimetype'])
+        logger.info(f'✅ Attachment ingest started ({self.workers} workers, {len(pending or [])} pending)')
+        self.sweep()
+
+    def _work(self):
+        while True:
+            content_hash, mimetype = self._queue.get()
+            with self._lock:
+                self._queued.discard(content_hash)
+            try:
+                self._ingest(content_hash, mimetype)
+            except Exception as e:
+                # Most likely the database; the rows stay pending until the next start()
+                logger.error(f'❌ [INGEST] {content_hash[:12]} left pending: {e}')
+
+    def _ingest(self, content_hash, mimetype):
+        status = STORED if self.store.exists(content_hash) else FAILED
+        for path in self.staged_copies(content_hash):
+            if status == STORED:
+                # Redundant once the blob is stored, even if its request has not committed yet
+                self._remove_staged(path)
+                continue
+            try:
+                stored_hash, size = self.store.put_path(path)
+            except FileNotFoundError:
+                # Taken by another worker or discarded meanwhile
+                continue
+            if stored_hash == content_hash:
+                status = STORED
+            else:
+                logger.error(f'❌ [INGEST] Staged file for {content_hash[:12]} is corrupt (hash {stored_hash[:12]})')
+        if status == FAILED and self.store.exists(content_hash):
+            # Another worker stored the same bytes first
+            status = STORED
+        if status == FAILED:
+            logger.error(f'❌ [INGEST] No usable staged file for {content_hash[:12]}')
+
+        result = db.execute_query(
+            'UPDATE attachments SET status = %s WHERE content_hash = %s AND status = %s',
+            (status, content_hash, PENDING)
+        )
+        if result is None:
+            raise RuntimeError('Could not update attachment status')
+
+        if status == STORED:
+            self.stored += 1
+            logger.info(f'✅ [INGEST] Stored {content_hash[:12]} ({result["affected_rows"]} attachments)')
+            derivatives.enqueue(content_hash, mimetype)
+        else:
+            self.failed += 1
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'stored': self.stored,
+            'failed': self.failed,
+            'swept': self.swept
+        }
+
+
+ingester = AttachmentIngester(
+    blob_store,
+    # Beside the local store's blobs by default, so staging is a rename away from storing
+    os.getenv('UPLOAD_STAGING_PATH') or os.path.join(getattr(blob_store, 'root', 'uploads'), 'staged'),
+    workers=int(os.getenv('INGEST_WORKERS', 2)),
+    max_age=float(os.getenv('UPLOAD_STAGING_MAX_AGE', 3600)),
+    sweep_interval=float(os.getenv('UPLOAD_STAGING_SWEEP', 3600))
+)
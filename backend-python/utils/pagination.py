@@ -0,0 +1,98 @@
+import json
+import base64
+import binascii
+import logging
+from config.database import db, ResultSet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor"""
+    pass
+
+
+def encode_cursor(created_at, row_id, direction):
+    """Opaque cursor for the row (created_at, row_id); direction is 'next' or 'prev'"""
+    if hasattr(created_at, 'isoformat'):
+        created_at = created_at.isoformat(sep=' ')
+    payload = json.dumps([str(created_at), row_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, row_id, direction) from encode_cursor's output"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        raise CursorError('Invalid cursor')
+    if not isinstance(created_at, str) or not isinstance(row_id, int) or direction not in ('next', 'prev'):
+        raise CursorError('Invalid cursor')
+    return created_at, row_id, direction
+
+
+def page_limit(value):
+    return min(max(value or DEFAULT_LIMIT, 1), MAX_LIMIT)
+
+
+def keyset_page(table, columns, where, params, limit, cursor=None, count=False, alias=None):
+    """
+    One page of rows from `table`, newest first, continuing from `cursor`.
+
+    `columns` is the SELECT list and must include id and created_at;
+    `where` (with `params`) filters the rows; when `table` is a join, pass
+    the paged table's `alias` to qualify created_at and id. Instead of
+    OFFSET, the page starts strictly after the cursor row on (created_at,
+    id), so an index on the filter columns followed by (created_at, id)
+    reads only `limit` + 1 rows however deep the page. Returns
+    (ResultSet, pagination) where pagination holds next/prev cursors (None
+    at either end) and, with count=True, the total row count. Database
+    errors are raised, so a failed read is never mistaken for an empty page.
+    """
+    direction = 'next'
+    created, key = (f'{alias}.created_at', f'{alias}.id') if alias else ('created_at', 'id')
+    query = f'SELECT {columns} FROM {table} WHERE {where}'
+    args = tuple(params)
+    if cursor:
+        created_at, row_id, direction = decode_cursor(cursor)
+        # 'prev' walks back towards newer rows in ascending order, then flips the page
+        op = '<' if direction == 'next' else '>'
+        query += f' AND ({created} {op} %s OR ({created} = %s AND {key} {op} %s))'
+        args += (created_at, created_at, row_id)
+    order = 'DESC' if direction == 'next' else 'ASC'
+    query += f' ORDER BY {created} {order}, {key} {order} LIMIT %s'
+
+    result = db.fetch_all(query, args + (limit + 1,), row_format='tuple', raise_errors=True)
+    rows = list(result.rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'next':
+        has_next, has_prev = has_more, bool(cursor)
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if rows:
+        created_at_index = result.columns.index('created_at')
+        id_index = result.columns.index('id')
+        if has_next:
+            next_cursor = encode_cursor(rows[-1][created_at_index], rows[-1][id_index], 'next')
+        if has_prev:
+            prev_cursor = encode_cursor(rows[0][created_at_index], rows[0][id_index], 'prev')
+
+    pagination = {
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
+    if count:
+        (pagination['total'],) = db.fetch_one(
+            f'SELECT COUNT(*) FROM {table} WHERE {where}', tuple(params), row_format='tuple', raise_errors=True
+        )
+
+    return ResultSet(result.columns, rows), pagination
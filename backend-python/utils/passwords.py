@@ -0,0 +1,177 @@
+import os
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusyError(Exception):
+    """Raised when the bcrypt pool is saturated and the request should be shed"""
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _check(plain_password, hashed_password):
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def _ready():
+    return True
+
+
+class PasswordHasher:
+    """
+    bcrypt on a bounded process pool.
+
+    Hashing runs in `workers` processes so it never holds a request thread's
+    core or the GIL. At most `max_pending` jobs may be queued or running;
+    beyond that calls raise HasherBusyError immediately instead of queueing.
+    workers=0 runs bcrypt inline on the calling thread. Bulk hashing
+    (hash_many) shares those slots but keeps at most `bulk_workers` jobs in
+    flight, so an import never fills the pool ahead of interactive logins.
+    
+    Workers are forked, so call start() early, before DB connections or
+    server threads exist (app.py does this on import).
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=30, rounds=10, bulk_workers=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.bulk_workers = min(bulk_workers or max(1, self.workers // 2), self.max_pending)
+        self.timeout = timeout
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Fork the worker processes now rather than on the first request"""
+        if not self.workers:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('fork')
+            )
+            # With fork, the first job spawns every worker at once
+            executor.submit(_ready).result()
+            self._executor = executor
+        logger.info(f'✅ bcrypt pool started ({self.workers} workers, {self.max_pending} pending max)')
+
+    def _pool(self):
+        if self._executor is None:
+            self.start()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusyError(f'{self.max_pending} password jobs already pending')
+        try:
+            if not self.workers:
+                result = fn(*args)
+            else:
+                try:
+                    result = self._pool().submit(fn, *args).result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    self.rejected += 1
+                    raise HasherBusyError(f'Password job did not finish within {self.timeout}s')
+                except BrokenProcessPool:
+                    # A worker died; drop the pool so the next call forks a new one
+                    logger.error('❌ bcrypt pool broken, restarting it')
+                    with self._lock:
+                        self._executor = None
+                    raise HasherBusyError('Password pool restarting')
+            self.completed += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, plain_password, hashed_password):
+        return self._run(_check, plain_password, hashed_password)
+
+    def hash_many(self, passwords):
+        """
+        Hash a batch for a bulk job, returning hashes in input order.
+
+        Each job waits for a pending slot like an interactive one would,
+        but no more than `bulk_workers` run at once, so requests arriving
+        meanwhile find free slots and queue behind at most that many jobs.
+        """
+        if not self.workers:
+            results = []
+            for password in passwords:
+                self._acquire_bulk()
+                try:
+                    results.append(_hash(password, self.rounds))
+                finally:
+                    self._release_bulk()
+            self.completed += len(results)
+            return results
+
+        futures = []
+        for password in passwords:
+            self._acquire_bulk()
+            try:
+                future = self._pool().submit(_hash, password, self.rounds)
+            except BaseException:
+                self._release_bulk()
+                raise
+            future.add_done_callback(lambda _future: self._release_bulk())
+            futures.append(future)
+        try:
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.error('❌ bcrypt pool broken, restarting it')
+            with self._lock:
+                self._executor = None
+            raise
+        self.completed += len(results)
+        return results
+
+    def _acquire_bulk(self):
+        self._bulk_slots.acquire()
+        self._slots.acquire()
+
+    def _release_bulk(self):
+        self._slots.release()
+        self._bulk_slots.release()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'bulk_workers': self.bulk_workers,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(
+    # Empty BCRYPT_WORKERS means one per CPU, 0 runs bcrypt inline
+    workers=int(os.getenv('BCRYPT_WORKERS') or os.cpu_count() or 1),
+    max_pending=int(os.getenv('BCRYPT_MAX_PENDING') or 0) or None,
+    # Empty means half the workers (at least one) for bulk imports
+    bulk_workers=int(os.getenv('BCRYPT_BULK_WORKERS') or 0) or None,
+    timeout=float(os.getenv('BCRYPT_TIMEOUT', 30))
+)
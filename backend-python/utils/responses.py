@@ -0,0 +1,83 @@
+from flask import Response, current_app, request, stream_with_context
+from itertools import chain, islice
+from werkzeug.wsgi import wrap_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def stream_json_response(rows, status=200, chunk_size=500, **fields):
+    """
+    Stream {"success": true, **fields, "data": [...], "count": n} as rows arrive.
+    
+    `rows` can be any iterable, typically db.stream(...). A compact
+    ResultSet (row_format='tuple') is encoded from its tuples and shared
+    column header, so no dict is ever kept per row. The first row is
+    pulled before the response starts so query errors still surface to the
+    caller's error handling instead of a truncated 200.
+    """
+    source = rows
+    rows = iter(source)
+    first = list(islice(rows, 1))
+    # Read after the first pull: streamed ResultSets learn their columns lazily
+    columns = getattr(source, 'columns', None)
+    dumps = current_app.json.dumps
+    
+    def generate():
+        head = dumps({'success': True, **fields})
+        yield head[:-1] + (', ' if len(head) > 2 else '') + '"data": ['
+        
+        count = 0
+        remaining = chain(first, rows)
+        try:
+            while True:
+                chunk = list(islice(remaining, chunk_size))
+                if not chunk:
+                    break
+                if columns is not None:
+                    chunk = [dict(zip(columns, row)) for row in chunk]
+                # Encode a chunk as one array and strip the brackets
+                yield (', ' if count else '') + dumps(chunk)[1:-1]
+                count += len(chunk)
+        except Exception as e:
+            logger.error(f'❌ [STREAM_JSON] Stream aborted after {count} rows: {e}')
+            raise
+        
+        yield f'], "count": {count}}}'
+    
+    return Response(stream_with_context(generate()), status=status, mimetype='application/json')
+
+
+# Attachment bytes never change for a given id, so clients may keep them
+BLOB_MAX_AGE = int(os.getenv('ATTACHMENT_MAX_AGE', 86400))
+
+
+def send_blob(fileobj, size, content_hash, mimetype, filename, max_age=None):
+    """
+    Stream a stored blob with a strong ETag, Range and conditional GET support.
+    
+    `fileobj` must be a seekable binary file; it is read in chunks and
+    closed by the WSGI server, so memory per download stays constant. The
+    content hash is the ETag, so If-None-Match answers 304, Range answers
+    206 (or 416) and If-Range falls back to the full body on a mismatch.
+    """
+    response = Response(
+        wrap_file(request.environ, fileobj),
+        mimetype=mimetype,
+        direct_passthrough=True
+    )
+    response.content_length = size
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.set_etag(content_hash)
+    response.cache_control.private = True
+    response.cache_control.max_age = BLOB_MAX_AGE if max_age is None else max_age
+    try:
+        return response.make_conditional(request.environ, accept_ranges=True, complete_length=size)
+    except RequestedRangeNotSatisfiable:
+        fileobj.close()
+        response = Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
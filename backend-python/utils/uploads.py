@@ -0,0 +1,71 @@
+from functools import wraps
+from flask import Request, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.blob_store import blob_store, BlobTooLargeError
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Largest single attachment, largest whole request, bytes kept in memory per file
+UPLOAD_MAX_FILE_BYTES = int(os.getenv('UPLOAD_MAX_FILE_BYTES', 10 * 1024 * 1024))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv('UPLOAD_MAX_REQUEST_BYTES', 50 * 1024 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', 512 * 1024))
+
+
+class UploadRequest(Request):
+    """
+    Request whose multipart files are parsed straight into blob store spools.
+
+    Each file is hashed and counted while the body is read, kept in memory
+    only up to UPLOAD_SPOOL_BYTES and rejected once it passes
+    UPLOAD_MAX_FILE_BYTES. Spools still open when the request ends (form
+    rejected, parse aborted half way) are closed and their temp files removed.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if content_length is not None and content_length > UPLOAD_MAX_FILE_BYTES:
+            raise BlobTooLargeError(f'Upload exceeds {UPLOAD_MAX_FILE_BYTES} bytes')
+        spool = blob_store.spool(max_memory=UPLOAD_SPOOL_BYTES, limit=UPLOAD_MAX_FILE_BYTES)
+        self.__dict__.setdefault('_spools', []).append(spool)
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for spool in self.__dict__.pop('_spools', ()):
+                spool.close()
+
+
+def too_large_response(message):
+    return jsonify({
+        'success': False,
+        'message': message,
+        'max_file_bytes': UPLOAD_MAX_FILE_BYTES,
+        'max_request_bytes': UPLOAD_MAX_REQUEST_BYTES
+    }), 413
+
+
+def upload_limits(f):
+    """
+    Decorator that parses the multipart body before the view runs.
+
+    Oversized files or requests are answered with 413 here, before the view
+    touches the database; use it after token_required so anonymous clients
+    cannot make the server read a body.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            request.files
+        except BlobTooLargeError:
+            logger.warning(f'⚠️ [UPLOAD] File over {UPLOAD_MAX_FILE_BYTES} bytes rejected on {request.path}')
+            return too_large_response(f'Each attachment must be at most {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB')
+        except RequestEntityTooLarge:
+            logger.warning(f'⚠️ [UPLOAD] Request over {UPLOAD_MAX_REQUEST_BYTES} bytes rejected on {request.path}')
+            return too_large_response(f'Upload must be at most {UPLOAD_MAX_REQUEST_BYTES // (1024 * 1024)} MB in total')
+
+        return f(*args, **kwargs)
+
+    return decorated
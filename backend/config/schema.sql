@@ -28,10 +28,14 @@ CREATE TABLE `attachments` (
   `comment_id` int DEFAULT NULL,
   `filename` varchar(255) NOT NULL,
   `mimetype` varchar(100) NOT NULL,
-  `data` longblob NOT NULL,
+  `content_hash` char(64) NOT NULL,
+  `size` bigint NOT NULL DEFAULT '0',
+  `status` varchar(10) NOT NULL DEFAULT 'stored',
   PRIMARY KEY (`id`),
   KEY `issue_id` (`issue_id`),
   KEY `comment_id` (`comment_id`),
+  KEY `content_hash` (`content_hash`),
+  KEY `status` (`status`),
   CONSTRAINT `attachments_ibfk_1` FOREIGN KEY (`issue_id`) REFERENCES `issues` (`id`) ON DELETE CASCADE,
   CONSTRAINT `attachments_ibfk_2` FOREIGN KEY (`comment_id`) REFERENCES `issue_comments` (`id`) ON DELETE CASCADE,
   CONSTRAINT `chk_attachment_parent` CHECK ((((`issue_id` is not null) and (`comment_id` is null)) or ((`issue_id` is null) and (`comment_id` is not null))))
@@ -141,7 +145,7 @@ DROP TABLE IF EXISTS `issues`;
 CREATE TABLE `issues` (
   `id` int NOT NULL AUTO_INCREMENT,
   `citizen_id` int NOT NULL,
-  `category` varchar(255) NOT NULL,
+  `category_id` int NOT NULL,
   `description` text NOT NULL,
   `status` enum('created','in progress','escalated','rejected','completed') DEFAULT 'created',
   `created_by` int NOT NULL,
@@ -149,10 +153,14 @@ CREATE TABLE `issues` (
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
-  KEY `citizen_id` (`citizen_id`),
+  KEY `issues_citizen_created` (`citizen_id`,`created_at`,`id`),
+  KEY `issues_citizen_status_created` (`citizen_id`,`status`,`created_at`,`id`),
+  KEY `issues_category_created` (`category_id`,`created_at`,`id`),
+  KEY `issues_status_created` (`status`,`created_at`,`id`),
   KEY `created_by` (`created_by`),
   KEY `updated_by` (`updated_by`),
   CONSTRAINT `issues_ibfk_1` FOREIGN KEY (`citizen_id`) REFERENCES `citizens` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `issues_category_fk` FOREIGN KEY (`category_id`) REFERENCES `issue_categories` (`id`) ON DELETE RESTRICT,
   CONSTRAINT `issues_ibfk_2` FOREIGN KEY (`created_by`) REFERENCES `users` (`id`) ON DELETE RESTRICT,
   CONSTRAINT `issues_ibfk_3` FOREIGN KEY (`updated_by`) REFERENCES `users` (`id`) ON DELETE RESTRICT
 ) ENGINE=InnoDB AUTO_INCREMENT=11 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -164,7 +172,7 @@ CREATE TABLE `issues` (
 
 LOCK TABLES `issues` WRITE;
 /*!40000 ALTER TABLE `issues` DISABLE KEYS */;
-INSERT INTO `issues` VALUES (1,1,'Road Repair','Potholes on Maple Street','created',3,3,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(2,2,'Water Leak','Leakage near Oak Street','in progress',4,9,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(3,3,'Garbage Collection','Trash not emptied last week','escalated',5,1,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(4,4,'Street Light Issue','Flickering street light on Pine Road','completed',6,10,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(5,5,'Drainage Problems','Blocked drain at Cedar Lane','rejected',7,8,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(6,1,'Noise Complaint','Loud noise past midnight','created',3,3,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(7,2,'Parking Violation','Illegal parking on Spruce Avenue','created',4,4,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(8,3,'Public Safety','Broken guardrail near park','in progress',5,9,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(9,4,'Traffic Signal','Signal malfunction at 5th Ave','created',6,6,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(10,5,'Others','Lost dog in neighborhood','created',7,7,'2025-11-01 13:03:05','2025-11-01 13:03:05');
+INSERT INTO `issues` VALUES (1,1,1,'Potholes on Maple Street','created',3,3,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(2,2,2,'Leakage near Oak Street','in progress',4,9,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(3,3,3,'Trash not emptied last week','escalated',5,1,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(4,4,4,'Flickering street light on Pine Road','completed',6,10,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(5,5,5,'Blocked drain at Cedar Lane','rejected',7,8,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(6,1,6,'Loud noise past midnight','created',3,3,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(7,2,7,'Illegal parking on Spruce Avenue','created',4,4,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(8,3,8,'Broken guardrail near park','in progress',5,9,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(9,4,9,'Signal malfunction at 5th Ave','created',6,6,'2025-11-01 13:03:05','2025-11-01 13:03:05'),(10,5,10,'Lost dog in neighborhood','created',7,7,'2025-11-01 13:03:05','2025-11-01 13:03:05');
 /*!40000 ALTER TABLE `issues` ENABLE KEYS */;
 UNLOCK TABLES;
 
@@ -197,6 +205,50 @@ LOCK TABLES `officials` WRITE;
 /*!40000 ALTER TABLE `officials` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `schema_migrations`
+--
+
+DROP TABLE IF EXISTS `schema_migrations`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `schema_migrations` (
+  `version` int NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `applied_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `schema_migrations`
+--
+
+LOCK TABLES `schema_migrations` WRITE;
+/*!40000 ALTER TABLE `schema_migrations` DISABLE KEYS */;
+INSERT INTO `schema_migrations` VALUES (1,'issue_list_indexes','2026-10-17 00:00:00'),(2,'issue_category_id','2026-10-17 00:00:00'),(3,'users_claims_version','2026-10-17 00:00:00');
+/*!40000 ALTER TABLE `schema_migrations` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `token_revocations`
+--
+
+DROP TABLE IF EXISTS `token_revocations`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `token_revocations` (
+  `jti` varchar(64) NOT NULL,
+  `user_id` int NOT NULL,
+  `expires_at` datetime NOT NULL,
+  `revoked_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`jti`),
+  KEY `user_id` (`user_id`),
+  KEY `expires_at` (`expires_at`),
+  CONSTRAINT `token_revocations_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `users`
 --
@@ -212,6 +264,7 @@ CREATE TABLE `users` (
   `role` enum('citizen','official','higherofficial') NOT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  `claims_version` int NOT NULL DEFAULT '1',
   PRIMARY KEY (`id`),
   UNIQUE KEY `email` (`email`)
 ) ENGINE=InnoDB AUTO_INCREMENT=11 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -223,7 +276,7 @@ CREATE TABLE `users` (
 
 LOCK TABLES `users` WRITE;
 /*!40000 ALTER TABLE `users` DISABLE KEYS */;
-INSERT INTO `users` VALUES (1,'Isabel HigherOfficial','isabel.higher@citysolve.com','hashedpwd9','higherofficial','2025-11-01 13:03:05','2025-11-01 13:03:05'),(2,'Jack HigherOfficial','jack.higher@citysolve.com','hashedpwd10','higherofficial','2025-11-01 13:03:05','2025-11-01 13:03:05'),(3,'Alice Citizen','alice1@example.com','hashedpwd1','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05'),(4,'Bob Citizen','bob2@example.com','hashedpwd2','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05'),(5,'Charlie Citizen','charlie3@example.com','hashedpwd3','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05'),(6,'Diana Citizen','diana4@example.com','hashedpwd4','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05'),(7,'Emily Citizen','emily5@example.com','hashedpwd5','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05'),(8,'Frank Official','frank.official1@citysolve.com','hashedpwd6','official','2025-11-01 13:03:05','2025-11-01 13:03:05'),(9,'Grace Official','grace.official2@citysolve.com','hashedpwd7','official','2025-11-01 13:03:05','2025-11-01 13:03:05'),(10,'Henry Official','henry.official3@citysolve.com','hashedpwd8','official','2025-11-01 13:03:05','2025-11-01 13:03:05');
+INSERT INTO `users` VALUES (1,'Isabel HigherOfficial','isabel.higher@citysolve.com','hashedpwd9','higherofficial','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(2,'Jack HigherOfficial','jack.higher@citysolve.com','hashedpwd10','higherofficial','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(3,'Alice Citizen','alice1@example.com','hashedpwd1','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(4,'Bob Citizen','bob2@example.com','hashedpwd2','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(5,'Charlie Citizen','charlie3@example.com','hashedpwd3','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(6,'Diana Citizen','diana4@example.com','hashedpwd4','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(7,'Emily Citizen','emily5@example.com','hashedpwd5','citizen','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(8,'Frank Official','frank.official1@citysolve.com','hashedpwd6','official','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(9,'Grace Official','grace.official2@citysolve.com','hashedpwd7','official','2025-11-01 13:03:05','2025-11-01 13:03:05',1),(10,'Henry Official','henry.official3@citysolve.com','hashedpwd8','official','2025-11-01 13:03:05','2025-11-01 13:03:05',1);
 /*!40000 ALTER TABLE `users` ENABLE KEYS */;
 UNLOCK TABLES;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
@@ -1,18 +1,50 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
 const pool = require('../config/database');
 
+// Attachment bytes live in the content-addressed blob store shared with
+// backend-python (utils/blob_store.py): <root>/ab/cd/<sha256>. Rows only keep
+// the hash and size.
+const BLOB_ROOT = path.resolve(
+  process.env.BLOB_STORE_PATH || path.join(__dirname, '../../backend-python/uploads')
+);
+
+const blobPath = (contentHash) =>
+  path.join(BLOB_ROOT, contentHash.slice(0, 2), contentHash.slice(2, 4), contentHash);
+
+async function storeBlob(fileData) {
+  const contentHash = crypto.createHash('sha256').update(fileData).digest('hex');
+  const target = blobPath(contentHash);
+  if (!fs.existsSync(target)) {
+    // Write beside the store and rename, so readers never see a partial blob
+    const tmpDir = path.join(BLOB_ROOT, 'tmp');
+    await fs.promises.mkdir(tmpDir, { recursive: true });
+    await fs.promises.mkdir(path.dirname(target), { recursive: true });
+    const tmpPath = path.join(tmpDir, `${contentHash}.${process.pid}.${Date.now()}`);
+    await fs.promises.writeFile(tmpPath, fileData);
+    await fs.promises.rename(tmpPath, target);
+  }
+  return { contentHash, size: fileData.length };
+}
+
 class Attachment {
   static async createForIssue(issueId, filename, mimetype, fileData) {
+    const { contentHash, size } = await storeBlob(fileData);
     const [result] = await pool.query(
-      'INSERT INTO attachments (issue_id, filename, mimetype, data) VALUES (?, ?, ?, ?)',
-      [issueId, filename, mimetype, fileData]
+      `INSERT INTO attachments (issue_id, filename, mimetype, content_hash, size, status)
+       VALUES (?, ?, ?, ?, ?, 'stored')`,
+      [issueId, filename, mimetype, contentHash, size]
     );
     return result.insertId;
   }
 
   static async createForComment(commentId, filename, mimetype, fileData) {
+    const { contentHash, size } = await storeBlob(fileData);
     const [result] = await pool.query(
-      'INSERT INTO attachments (comment_id, filename, mimetype, data) VALUES (?, ?, ?, ?)',
-      [commentId, filename, mimetype, fileData]
+      `INSERT INTO attachments (comment_id, filename, mimetype, content_hash, size, status)
+       VALUES (?, ?, ?, ?, ?, 'stored')`,
+      [commentId, filename, mimetype, contentHash, size]
     );
     return result.insertId;
   }
@@ -42,10 +74,16 @@ class Attachment {
 
   static async getAttachmentData(attachmentId) {
     const [rows] = await pool.query(
-      'SELECT filename, mimetype, data FROM attachments WHERE id = ?',
+      'SELECT filename, mimetype, content_hash, status FROM attachments WHERE id = ?',
       [attachmentId]
     );
-    return rows[0];
+    const attachment = rows[0];
+    // Uploads made through backend-python are 'pending' until its ingest worker stores them
+    if (!attachment || attachment.status !== 'stored') {
+      return undefined;
+    }
+    const data = await fs.promises.readFile(blobPath(attachment.content_hash));
+    return { filename: attachment.filename, mimetype: attachment.mimetype, data };
   }
 }
 
@@ -2,12 +2,13 @@ const pool = require('../config/database');
 
 class Issue {
   static async create(issueData) {
-    const { citizen_id, category, description, created_by, updated_by } = issueData;
+    const { citizen_id, category_id, category, description, created_by, updated_by } = issueData;
     
+    // Issues reference issue_categories by id; a category name is still accepted
     const [result] = await pool.query(
-      `INSERT INTO issues (citizen_id, category, description, status, created_by, updated_by) 
-       VALUES (?, ?, ?, 'created', ?, ?)`,
-      [citizen_id, category, description, created_by, updated_by]
+      `INSERT INTO issues (citizen_id, category_id, description, status, created_by, updated_by) 
+       VALUES (?, COALESCE(?, (SELECT id FROM issue_categories WHERE name = ?)), ?, 'created', ?, ?)`,
+      [citizen_id, category_id || null, category || null, description, created_by, updated_by]
     );
     
     return result.insertId;
@@ -15,8 +16,9 @@ class Issue {
 
   static async findByCitizenId(citizenId) {
     const [rows] = await pool.query(
-      `SELECT i.*, u.name as citizen_name
+      `SELECT i.*, cat.name as category, u.name as citizen_name
        FROM issues i
+       JOIN issue_categories cat ON cat.id = i.category_id
        JOIN citizens c ON i.citizen_id = c.id
        JOIN users u ON c.user_id = u.id
        WHERE i.citizen_id = ?
@@ -28,11 +30,12 @@ class Issue {
 
   static async findByDepartment(department) {
     const [rows] = await pool.query(
-      `SELECT i.*, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
+      `SELECT i.*, cat.name as category, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
        FROM issues i
+       JOIN issue_categories cat ON cat.id = i.category_id
        JOIN citizens c ON i.citizen_id = c.id
        JOIN users u ON c.user_id = u.id
-       WHERE i.category LIKE ? AND i.status NOT IN ('rejected', 'completed')
+       WHERE cat.name LIKE ? AND i.status NOT IN ('rejected', 'completed')
        ORDER BY i.created_at DESC`,
       [`%${department}%`]
     );
@@ -41,11 +44,12 @@ class Issue {
 
   static async findEscalatedByDepartment(department) {
     const [rows] = await pool.query(
-      `SELECT i.*, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
+      `SELECT i.*, cat.name as category, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
        FROM issues i
+       JOIN issue_categories cat ON cat.id = i.category_id
        JOIN citizens c ON i.citizen_id = c.id
        JOIN users u ON c.user_id = u.id
-       WHERE i.category LIKE ? AND i.status = 'escalated'
+       WHERE cat.name LIKE ? AND i.status = 'escalated'
        ORDER BY i.created_at DESC`,
       [`%${department}%`]
     );
@@ -54,8 +58,9 @@ class Issue {
 
   static async findById(issueId) {
     const [rows] = await pool.query(
-      `SELECT i.*, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
+      `SELECT i.*, cat.name as category, c.id as citizen_id, u.name as citizen_name, u.phone, u.address
        FROM issues i
+       JOIN issue_categories cat ON cat.id = i.category_id
        JOIN citizens c ON i.citizen_id = c.id
        JOIN users u ON c.user_id = u.id
        WHERE i.id = ?`,
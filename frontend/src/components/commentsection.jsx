@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
-const CommentSection = ({ issueId, onActionComplete }) => {
-  const [comments, setComments] = useState([]);
+const CommentSection = ({ issueId, comments: initialComments, onActionComplete }) => {
+  const [comments, setComments] = useState(initialComments || []);
   const [loading, setLoading] = useState(false);
   const [comment, setComment] = useState('');
   const [attachments, setAttachments] = useState([]);
@@ -10,9 +10,14 @@ const CommentSection = ({ issueId, onActionComplete }) => {
   const [success, setSuccess] = useState('');
   const [submitting, setSubmitting] = useState(false);
 
+  // Comments come with the issue when the parent fetched it with include=comments
   useEffect(() => {
-    fetchComments();
-  }, [issueId]);
+    if (initialComments) {
+      setComments(initialComments);
+    } else {
+      fetchComments();
+    }
+  }, [issueId, initialComments]);
 
   // Auto-hide success message after 3 seconds
   useEffect(() => {
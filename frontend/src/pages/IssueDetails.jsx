@@ -51,7 +51,7 @@ const IssueDetails = () => {
       const token = localStorage.getItem('token');
       
       const response = await axios.get(
-        `http://localhost:5000/api/issues/${issueId}`,
+        `http://localhost:5000/api/issues/${issueId}?include=attachments,comments,comment_attachments`,
         {
           headers: {
             Authorization: `Bearer ${token}`,
@@ -321,7 +321,7 @@ const IssueDetails = () => {
               <h2 style={{ color: '#333', marginBottom: '1.5rem', fontSize: '1.5rem', fontWeight: '700' }}>
                 📝 Take Action
               </h2>
-              <CommentSection issueId={issue.id} onActionComplete={() => fetchIssueDetails()} />
+              <CommentSection issueId={issue.id} comments={issue.comments} onActionComplete={() => fetchIssueDetails()} />
             </div>
           ) : (
             <div style={{